@@ -0,0 +1,58 @@
+# alembic/versions/20261018_000001_add_order_generation_failures.py
+"""add order_generation_failures (generate_orders dead-letter)
+
+Revision ID: 20261018_000001
+Revises: aa2c4c2dc2d5
+Create Date: 2026-10-18 00:00:01.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = "20261018_000001"
+down_revision = "aa2c4c2dc2d5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "order_generation_failures",
+        sa.Column("id", mysql.BIGINT(unsigned=True), primary_key=True, autoincrement=True, nullable=False),
+        sa.Column("subscription_id", mysql.BIGINT(unsigned=True), nullable=False),
+        sa.Column("delivery_date", sa.Date(), nullable=False),
+        sa.Column("reason_code", sa.String(length=64), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default=sa.text("1")),
+        sa.Column("resolved_at", mysql.DATETIME(fsp=3), nullable=True),
+        sa.Column("created_at", mysql.DATETIME(fsp=3), nullable=False),
+        sa.Column("updated_at", mysql.DATETIME(fsp=3), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "delivery_date",
+            "subscription_id",
+            name="uq_order_generation_failures_delivery_date_subscription_id",
+        ),
+        sa.ForeignKeyConstraint(
+            ["subscription_id"],
+            ["subscriptions.id"],
+            name="fk_order_generation_failures_subscription_id",
+        ),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+        mysql_collate="utf8mb4_0900_ai_ci",
+    )
+    op.create_index(
+        "idx_order_generation_failures_subscription_id",
+        "order_generation_failures",
+        ["subscription_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_order_generation_failures_subscription_id", table_name="order_generation_failures")
+    op.drop_table("order_generation_failures")
@@ -0,0 +1,37 @@
+# alembic/versions/20261018_000002_add_job_checkpoints.py
+"""add job_checkpoints (resumable jobs)
+
+Revision ID: 20261018_000002
+Revises: 20261018_000001
+Create Date: 2026-10-18 00:00:02.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = "20261018_000002"
+down_revision = "20261018_000001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "job_checkpoints",
+        sa.Column("job_name", sa.String(length=64), nullable=False),
+        sa.Column("delivery_date", sa.Date(), nullable=False),
+        sa.Column("last_id", mysql.BIGINT(unsigned=True), nullable=False),
+        sa.Column("updated_at", mysql.DATETIME(fsp=3), nullable=False),
+        sa.PrimaryKeyConstraint("job_name", "delivery_date"),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+        mysql_collate="utf8mb4_0900_ai_ci",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("job_checkpoints")
@@ -0,0 +1,48 @@
+# alembic/versions/20261018_000003_add_subscription_due_queue.py
+"""add subscription_due_queue (materialized due index)
+
+Revision ID: 20261018_000003
+Revises: 20261018_000002
+Create Date: 2026-10-18 00:00:03.000000
+
+Populate after upgrade with:
+  python -m app.jobs.tasks.rebuild_due_queue
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = "20261018_000003"
+down_revision = "20261018_000002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "subscription_due_queue",
+        sa.Column("run_date", sa.Date(), nullable=False),
+        sa.Column("subscription_id", mysql.BIGINT(unsigned=True), nullable=False),
+        sa.PrimaryKeyConstraint("subscription_id"),
+        sa.ForeignKeyConstraint(
+            ["subscription_id"],
+            ["subscriptions.id"],
+            name="fk_subscription_due_queue_subscription_id",
+        ),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+        mysql_collate="utf8mb4_0900_ai_ci",
+    )
+    op.create_index(
+        "idx_subscription_due_queue_run_date_subscription_id",
+        "subscription_due_queue",
+        ["run_date", "subscription_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("subscription_due_queue")
@@ -0,0 +1,29 @@
+# alembic/versions/20261018_000004_add_zone_batch_capacity.py
+"""add zones.max_batch_orders / max_batch_items (batch capacity)
+
+Revision ID: 20261018_000004
+Revises: 20261018_000003
+Create Date: 2026-10-18 00:00:04.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = "20261018_000004"
+down_revision = "20261018_000003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("zones", sa.Column("max_batch_orders", mysql.INTEGER(unsigned=True), nullable=True))
+    op.add_column("zones", sa.Column("max_batch_items", mysql.INTEGER(unsigned=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("zones", "max_batch_items")
+    op.drop_column("zones", "max_batch_orders")
@@ -0,0 +1,58 @@
+# alembic/versions/20261018_000005_add_job_work_items.py
+"""add job_work_items (leased work units for distributed job workers)
+
+Revision ID: 20261018_000005
+Revises: 20261018_000004
+Create Date: 2026-10-18 00:00:05.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = "20261018_000005"
+down_revision = "20261018_000004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "job_work_items",
+        sa.Column("id", mysql.BIGINT(unsigned=True), primary_key=True, autoincrement=True, nullable=False),
+        sa.Column("job_name", sa.String(length=64), nullable=False),
+        sa.Column("delivery_date", sa.Date(), nullable=False),
+        sa.Column("range_start", mysql.BIGINT(unsigned=True), nullable=False),
+        sa.Column("range_end", mysql.BIGINT(unsigned=True), nullable=False),
+        sa.Column("status", mysql.TINYINT(unsigned=True), nullable=False, server_default=sa.text("1")),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("lease_owner", sa.String(length=128), nullable=True),
+        sa.Column("lease_expires_at", mysql.DATETIME(fsp=3), nullable=True),
+        sa.Column("last_error", sa.String(length=255), nullable=True),
+        sa.Column("created_at", mysql.DATETIME(fsp=3), nullable=False),
+        sa.Column("updated_at", mysql.DATETIME(fsp=3), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "job_name",
+            "delivery_date",
+            "range_start",
+            name="uq_job_work_items_job_name_delivery_date_range_start",
+        ),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+        mysql_collate="utf8mb4_0900_ai_ci",
+    )
+    op.create_index(
+        "idx_job_work_items_claim",
+        "job_work_items",
+        ["job_name", "delivery_date", "status", "lease_expires_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_job_work_items_claim", table_name="job_work_items")
+    op.drop_table("job_work_items")
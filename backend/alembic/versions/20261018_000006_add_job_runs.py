@@ -0,0 +1,52 @@
+# alembic/versions/20261018_000006_add_job_runs.py
+"""add job_runs (job run history / throughput baseline)
+
+Revision ID: 20261018_000006
+Revises: 20261018_000005
+Create Date: 2026-10-18 00:00:06.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = "20261018_000006"
+down_revision = "20261018_000005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "job_runs",
+        sa.Column("id", mysql.BIGINT(unsigned=True), primary_key=True, autoincrement=True, nullable=False),
+        sa.Column("job_name", sa.String(length=64), nullable=False),
+        sa.Column("delivery_date", sa.Date(), nullable=True),
+        sa.Column("status", mysql.TINYINT(unsigned=True), nullable=False),
+        sa.Column("started_at", mysql.DATETIME(fsp=3), nullable=False),
+        sa.Column("finished_at", mysql.DATETIME(fsp=3), nullable=False),
+        sa.Column("duration_ms", mysql.BIGINT(unsigned=True), nullable=False),
+        sa.Column("rows_processed", mysql.BIGINT(unsigned=True), nullable=False, server_default=sa.text("0")),
+        sa.Column("rows_per_second", mysql.BIGINT(unsigned=True), nullable=False, server_default=sa.text("0")),
+        sa.Column("error_count", mysql.INTEGER(unsigned=True), nullable=False, server_default=sa.text("0")),
+        sa.Column("error", sa.String(length=255), nullable=True),
+        sa.Column("statements", mysql.BIGINT(unsigned=True), nullable=True),
+        sa.Column("peak_rss_kb", mysql.BIGINT(unsigned=True), nullable=True),
+        sa.Column("summary", sa.JSON(), nullable=True),
+        sa.Column("host", sa.String(length=128), nullable=True),
+        sa.Column("git_revision", sa.String(length=40), nullable=True),
+        sa.Column("created_at", mysql.DATETIME(fsp=3), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        mysql_engine="InnoDB",
+        mysql_charset="utf8mb4",
+        mysql_collate="utf8mb4_0900_ai_ci",
+    )
+    op.create_index("idx_job_runs_job_name_started_at", "job_runs", ["job_name", "started_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("idx_job_runs_job_name_started_at", table_name="job_runs")
+    op.drop_table("job_runs")
@@ -74,6 +74,16 @@ def _require_subscription_owned(uow: UnitOfWork, subscription_id: int, user_id:
     return sub
 
 
+def _sync_due_queue(uow: UnitOfWork, sub: Subscription) -> None:
+    """
+    Keep subscription_due_queue in step with lifecycle changes (same transaction).
+    The queue row is derived in SQL with schedulable_subscription_filter, so the
+    API and generate_orders cannot disagree on what is schedulable.
+    """
+    uow.session.flush()
+    uow.due_queue.sync(sub.id)
+
+
 def _to_subscription_response(sub: Subscription) -> SubscriptionResponse:
     return SubscriptionResponse(
         id=sub.id,
@@ -178,6 +188,7 @@ def create_subscription(
         )
         uow.session.add(sub)
         uow.session.flush()
+        _sync_due_queue(uow, sub)
 
         for it in payload.items:
             uow.session.add(
@@ -239,6 +250,7 @@ def pause_subscription(
             now = datetime.utcnow()
             sub.paused_at = now
             sub.updated_at = now
+            _sync_due_queue(uow, sub)
 
         return _to_subscription_response(sub)
 
@@ -261,6 +273,7 @@ def resume_subscription(
         if sub.paused_at is not None:
             sub.paused_at = None
             sub.updated_at = datetime.utcnow()
+            _sync_due_queue(uow, sub)
 
         return _to_subscription_response(sub)
 
@@ -282,5 +295,6 @@ def cancel_subscription(
             sub.canceled_at = now
             sub.paused_at = None
             sub.updated_at = now
+            _sync_due_queue(uow, sub)
 
         return _to_subscription_response(sub)
@@ -6,8 +6,12 @@ from .address import Address
 from .delivery_batch import DeliveryBatch
 from .delivery_batch_order import DeliveryBatchOrder
 from .inventory import Inventory
+from .job_checkpoint import JobCheckpoint
+from .job_run import JobRun
+from .job_work_item import JobWorkItem
 from .order import Order
 from .order_item import OrderItem
+from .order_generation_failure import OrderGenerationFailure
 from .payment import Payment
 from .payment_slip import PaymentSlip
 from .plan import Plan
@@ -15,6 +19,7 @@ from .product import Product
 from .product_variant import ProductVariant
 from .role import Role
 from .subscription import Subscription
+from .subscription_due_queue import SubscriptionDueQueue
 from .subscription_item import SubscriptionItem
 from .user import User
 from .user_role import UserRole
@@ -33,10 +38,15 @@ __all__ = [
     "Plan",
     "Subscription",
     "SubscriptionItem",
+    "SubscriptionDueQueue",
     "Order",
     "OrderItem",
+    "OrderGenerationFailure",
     "DeliveryBatch",
     "DeliveryBatchOrder",
     "Payment",
     "PaymentSlip",
+    "JobCheckpoint",
+    "JobWorkItem",
+    "JobRun",
 ]
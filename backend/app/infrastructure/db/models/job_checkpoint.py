@@ -0,0 +1,34 @@
+# app/infrastructure/db/models/job_checkpoint.py
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from sqlalchemy import Date, String
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects.mysql import BIGINT
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class JobCheckpoint(Base):
+    """
+    Progress marker for long-running jobs, keyed by (job_name, delivery_date).
+    last_id = highest id whose work is fully committed.
+    """
+
+    __tablename__ = "job_checkpoints"
+    __table_args__ = (
+        {
+            "mysql_engine": "InnoDB",
+            "mysql_charset": "utf8mb4",
+            "mysql_collate": "utf8mb4_0900_ai_ci",
+        },
+    )
+
+    job_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    delivery_date: Mapped[date] = mapped_column(Date, primary_key=True)
+
+    last_id: Mapped[int] = mapped_column(BIGINT(unsigned=True), nullable=False)
+
+    updated_at: Mapped[datetime] = mapped_column(mysql.DATETIME(fsp=3), nullable=False)
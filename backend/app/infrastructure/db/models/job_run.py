@@ -0,0 +1,57 @@
+# app/infrastructure/db/models/job_run.py
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Any, Optional
+
+from sqlalchemy import JSON, Date, Index, String
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects.mysql import BIGINT, INTEGER, TINYINT
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class JobRun(Base):
+    """
+    One row per job run (generate / batch / lock / pipeline ...): timing,
+    summary counts and throughput, used to compare a run with recent history.
+    """
+
+    __tablename__ = "job_runs"
+    __table_args__ = (
+        Index("idx_job_runs_job_name_started_at", "job_name", "started_at"),
+        {
+            "mysql_engine": "InnoDB",
+            "mysql_charset": "utf8mb4",
+            "mysql_collate": "utf8mb4_0900_ai_ci",
+        },
+    )
+
+    id: Mapped[int] = mapped_column(BIGINT(unsigned=True), primary_key=True, autoincrement=True)
+
+    job_name: Mapped[str] = mapped_column(String(64), nullable=False)
+    delivery_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+
+    # 1=SUCCEEDED 2=FAILED (see job_run_repo)
+    status: Mapped[int] = mapped_column(TINYINT(unsigned=True), nullable=False)
+
+    started_at: Mapped[datetime] = mapped_column(mysql.DATETIME(fsp=3), nullable=False)
+    finished_at: Mapped[datetime] = mapped_column(mysql.DATETIME(fsp=3), nullable=False)
+    duration_ms: Mapped[int] = mapped_column(BIGINT(unsigned=True), nullable=False)
+
+    rows_processed: Mapped[int] = mapped_column(BIGINT(unsigned=True), nullable=False, server_default="0")
+    rows_per_second: Mapped[int] = mapped_column(BIGINT(unsigned=True), nullable=False, server_default="0")
+    error_count: Mapped[int] = mapped_column(INTEGER(unsigned=True), nullable=False, server_default="0")
+    error: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+
+    # python -m app.jobs metrics (NULL when not measured)
+    statements: Mapped[Optional[int]] = mapped_column(BIGINT(unsigned=True), nullable=True)
+    peak_rss_kb: Mapped[Optional[int]] = mapped_column(BIGINT(unsigned=True), nullable=True)
+
+    summary: Mapped[Optional[dict[str, Any]]] = mapped_column(JSON, nullable=True)
+
+    host: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    git_revision: Mapped[Optional[str]] = mapped_column(String(40), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(mysql.DATETIME(fsp=3), nullable=False)
@@ -0,0 +1,65 @@
+# app/infrastructure/db/models/job_work_item.py
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import Date, Index, String, UniqueConstraint
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects.mysql import BIGINT, INTEGER, TINYINT
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class JobWorkItem(Base):
+    """
+    Leased unit of job work (distributed workers).
+
+    - generate_orders: subscription id range [range_start, range_end]
+    - create_batches: one zone (range_start = range_end = zone_id, 0 = unzoned)
+
+    Workers claim pending / lease-expired rows with SELECT ... FOR UPDATE SKIP LOCKED,
+    extend lease_expires_at while working (heartbeat) and mark them done / failed.
+    """
+
+    __tablename__ = "job_work_items"
+    __table_args__ = (
+        UniqueConstraint(
+            "job_name",
+            "delivery_date",
+            "range_start",
+            name="uq_job_work_items_job_name_delivery_date_range_start",
+        ),
+        Index(
+            "idx_job_work_items_claim",
+            "job_name",
+            "delivery_date",
+            "status",
+            "lease_expires_at",
+        ),
+        {
+            "mysql_engine": "InnoDB",
+            "mysql_charset": "utf8mb4",
+            "mysql_collate": "utf8mb4_0900_ai_ci",
+        },
+    )
+
+    id: Mapped[int] = mapped_column(BIGINT(unsigned=True), primary_key=True, autoincrement=True)
+
+    job_name: Mapped[str] = mapped_column(String(64), nullable=False)
+    delivery_date: Mapped[date] = mapped_column(Date, nullable=False)
+
+    range_start: Mapped[int] = mapped_column(BIGINT(unsigned=True), nullable=False)
+    range_end: Mapped[int] = mapped_column(BIGINT(unsigned=True), nullable=False)
+
+    # 1=PENDING 2=LEASED 3=DONE 4=FAILED (see work_item_repo)
+    status: Mapped[int] = mapped_column(TINYINT(unsigned=True), nullable=False, server_default="1")
+    attempts: Mapped[int] = mapped_column(INTEGER, nullable=False, server_default="0")
+
+    lease_owner: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(mysql.DATETIME(fsp=3), nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(mysql.DATETIME(fsp=3), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(mysql.DATETIME(fsp=3), nullable=False)
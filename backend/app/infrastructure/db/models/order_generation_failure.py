@@ -0,0 +1,51 @@
+# app/infrastructure/db/models/order_generation_failure.py
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import Date, ForeignKey, Index, String, UniqueConstraint
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects.mysql import BIGINT, INTEGER
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class OrderGenerationFailure(Base):
+    """
+    Dead-letter row for generate_orders: one per (subscription, delivery_date).
+    resolved_at is set once a later run/retry generates the order.
+    """
+
+    __tablename__ = "order_generation_failures"
+    __table_args__ = (
+        UniqueConstraint(
+            "delivery_date",
+            "subscription_id",
+            name="uq_order_generation_failures_delivery_date_subscription_id",
+        ),
+        Index("idx_order_generation_failures_subscription_id", "subscription_id"),
+        {
+            "mysql_engine": "InnoDB",
+            "mysql_charset": "utf8mb4",
+            "mysql_collate": "utf8mb4_0900_ai_ci",
+        },
+    )
+
+    id: Mapped[int] = mapped_column(BIGINT(unsigned=True), primary_key=True, autoincrement=True)
+
+    subscription_id: Mapped[int] = mapped_column(
+        BIGINT(unsigned=True),
+        ForeignKey("subscriptions.id", name="fk_order_generation_failures_subscription_id"),
+        nullable=False,
+    )
+    delivery_date: Mapped[date] = mapped_column(Date, nullable=False)
+
+    reason_code: Mapped[str] = mapped_column(String(64), nullable=False)
+    attempts: Mapped[int] = mapped_column(INTEGER, nullable=False, server_default="1")
+
+    resolved_at: Mapped[Optional[datetime]] = mapped_column(mysql.DATETIME(fsp=3), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(mysql.DATETIME(fsp=3), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(mysql.DATETIME(fsp=3), nullable=False)
@@ -6,12 +6,25 @@ from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 
 
-def build_engine(database_url: str) -> Engine:
+def build_engine(
+    database_url: str,
+    pool_size: int | None = None,
+    max_overflow: int | None = None,
+    pool_recycle: int = 1800,
+    pool_timeout: int | None = None,
+) -> Engine:
+    # unset pool options keep SQLAlchemy's defaults (QueuePool 5 + 10 overflow, 30s timeout)
+    pool_options = {
+        key: value
+        for key, value in (("pool_size", pool_size), ("max_overflow", max_overflow), ("pool_timeout", pool_timeout))
+        if value is not None
+    }
     return create_engine(
         database_url,
         pool_pre_ping=True,
-        pool_recycle=1800,
+        pool_recycle=pool_recycle,
         future=True,
+        **pool_options,
     )
 
 
@@ -0,0 +1,37 @@
+# app/infrastructure/db/models/subscription_due_queue.py
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import Date, ForeignKey, Index
+from sqlalchemy.dialects.mysql import BIGINT
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class SubscriptionDueQueue(Base):
+    """
+    Compact schedule index: one row per schedulable subscription
+    (active, not paused/canceled/deleted, not past end_date) at its next_run_date.
+    PK (subscription_id): one row per subscription, upserts / removals by id.
+    (run_date, subscription_id) serves the due scan: one keyset range per
+    due run_date, so a page reads only due rows.
+    """
+
+    __tablename__ = "subscription_due_queue"
+    __table_args__ = (
+        Index("idx_subscription_due_queue_run_date_subscription_id", "run_date", "subscription_id"),
+        {
+            "mysql_engine": "InnoDB",
+            "mysql_charset": "utf8mb4",
+            "mysql_collate": "utf8mb4_0900_ai_ci",
+        },
+    )
+
+    subscription_id: Mapped[int] = mapped_column(
+        BIGINT(unsigned=True),
+        ForeignKey("subscriptions.id", name="fk_subscription_due_queue_subscription_id"),
+        primary_key=True,
+    )
+    run_date: Mapped[date] = mapped_column(Date, nullable=False)
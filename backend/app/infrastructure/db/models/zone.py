@@ -2,11 +2,11 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from sqlalchemy import Index, String, UniqueConstraint
 from sqlalchemy.dialects import mysql
-from sqlalchemy.dialects.mysql import BIGINT, TINYINT
+from sqlalchemy.dialects.mysql import BIGINT, INTEGER, TINYINT
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -29,6 +29,10 @@ class Zone(Base):
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     is_active: Mapped[int] = mapped_column(TINYINT(1), nullable=False, server_default="1")
 
+    # batch capacity (NULL → Settings.batch_max_orders / batch_max_items)
+    max_batch_orders: Mapped[Optional[int]] = mapped_column(INTEGER(unsigned=True), nullable=True)
+    max_batch_items: Mapped[Optional[int]] = mapped_column(INTEGER(unsigned=True), nullable=True)
+
     created_at: Mapped[datetime] = mapped_column(mysql.DATETIME(fsp=3), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(mysql.DATETIME(fsp=3), nullable=False)
 
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from sqlalchemy import select, and_
+from itertools import islice
+from typing import Iterable
+
+from sqlalchemy import select, and_, exists, func, insert, literal, update
 from sqlalchemy.orm import Session
 
 from app.infrastructure.db.models.delivery_batch import DeliveryBatch
 from app.infrastructure.db.models.order import Order
+from app.infrastructure.db.models.order_item import OrderItem
 from app.infrastructure.db.models.delivery_batch_order import DeliveryBatchOrder
 
 
@@ -13,6 +17,14 @@ from app.infrastructure.db.models.delivery_batch_order import DeliveryBatchOrder
 DELIVERY_BATCH_STATUS_OPEN = 1
 DELIVERY_BATCH_STATUS_LOCKED = 2
 
+# rows per attach INSERT: bounded statement size (max_allowed_packet) and parse cost
+ATTACH_ROWS_PER_INSERT = 1000
+
+
+def _to_millis(value: datetime) -> datetime:
+    # DATETIME(3) would round microseconds; truncate first so writes and reads agree
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
 
 class SqlAlchemyDeliveryBatchRepo:
     def __init__(self, session: Session) -> None:
@@ -59,6 +71,47 @@ class SqlAlchemyDeliveryBatchRepo:
         self.session.flush()
         return batch
 
+    def list_for_zone_for_update(self, delivery_date: date, zone_id: int | None) -> list[DeliveryBatch]:
+        """
+        All batches (open and locked) of (delivery_date, zone_id), oldest first, row-locked.
+        """
+        zone_cond = DeliveryBatch.zone_id.is_(None) if zone_id is None else DeliveryBatch.zone_id == zone_id
+        stmt = (
+            select(DeliveryBatch)
+            .where(and_(DeliveryBatch.delivery_date == delivery_date, zone_cond))
+            .order_by(DeliveryBatch.id.asc())
+            .with_for_update()
+        )
+        return list(self.session.execute(stmt).scalars().all())
+
+    def get_loads(self, batch_ids: list[int], with_items: bool = False) -> dict[int, tuple[int, int]]:
+        """
+        {batch_id: (orders, item quantity)}; item quantity is 0 unless with_items.
+        """
+        if not batch_ids:
+            return {}
+        loads = {bid: (0, 0) for bid in batch_ids}
+
+        stmt = (
+            select(DeliveryBatchOrder.batch_id, func.count())
+            .where(DeliveryBatchOrder.batch_id.in_(batch_ids))
+            .group_by(DeliveryBatchOrder.batch_id)
+        )
+        for bid, orders in self.session.execute(stmt).all():
+            loads[bid] = (int(orders), 0)
+
+        if with_items:
+            stmt = (
+                select(DeliveryBatchOrder.batch_id, func.sum(OrderItem.quantity))
+                .join(OrderItem, OrderItem.order_id == DeliveryBatchOrder.order_id)
+                .where(DeliveryBatchOrder.batch_id.in_(batch_ids))
+                .group_by(DeliveryBatchOrder.batch_id)
+            )
+            for bid, items in self.session.execute(stmt).all():
+                loads[bid] = (loads[bid][0], int(items or 0))
+
+        return loads
+
     def has_order(self, batch_id: int, order_id: int) -> bool:
         stmt = (
             select(DeliveryBatchOrder.order_id)
@@ -85,37 +138,154 @@ class SqlAlchemyDeliveryBatchRepo:
         )
         self.session.add(link)
 
-    def lock_due_batches(self, delivery_date: date, now: datetime) -> int:
+    def attach_orders(self, batch_id: int, order_ids: Iterable[int]) -> int:
+        """
+        Set-based idempotent attach: multi-row INSERT IGNORE of at most
+        ATTACH_ROWS_PER_INSERT rows each, so a huge batch never builds one
+        giant statement (or one giant list of row dicts).
+        Links already present (PK batch_id + order_id) are skipped by MySQL;
+        returns the number of links actually inserted.
         """
-        Lock all OPEN batches for delivery_date where now >= cutoff_at.
-        Idempotent and concurrency-safe: locks rows before updating.
+        now = datetime.utcnow()
+        ids = iter(order_ids)
+        attached = 0
+        while True:
+            rows = [
+                {"batch_id": batch_id, "order_id": oid, "created_at": now}
+                for oid in islice(ids, ATTACH_ROWS_PER_INSERT)
+            ]
+            if not rows:
+                return attached
+            stmt = insert(DeliveryBatchOrder.__table__).prefix_with("IGNORE").values(rows)
+            attached += int(self.session.execute(stmt).rowcount or 0)
+
+    def attach_unbatched_orders(self, batch_id: int, order_ids: Iterable[int]) -> int:
         """
-        # find candidate ids first (no lock)
-        ids_stmt = select(DeliveryBatch.id).where(
-            and_(
-                DeliveryBatch.delivery_date == delivery_date,
-                DeliveryBatch.status == DELIVERY_BATCH_STATUS_OPEN,
+        Guarded attach for callers that commit outside the zone lock: one
+        INSERT IGNORE ... SELECT that links only orders not in any batch yet,
+        and nothing at all once the batch is locked.
+        Returns the number of links actually inserted.
+        """
+        ids = list(order_ids)
+        if not ids:
+            return 0
+        linked = DeliveryBatchOrder.__table__.alias("linked")
+        rows = (
+            select(DeliveryBatch.id, Order.id, literal(datetime.utcnow(), DeliveryBatchOrder.created_at.type))
+            .select_from(DeliveryBatch)
+            .join(Order, Order.id.in_(ids))
+            .where(
+                DeliveryBatch.id == batch_id,
                 DeliveryBatch.locked_at.is_(None),
-                DeliveryBatch.cutoff_at <= now,
+                ~exists().where(linked.c.order_id == Order.id),
+            )
+        )
+        stmt = (
+            insert(DeliveryBatchOrder.__table__)
+            .prefix_with("IGNORE")
+            .from_select(["batch_id", "order_id", "created_at"], rows)
+        )
+        return int(self.session.execute(stmt).rowcount or 0)
+
+    def filter_unattached(self, order_ids: list[int]) -> list[int]:
+        """
+        The given order ids that are not attached to any batch (ascending).
+        """
+        if not order_ids:
+            return []
+        stmt = (
+            select(Order.id)
+            .where(Order.id.in_(order_ids), ~exists().where(DeliveryBatchOrder.order_id == Order.id))
+            .order_by(Order.id.asc())
+        )
+        return list(self.session.execute(stmt).scalars().all())
+
+    def sum_item_quantities_by_variant(self, batch_ids: list[int]) -> list[tuple[int, int]]:
+        """
+        [(variant_id, total quantity)] over all order lines of the given batches,
+        one GROUP BY, ordered by variant_id.
+        """
+        if not batch_ids:
+            return []
+        stmt = (
+            select(OrderItem.variant_id, func.sum(OrderItem.quantity))
+            .join(DeliveryBatchOrder, DeliveryBatchOrder.order_id == OrderItem.order_id)
+            .where(DeliveryBatchOrder.batch_id.in_(batch_ids))
+            .group_by(OrderItem.variant_id)
+            .order_by(OrderItem.variant_id.asc())
+        )
+        return [(variant_id, int(qty)) for variant_id, qty in self.session.execute(stmt).all()]
+
+    def list_upcoming_cutoffs(self, until: datetime, limit: int = 1000) -> list[tuple[date, datetime]]:
+        """
+        Distinct (delivery_date, cutoff_at) of OPEN, unlocked batches with cutoff_at <= until
+        (overdue ones included), earliest first. Served by idx_delivery_batches_status_cutoff_at.
+        """
+        stmt = (
+            select(DeliveryBatch.delivery_date, DeliveryBatch.cutoff_at)
+            .where(
+                and_(
+                    DeliveryBatch.status == DELIVERY_BATCH_STATUS_OPEN,
+                    DeliveryBatch.locked_at.is_(None),
+                    DeliveryBatch.cutoff_at <= until,
+                )
+            )
+            .group_by(DeliveryBatch.delivery_date, DeliveryBatch.cutoff_at)
+            .order_by(DeliveryBatch.cutoff_at.asc())
+            .limit(limit)
+        )
+        return [(d, cutoff) for d, cutoff in self.session.execute(stmt).all()]
+
+    def lock_due_batches(self, delivery_date: date, now: datetime) -> int:
+        """
+        Lock all OPEN batches for delivery_date where now >= cutoff_at;
+        returns how many this call locked (see lock_due_batch_ids).
+        """
+        return len(self.lock_due_batch_ids(delivery_date, now))
+
+    def lock_due_batch_ids(
+        self,
+        delivery_date: date,
+        now: datetime,
+        limit: int | None = None,
+        skip_locked: bool = False,
+    ) -> list[int]:
+        """
+        Lock due batches (lowest ids first, at most `limit`) and return the ids
+        locked by this call.
+
+        SELECT ... FOR UPDATE on the due rows, then one UPDATE by id. The ids
+        are the rows taken under the row lock, so a batch locked earlier by
+        another caller (even with the same `now`) is never returned.
+        skip_locked=True skips rows another transaction holds, so concurrent
+        chunked lockers take disjoint chunks instead of waiting.
+        """
+        now = _to_millis(now)
+        due = and_(
+            DeliveryBatch.delivery_date == delivery_date,
+            DeliveryBatch.status == DELIVERY_BATCH_STATUS_OPEN,
+            DeliveryBatch.locked_at.is_(None),
+            DeliveryBatch.cutoff_at <= now,
+        )
+        stmt = (
+            select(DeliveryBatch.id)
+            .where(due)
+            .order_by(DeliveryBatch.id.asc())
+            .with_for_update(skip_locked=skip_locked)
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        ids = list(self.session.execute(stmt).scalars())
+        if not ids:
+            return []
+        self.session.execute(
+            update(DeliveryBatch)
+            .where(DeliveryBatch.id.in_(ids))
+            .values(
+                locked_at=now,
+                status=DELIVERY_BATCH_STATUS_LOCKED,
+                updated_at=datetime.utcnow(),
             )
+            .execution_options(synchronize_session=False)
         )
-        ids = [r[0] for r in self.session.execute(ids_stmt).all()]
-
-        locked = 0
-        for bid in ids:
-            stmt = select(DeliveryBatch).where(DeliveryBatch.id == bid).with_for_update()
-            batch = self.session.execute(stmt).scalar_one_or_none()
-            if not batch:
-                continue
-            if batch.locked_at is not None:
-                continue
-            if batch.cutoff_at > now:
-                continue
-
-            batch.locked_at = now
-            batch.status = DELIVERY_BATCH_STATUS_LOCKED
-            batch.updated_at = datetime.utcnow()
-            self.session.add(batch)
-            locked += 1
-
-        return locked
+        return ids
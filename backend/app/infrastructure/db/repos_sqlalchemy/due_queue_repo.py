@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import heapq
+from datetime import date
+
+from sqlalchemy import and_, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models.subscription import Subscription
+from app.infrastructure.db.models.subscription_due_queue import SubscriptionDueQueue
+from app.infrastructure.db.repos_sqlalchemy.subscription_repo import schedulable_subscription_filter
+
+
+class SqlAlchemyDueQueueRepo:
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def list_due_ids(
+        self,
+        cycle_date: date,
+        limit: int,
+        after_id: int = 0,
+        shard: tuple[int, int] | None = None,
+    ) -> list[int]:
+        """
+        Keyset page of due subscription ids read from the queue only
+        (same contract as SubscriptionRepo.list_due_active_ids).
+
+        Index-driven on (run_date, subscription_id): the due run_dates
+        (cycle_date + any overdue ones, a handful) come from the index, then
+        each date is one keyset range of at most `limit` ids; the smallest
+        `limit` ids across dates form the page. Rows not yet due are never read.
+        """
+        run_dates = self.session.execute(
+            select(SubscriptionDueQueue.run_date)
+            .where(SubscriptionDueQueue.run_date <= cycle_date)
+            .group_by(SubscriptionDueQueue.run_date)
+        ).scalars().all()
+
+        ids: list[int] = []
+        for run_date in run_dates:
+            cond = [
+                SubscriptionDueQueue.run_date == run_date,
+                SubscriptionDueQueue.subscription_id > after_id,
+            ]
+            if shard is not None:
+                shard_index, shard_count = shard
+                cond.append(SubscriptionDueQueue.subscription_id % shard_count == shard_index)
+
+            stmt = (
+                select(SubscriptionDueQueue.subscription_id)
+                .where(and_(*cond))
+                .order_by(SubscriptionDueQueue.subscription_id.asc())
+                .limit(limit)
+            )
+            ids.extend(self.session.execute(stmt).scalars().all())
+        return heapq.nsmallest(limit, ids)
+
+    def sync(self, subscription_id: int) -> None:
+        """
+        Re-derive the subscription's queue row from its (flushed) subscriptions row:
+        queued at next_run_date when it passes schedulable_subscription_filter,
+        dropped otherwise. Same predicate as list_due_active_ids / rebuild.
+        """
+        self.remove_many([subscription_id])
+        stmt = insert(SubscriptionDueQueue.__table__).from_select(
+            ["run_date", "subscription_id"],
+            select(Subscription.next_run_date, Subscription.id).where(
+                and_(Subscription.id == subscription_id, *schedulable_subscription_filter())
+            ),
+        )
+        self.session.execute(stmt)
+
+    def reschedule(self, subscription_ids: list[int], from_date: date, to_date: date) -> int:
+        if not subscription_ids:
+            return 0
+        stmt = (
+            update(SubscriptionDueQueue)
+            .where(
+                and_(
+                    SubscriptionDueQueue.subscription_id.in_(subscription_ids),
+                    SubscriptionDueQueue.run_date == from_date,
+                )
+            )
+            .values(run_date=to_date)
+            .execution_options(synchronize_session=False)
+        )
+        return int(self.session.execute(stmt).rowcount or 0)
+
+    def remove_many(self, subscription_ids: list[int]) -> int:
+        if not subscription_ids:
+            return 0
+        stmt = delete(SubscriptionDueQueue).where(SubscriptionDueQueue.subscription_id.in_(subscription_ids))
+        return int(self.session.execute(stmt.execution_options(synchronize_session=False)).rowcount or 0)
+
+    # ---------- consistency ----------
+
+    def count_missing(self) -> int:
+        """
+        Schedulable subscriptions with no queue row at their next_run_date.
+        """
+        stmt = (
+            select(func.count())
+            .select_from(Subscription)
+            .outerjoin(
+                SubscriptionDueQueue,
+                and_(
+                    SubscriptionDueQueue.subscription_id == Subscription.id,
+                    SubscriptionDueQueue.run_date == Subscription.next_run_date,
+                ),
+            )
+            .where(and_(*schedulable_subscription_filter(), SubscriptionDueQueue.subscription_id.is_(None)))
+        )
+        return int(self.session.execute(stmt).scalar_one())
+
+    def count_stale(self) -> int:
+        """
+        Queue rows that do not match a schedulable subscription at that date.
+        """
+        stmt = (
+            select(func.count())
+            .select_from(SubscriptionDueQueue)
+            .outerjoin(
+                Subscription,
+                and_(
+                    Subscription.id == SubscriptionDueQueue.subscription_id,
+                    Subscription.next_run_date == SubscriptionDueQueue.run_date,
+                    *schedulable_subscription_filter(),
+                ),
+            )
+            .where(Subscription.id.is_(None))
+        )
+        return int(self.session.execute(stmt).scalar_one())
+
+    def rebuild(self) -> int:
+        """
+        Replace the queue with one row per schedulable subscription (DELETE + INSERT ... SELECT).
+        Returns the number of queued subscriptions.
+        """
+        self.session.execute(delete(SubscriptionDueQueue).execution_options(synchronize_session=False))
+        stmt = insert(SubscriptionDueQueue.__table__).from_select(
+            ["run_date", "subscription_id"],
+            select(Subscription.next_run_date, Subscription.id).where(and_(*schedulable_subscription_filter())),
+        )
+        return int(self.session.execute(stmt).rowcount or 0)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models.order_generation_failure import OrderGenerationFailure
+
+
+class SqlAlchemyGenerationFailureRepo:
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def record_many(self, delivery_date: date, failures: list[tuple[int, str]]) -> None:
+        """
+        Upsert (subscription_id, reason_code) failures for delivery_date.
+        A repeated failure bumps attempts and re-opens the row.
+        """
+        if not failures:
+            return
+        now = datetime.utcnow()
+        table = OrderGenerationFailure.__table__
+        stmt = mysql_insert(table).values(
+            [
+                {
+                    "subscription_id": subscription_id,
+                    "delivery_date": delivery_date,
+                    "reason_code": reason_code[:64],
+                    "attempts": 1,
+                    "resolved_at": None,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for subscription_id, reason_code in failures
+            ]
+        )
+        stmt = stmt.on_duplicate_key_update(
+            reason_code=stmt.inserted.reason_code,
+            attempts=table.c.attempts + 1,
+            resolved_at=None,
+            updated_at=stmt.inserted.updated_at,
+        )
+        self.session.execute(stmt)
+
+    def resolve_many(self, delivery_date: date, subscription_ids: list[int]) -> int:
+        if not subscription_ids:
+            return 0
+        now = datetime.utcnow()
+        stmt = (
+            update(OrderGenerationFailure)
+            .where(
+                and_(
+                    OrderGenerationFailure.delivery_date == delivery_date,
+                    OrderGenerationFailure.subscription_id.in_(subscription_ids),
+                    OrderGenerationFailure.resolved_at.is_(None),
+                )
+            )
+            .values(resolved_at=now, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        return int(self.session.execute(stmt).rowcount or 0)
+
+    def has_unresolved(self, delivery_date: date) -> bool:
+        stmt = (
+            select(OrderGenerationFailure.subscription_id)
+            .where(
+                and_(
+                    OrderGenerationFailure.delivery_date == delivery_date,
+                    OrderGenerationFailure.resolved_at.is_(None),
+                )
+            )
+            .limit(1)
+        )
+        return self.session.execute(stmt).first() is not None
+
+    def list_unresolved_ids(
+        self,
+        delivery_date: date,
+        limit: int,
+        after_id: int = 0,
+        shard: tuple[int, int] | None = None,
+    ) -> list[int]:
+        """
+        Keyset page of failed subscription ids for delivery_date (targeted retry).
+        shard=(index, count) keeps only ids where id % count == index.
+        """
+        cond = [
+            OrderGenerationFailure.delivery_date == delivery_date,
+            OrderGenerationFailure.resolved_at.is_(None),
+            OrderGenerationFailure.subscription_id > after_id,
+        ]
+        if shard is not None:
+            shard_index, shard_count = shard
+            cond.append(OrderGenerationFailure.subscription_id % shard_count == shard_index)
+
+        stmt = (
+            select(OrderGenerationFailure.subscription_id)
+            .where(and_(*cond))
+            .order_by(OrderGenerationFailure.subscription_id.asc())
+            .limit(limit)
+        )
+        return list(self.session.execute(stmt).scalars().all())
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models.inventory import Inventory
+
+
+class SqlAlchemyInventoryRepo:
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def reserve(self, variant_id: int, quantity: int) -> bool:
+        """
+        Conditional reserve: qty_reserved += quantity only if that much is available
+        (qty_on_hand - qty_reserved >= quantity). False = shortfall (or no inventory row).
+        """
+        stmt = (
+            update(Inventory)
+            .where(
+                and_(
+                    Inventory.variant_id == variant_id,
+                    Inventory.qty_on_hand - Inventory.qty_reserved >= quantity,
+                )
+            )
+            .values(
+                qty_reserved=Inventory.qty_reserved + quantity,
+                updated_at=datetime.utcnow(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return bool(self.session.execute(stmt).rowcount)
+
+    def get_available(self, variant_ids: list[int]) -> dict[int, int]:
+        """
+        {variant_id: qty_on_hand - qty_reserved}; variants without a row are missing.
+        """
+        if not variant_ids:
+            return {}
+        stmt = select(Inventory.variant_id, Inventory.qty_on_hand - Inventory.qty_reserved).where(
+            Inventory.variant_id.in_(variant_ids)
+        )
+        return {variant_id: int(available) for variant_id, available in self.session.execute(stmt).all()}
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models.job_checkpoint import JobCheckpoint
+
+
+class SqlAlchemyJobCheckpointRepo:
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def get_last_id(self, job_name: str, delivery_date: date) -> int | None:
+        stmt = select(JobCheckpoint.last_id).where(
+            and_(
+                JobCheckpoint.job_name == job_name,
+                JobCheckpoint.delivery_date == delivery_date,
+            )
+        )
+        return self.session.execute(stmt).scalar_one_or_none()
+
+    def save(self, job_name: str, delivery_date: date, last_id: int) -> None:
+        """
+        Upsert the checkpoint (one statement per page).
+        """
+        now = datetime.utcnow()
+        stmt = mysql_insert(JobCheckpoint.__table__).values(
+            job_name=job_name,
+            delivery_date=delivery_date,
+            last_id=last_id,
+            updated_at=now,
+        )
+        stmt = stmt.on_duplicate_key_update(
+            last_id=stmt.inserted.last_id,
+            updated_at=stmt.inserted.updated_at,
+        )
+        self.session.execute(stmt)
+
+    def advance(self, job_name: str, delivery_date: date, last_id: int) -> None:
+        """
+        Upsert that only moves the checkpoint forward:
+        ON DUPLICATE KEY UPDATE last_id = GREATEST(last_id, new last_id).
+        One atomic statement, so concurrent writers can never move it back.
+        """
+        now = datetime.utcnow()
+        table = JobCheckpoint.__table__
+        stmt = mysql_insert(table).values(
+            job_name=job_name,
+            delivery_date=delivery_date,
+            last_id=last_id,
+            updated_at=now,
+        )
+        stmt = stmt.on_duplicate_key_update(
+            last_id=func.greatest(table.c.last_id, stmt.inserted.last_id),
+            updated_at=stmt.inserted.updated_at,
+        )
+        self.session.execute(stmt)
+
+    def clear(self, job_name: str, delivery_date: date) -> None:
+        stmt = delete(JobCheckpoint).where(
+            and_(
+                JobCheckpoint.job_name == job_name,
+                JobCheckpoint.delivery_date == delivery_date,
+            )
+        )
+        self.session.execute(stmt)
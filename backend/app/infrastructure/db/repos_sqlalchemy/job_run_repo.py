@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import and_, insert, select
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models.job_run import JobRun
+
+
+JOB_RUN_STATUS_SUCCEEDED = 1
+JOB_RUN_STATUS_FAILED = 2
+
+
+class SqlAlchemyJobRunRepo:
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def add(self, values: dict[str, Any]) -> int:
+        result = self.session.execute(insert(JobRun.__table__).values(**values))
+        return int(result.inserted_primary_key[0])
+
+    def list_recent(self, job_name: str, limit: int = 20, status: int | None = None) -> list[JobRun]:
+        """
+        Latest runs of job_name first (idx_job_runs_job_name_started_at).
+        """
+        conditions = [JobRun.job_name == job_name]
+        if status is not None:
+            conditions.append(JobRun.status == status)
+        stmt = select(JobRun).where(and_(*conditions)).order_by(JobRun.started_at.desc()).limit(limit)
+        return list(self.session.execute(stmt).scalars().all())
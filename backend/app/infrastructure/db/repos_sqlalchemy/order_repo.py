@@ -1,10 +1,23 @@
 # app/infrastructure/repos_sqlalchemy/order_repo.py
 from __future__ import annotations
 
-from sqlalchemy import select
+from datetime import date
+from typing import Any, Iterator
+
+from sqlalchemy import and_, exists, func, insert, literal, or_, select, update
 from sqlalchemy.orm import Session
 
+from app.infrastructure.db.models.address import Address
+from app.infrastructure.db.models.delivery_batch_order import DeliveryBatchOrder
 from app.infrastructure.db.models.order import Order
+from app.infrastructure.db.models.order_item import OrderItem
+
+
+def _zone_filter(zone_ids: list[int | None]):
+    ids = [zone_id for zone_id in zone_ids if zone_id is not None]
+    if None in zone_ids:
+        return or_(Order.zone_id.in_(ids), Order.zone_id.is_(None)) if ids else Order.zone_id.is_(None)
+    return Order.zone_id.in_(ids)
 
 
 class SqlAlchemyOrderRepo:
@@ -17,3 +30,187 @@ class SqlAlchemyOrderRepo:
 
     def add(self, order: Order) -> None:
         self.session.add(order)
+
+    # ---------- Core helpers (generation hot path) ----------
+
+    def insert_one(self, values: dict[str, Any]) -> int:
+        """
+        Core INSERT of one order (no identity-map bookkeeping). Returns orders.id.
+        """
+        result = self.session.execute(insert(Order.__table__).values(**values))
+        return int(result.inserted_primary_key[0])
+
+    def list_existing_generated_keys(self, generated_keys: list[str]) -> set[str]:
+        if not generated_keys:
+            return set()
+        stmt = select(Order.generated_key).where(Order.generated_key.in_(generated_keys))
+        return {r[0] for r in self.session.execute(stmt).all()}
+
+    def get_ids_by_generated_keys(self, generated_keys: list[str]) -> dict[str, int]:
+        if not generated_keys:
+            return {}
+        stmt = select(Order.generated_key, Order.id).where(Order.generated_key.in_(generated_keys))
+        return {key: oid for key, oid in self.session.execute(stmt).all()}
+
+    def insert_ignore_many(self, rows: list[dict[str, Any]]) -> int:
+        """
+        Multi-row INSERT IGNORE into orders.
+        Duplicates on uq_orders_generated_key are skipped by MySQL;
+        returns the number of rows actually inserted.
+        """
+        if not rows:
+            return 0
+        stmt = insert(Order.__table__).prefix_with("IGNORE").values(rows)
+        return int(self.session.execute(stmt).rowcount or 0)
+
+    def insert_items_ignore_many(self, rows: list[dict[str, Any]]) -> int:
+        """
+        Multi-row INSERT IGNORE into order_items (idempotent on order_id + variant_id).
+        """
+        if not rows:
+            return 0
+        stmt = insert(OrderItem.__table__).prefix_with("IGNORE").values(rows)
+        return int(self.session.execute(stmt).rowcount or 0)
+
+    # ---------- batching (read side) ----------
+
+    def iter_unbatched(
+        self,
+        delivery_date: date,
+        status: int,
+        with_item_counts: bool = False,
+        chunk_size: int = 2000,
+        after_id: int = 0,
+        zone_ids: list[int | None] | None = None,
+    ) -> Iterator[tuple[int, int | None, int]]:
+        """
+        Stream (order id, zone_id, item quantity) for orders of delivery_date in
+        `status` that are not attached to any batch yet (only ids > after_id).
+        Column projection + yield_per (server-side cursor): no ORM entities,
+        nothing kept in the identity map. Item quantity is 0 unless with_item_counts.
+        zone_ids restricts to those zones (None in the list = unzoned orders).
+        """
+        if with_item_counts:
+            items = func.coalesce(
+                select(func.sum(OrderItem.quantity)).where(OrderItem.order_id == Order.id).scalar_subquery(),
+                0,
+            )
+        else:
+            items = literal(0)
+
+        conditions = [
+            Order.delivery_date == delivery_date,
+            Order.status == status,
+            Order.id > after_id,
+            ~exists().where(DeliveryBatchOrder.order_id == Order.id),
+        ]
+        if zone_ids is not None:
+            conditions.append(_zone_filter(zone_ids))
+
+        stmt = (
+            select(Order.id, Order.zone_id, items)
+            .where(and_(*conditions))
+            .order_by(Order.id.asc())
+            .execution_options(yield_per=chunk_size)
+        )
+        for order_id, zone_id, item_qty in self.session.execute(stmt):
+            yield order_id, zone_id, int(item_qty)
+
+    def list_unbatched_zone_ids(self, delivery_date: date, status: int) -> list[int | None]:
+        """
+        Distinct zone_id of unbatched orders for delivery_date (None = unzoned), one GROUP BY.
+        """
+        stmt = (
+            select(Order.zone_id)
+            .where(
+                and_(
+                    Order.delivery_date == delivery_date,
+                    Order.status == status,
+                    ~exists().where(DeliveryBatchOrder.order_id == Order.id),
+                )
+            )
+            .group_by(Order.zone_id)
+        )
+        return [zone_id for (zone_id,) in self.session.execute(stmt).all()]
+
+    def list_subscription_ids_with_order(self, delivery_date: date, subscription_ids: list[int]) -> set[int]:
+        """
+        The given subscriptions that already have an order for delivery_date
+        (idx_orders_subscription_id_delivery_date).
+        """
+        if not subscription_ids:
+            return set()
+        stmt = select(Order.subscription_id).where(
+            and_(Order.subscription_id.in_(subscription_ids), Order.delivery_date == delivery_date)
+        )
+        return set(self.session.execute(stmt).scalars().all())
+
+    def list_unbatched_for_subscriptions(
+        self,
+        delivery_date: date,
+        subscription_ids: list[int],
+        status: int,
+        with_item_counts: bool = False,
+    ) -> list[tuple[int, int | None, int]]:
+        """
+        (order id, zone_id, item quantity) of the given subscriptions' orders for
+        delivery_date that are still unbatched. Narrow read on
+        idx_orders_subscription_id_delivery_date (one generation page at a time).
+        """
+        if not subscription_ids:
+            return []
+        items = (
+            func.coalesce(
+                select(func.sum(OrderItem.quantity)).where(OrderItem.order_id == Order.id).scalar_subquery(),
+                0,
+            )
+            if with_item_counts
+            else literal(0)
+        )
+        stmt = (
+            select(Order.id, Order.zone_id, items)
+            .where(
+                and_(
+                    Order.subscription_id.in_(subscription_ids),
+                    Order.delivery_date == delivery_date,
+                    Order.status == status,
+                    ~exists().where(DeliveryBatchOrder.order_id == Order.id),
+                )
+            )
+            .order_by(Order.id.asc())
+        )
+        return [(order_id, zone_id, int(item_qty)) for order_id, zone_id, item_qty in self.session.execute(stmt)]
+
+    def assign_zones_from_shipping_address(
+        self,
+        delivery_date: date,
+        zone_ids: list[int],
+        after_id: int = 0,
+        subscription_ids: list[int] | None = None,
+    ) -> int:
+        """
+        One multi-table UPDATE: orders.zone_id = addresses.zone_id (shipping address)
+        for orders of delivery_date (id > after_id) that have no zone yet, are not
+        attached to any batch, and whose address zone is in zone_ids. Returns matched rows.
+        subscription_ids narrows the update to those subscriptions' orders.
+        """
+        if not zone_ids or subscription_ids == []:
+            return 0
+        already_batched = exists().where(DeliveryBatchOrder.order_id == Order.id)
+        conditions = [
+            Order.shipping_address_id == Address.id,
+            Order.delivery_date == delivery_date,
+            Order.id > after_id,
+            Order.zone_id.is_(None),
+            Address.zone_id.in_(zone_ids),
+            ~already_batched,
+        ]
+        if subscription_ids is not None:
+            conditions.append(Order.subscription_id.in_(subscription_ids))
+        stmt = (
+            update(Order)
+            .where(and_(*conditions))
+            .values(zone_id=Address.zone_id)
+            .execution_options(synchronize_session=False)
+        )
+        return int(self.session.execute(stmt).rowcount or 0)
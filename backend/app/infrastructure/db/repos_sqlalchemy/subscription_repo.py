@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from datetime import date
-from sqlalchemy import select, and_
-from sqlalchemy.orm import Session
+from datetime import date, datetime
+from sqlalchemy import select, and_, or_, update, extract, func
+from sqlalchemy.orm import Session, selectinload
 
+from app.infrastructure.db.models.address import Address
+from app.infrastructure.db.models.plan import Plan
 from app.infrastructure.db.models.subscription import Subscription
+from app.infrastructure.db.models.subscription_item import SubscriptionItem
 
 
 # NOTE: ค่า status “ACTIVE” ต้องตรงกับระบบคุณ
@@ -12,6 +15,32 @@ from app.infrastructure.db.models.subscription import Subscription
 SUBSCRIPTION_STATUS_ACTIVE = 1
 
 
+def schedulable_subscription_filter() -> list:
+    """
+    WHERE conditions for subscriptions that should receive orders
+    (everything except the next_run_date window). Shared with the due queue.
+    """
+    return [
+        Subscription.status == SUBSCRIPTION_STATUS_ACTIVE,
+        Subscription.paused_at.is_(None),
+        Subscription.canceled_at.is_(None),
+        Subscription.deleted_at.is_(None),
+        or_(Subscription.end_date.is_(None), Subscription.next_run_date <= Subscription.end_date),
+    ]
+
+
+def _schedule_cohort_columns() -> list:
+    # subscriptions with the same columns below get orders on exactly the same dates
+    return [
+        Subscription.next_run_date,
+        extract("day", Subscription.start_date),
+        Subscription.end_date,
+        Plan.interval_unit,
+        Plan.interval_count,
+        Address.zone_id,
+    ]
+
+
 class SqlAlchemySubscriptionRepo:
     def __init__(self, session: Session) -> None:
         self.session = session
@@ -28,16 +57,46 @@ class SqlAlchemySubscriptionRepo:
         )
         return self.session.execute(stmt).scalar_one_or_none()
 
+    def lock_many_by_ids(self, subscription_ids: list[int]) -> list[Subscription]:
+        """
+        Lock a page of subscriptions in one statement.
+        Ordered by id so concurrent jobs always take row locks in the same order.
+        """
+        if not subscription_ids:
+            return []
+        stmt = (
+            select(Subscription)
+            .where(Subscription.id.in_(subscription_ids))
+            .order_by(Subscription.id.asc())
+            .with_for_update()
+        )
+        return list(self.session.execute(stmt).scalars().all())
+
+    def list_items_with_variants(self, subscription_ids: list[int]) -> dict[int, list[SubscriptionItem]]:
+        """
+        Load items (+ ProductVariant) for many subscriptions with batched IN queries.
+        Returns {subscription_id: [items...]} ordered by item id.
+        """
+        if not subscription_ids:
+            return {}
+        stmt = (
+            select(SubscriptionItem)
+            .where(SubscriptionItem.subscription_id.in_(subscription_ids))
+            .options(selectinload(SubscriptionItem.variant))
+            .order_by(SubscriptionItem.id.asc())
+        )
+        items_by_sub: dict[int, list[SubscriptionItem]] = {}
+        for si in self.session.execute(stmt).scalars().all():
+            items_by_sub.setdefault(si.subscription_id, []).append(si)
+        return items_by_sub
+
     def list_due_active(self, cycle_date: date, limit: int, offset: int = 0) -> list[Subscription]:
         stmt = (
             select(Subscription)
             .where(
                 and_(
-                    Subscription.status == SUBSCRIPTION_STATUS_ACTIVE,
                     Subscription.next_run_date <= cycle_date,
-                    Subscription.paused_at.is_(None),
-                    Subscription.canceled_at.is_(None),
-                    Subscription.deleted_at.is_(None),
+                    *schedulable_subscription_filter(),
                 )
             )
             .order_by(Subscription.id.asc())
@@ -45,3 +104,131 @@ class SqlAlchemySubscriptionRepo:
             .offset(offset)
         )
         return list(self.session.execute(stmt).scalars().all())
+
+    def list_due_active_ids(
+        self,
+        cycle_date: date,
+        limit: int,
+        after_id: int = 0,
+        shard: tuple[int, int] | None = None,
+    ) -> list[int]:
+        """
+        Keyset page of due subscription ids: WHERE id > :after_id ORDER BY id LIMIT :limit.
+        Cost per page stays flat (no OFFSET rescans) and rows changing under
+        the job cannot shift later pages.
+
+        shard=(index, count) keeps only ids where id % count == index, so
+        several workers can split the due set into disjoint slices.
+        """
+        cond = [
+            Subscription.next_run_date <= cycle_date,
+            *schedulable_subscription_filter(),
+            Subscription.id > after_id,
+        ]
+        if shard is not None:
+            shard_index, shard_count = shard
+            cond.append(Subscription.id % shard_count == shard_index)
+
+        stmt = (
+            select(Subscription.id)
+            .where(and_(*cond))
+            .order_by(Subscription.id.asc())
+            .limit(limit)
+        )
+        return list(self.session.execute(stmt).scalars().all())
+
+    def list_schedule_rows(
+        self,
+        subscription_ids: list[int],
+        cycle_date: date,
+    ) -> list[tuple[int, date, date, date | None, str, int]]:
+        """
+        (id, next_run_date, start_date, end_date, plan.interval_unit, plan.interval_count)
+        for subscriptions still due on cycle_date (not advanced yet).
+        """
+        if not subscription_ids:
+            return []
+        stmt = (
+            select(
+                Subscription.id,
+                Subscription.next_run_date,
+                Subscription.start_date,
+                Subscription.end_date,
+                Plan.interval_unit,
+                Plan.interval_count,
+            )
+            .join(Plan, Plan.id == Subscription.plan_id)
+            .where(
+                and_(
+                    Subscription.id.in_(subscription_ids),
+                    Subscription.next_run_date <= cycle_date,
+                )
+            )
+            .order_by(Subscription.id.asc())
+        )
+        return [tuple(row) for row in self.session.execute(stmt).all()]
+
+    def advance_next_run_date(self, subscription_ids: list[int], from_date: date, to_date: date) -> int:
+        """
+        Set next_run_date = to_date for subscriptions still at from_date
+        (a concurrent change to next_run_date wins). Returns matched rows.
+        """
+        if not subscription_ids:
+            return 0
+        stmt = (
+            update(Subscription)
+            .where(
+                and_(
+                    Subscription.id.in_(subscription_ids),
+                    Subscription.next_run_date == from_date,
+                )
+            )
+            .values(next_run_date=to_date, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        return int(self.session.execute(stmt).rowcount or 0)
+
+    # ---------- forecast (read-only aggregates) ----------
+
+    def _cohort_select(self, until_date: date, *extra):
+        cohort = _schedule_cohort_columns()
+        return (
+            select(*cohort, *extra)
+            .join(Plan, Plan.id == Subscription.plan_id)
+            .join(Address, Address.id == Subscription.default_address_id)
+            .where(
+                and_(
+                    Subscription.next_run_date <= until_date,
+                    *schedulable_subscription_filter(),
+                )
+            )
+            .group_by(*cohort)
+        )
+
+    def list_schedule_cohorts(self, until_date: date) -> list[tuple]:
+        """
+        Schedulable subscriptions due on or before until_date, grouped by schedule:
+        (next_run_date, anchor_day, end_date, interval_unit, interval_count, zone_id, subscriptions).
+        Subscriptions without a default address are left out (they cannot generate).
+        """
+        stmt = self._cohort_select(until_date, func.count(Subscription.id))
+        return [tuple(row) for row in self.session.execute(stmt).all()]
+
+    def list_schedule_cohort_items(self, until_date: date) -> list[tuple]:
+        """
+        Active item totals per schedule cohort and variant:
+        (next_run_date, anchor_day, end_date, interval_unit, interval_count, zone_id,
+         variant_id, quantity, amount).
+        """
+        stmt = (
+            self._cohort_select(
+                until_date,
+                SubscriptionItem.variant_id,
+                func.sum(SubscriptionItem.quantity),
+                func.sum(SubscriptionItem.quantity * SubscriptionItem.unit_amount),
+            )
+            .join(SubscriptionItem, SubscriptionItem.subscription_id == Subscription.id)
+            .where(and_(SubscriptionItem.is_active == 1, SubscriptionItem.quantity > 0))
+            .group_by(SubscriptionItem.variant_id)
+        )
+        return [tuple(row) for row in self.session.execute(stmt).all()]
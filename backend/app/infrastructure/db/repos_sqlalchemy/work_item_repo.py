@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models.job_work_item import JobWorkItem
+
+
+WORK_ITEM_STATUS_PENDING = 1
+WORK_ITEM_STATUS_LEASED = 2
+WORK_ITEM_STATUS_DONE = 3
+WORK_ITEM_STATUS_FAILED = 4
+
+
+class SqlAlchemyWorkItemRepo:
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def enqueue_many(self, job_name: str, delivery_date: date, ranges: Iterable[tuple[int, int]]) -> int:
+        """
+        Multi-row INSERT IGNORE of (range_start, range_end) units.
+        Re-enqueueing the same range_start is a no-op (uq on job/date/range_start).
+        """
+        now = datetime.utcnow()
+        rows = [
+            {
+                "job_name": job_name,
+                "delivery_date": delivery_date,
+                "range_start": start,
+                "range_end": end,
+                "status": WORK_ITEM_STATUS_PENDING,
+                "attempts": 0,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for start, end in ranges
+        ]
+        if not rows:
+            return 0
+        stmt = insert(JobWorkItem.__table__).prefix_with("IGNORE").values(rows)
+        return int(self.session.execute(stmt).rowcount or 0)
+
+    def reopen_done(self, job_name: str, delivery_date: date, range_starts: list[int]) -> int:
+        """
+        DONE items with the given range_start back to PENDING (attempts reset),
+        for units that have new work after they were finished.
+        """
+        if not range_starts:
+            return 0
+        stmt = (
+            update(JobWorkItem)
+            .where(
+                and_(
+                    JobWorkItem.job_name == job_name,
+                    JobWorkItem.delivery_date == delivery_date,
+                    JobWorkItem.range_start.in_(range_starts),
+                    JobWorkItem.status == WORK_ITEM_STATUS_DONE,
+                )
+            )
+            .values(status=WORK_ITEM_STATUS_PENDING, attempts=0, last_error=None, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        return int(self.session.execute(stmt).rowcount or 0)
+
+    def claim(
+        self,
+        job_name: str,
+        delivery_date: date,
+        owner: str,
+        limit: int,
+        lease_seconds: float,
+        now: datetime,
+        max_attempts: int | None = None,
+    ) -> list[tuple[int, int, int, int]]:
+        """
+        Lease up to `limit` pending (or lease-expired) items to `owner`.
+        SELECT ... FOR UPDATE SKIP LOCKED: concurrent workers skip each other's
+        candidate rows instead of waiting, so every item goes to one worker.
+        Returns [(id, range_start, range_end, attempts incl. this one)];
+        commit right after to publish the lease.
+
+        Candidates that already used max_attempts (e.g. a lease that expired
+        because the process crashed on the item every time) are set FAILED
+        instead of being leased again.
+        """
+        claimable = or_(
+            JobWorkItem.status == WORK_ITEM_STATUS_PENDING,
+            and_(
+                JobWorkItem.status == WORK_ITEM_STATUS_LEASED,
+                JobWorkItem.lease_expires_at < now,
+            ),
+        )
+        stmt = (
+            select(JobWorkItem.id, JobWorkItem.range_start, JobWorkItem.range_end, JobWorkItem.attempts)
+            .where(
+                and_(
+                    JobWorkItem.job_name == job_name,
+                    JobWorkItem.delivery_date == delivery_date,
+                    claimable,
+                )
+            )
+            .order_by(JobWorkItem.id.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        items = []
+        exhausted = []
+        for item_id, start, end, attempts in self.session.execute(stmt).all():
+            if max_attempts is not None and attempts >= max_attempts:
+                exhausted.append(item_id)
+            else:
+                items.append((item_id, start, end, attempts + 1))
+
+        if exhausted:
+            self.session.execute(
+                update(JobWorkItem)
+                .where(JobWorkItem.id.in_(exhausted))
+                .values(
+                    status=WORK_ITEM_STATUS_FAILED,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    last_error="MAX_ATTEMPTS_EXCEEDED",
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+        if not items:
+            return []
+
+        self.session.execute(
+            update(JobWorkItem)
+            .where(JobWorkItem.id.in_([item[0] for item in items]))
+            .values(
+                status=WORK_ITEM_STATUS_LEASED,
+                lease_owner=owner,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                attempts=JobWorkItem.attempts + 1,
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return items
+
+    def heartbeat(self, item_ids: list[int], owner: str, lease_expires_at: datetime) -> int:
+        """
+        Extend the lease of items still held by owner. Returns rows still leased
+        (a lower count means a lease expired and another worker took the item).
+        """
+        if not item_ids:
+            return 0
+        stmt = (
+            update(JobWorkItem)
+            .where(
+                and_(
+                    JobWorkItem.id.in_(item_ids),
+                    JobWorkItem.lease_owner == owner,
+                    JobWorkItem.status == WORK_ITEM_STATUS_LEASED,
+                )
+            )
+            .values(lease_expires_at=lease_expires_at, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        return int(self.session.execute(stmt).rowcount or 0)
+
+    def complete(self, item_id: int, owner: str) -> bool:
+        return self._finish(item_id, owner, WORK_ITEM_STATUS_DONE, None)
+
+    def fail(self, item_id: int, owner: str, error: str, retry: bool) -> bool:
+        """
+        Give the item back: PENDING when retry (another claim re-runs it), else FAILED.
+        """
+        status = WORK_ITEM_STATUS_PENDING if retry else WORK_ITEM_STATUS_FAILED
+        return self._finish(item_id, owner, status, error[:255])
+
+    def _finish(self, item_id: int, owner: str, status: int, error: str | None) -> bool:
+        stmt = (
+            update(JobWorkItem)
+            .where(
+                and_(
+                    JobWorkItem.id == item_id,
+                    JobWorkItem.lease_owner == owner,
+                    JobWorkItem.status == WORK_ITEM_STATUS_LEASED,
+                )
+            )
+            .values(
+                status=status,
+                lease_owner=None,
+                lease_expires_at=None,
+                last_error=error,
+                updated_at=datetime.utcnow(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return bool(self.session.execute(stmt).rowcount)
+
+    def retry_failed(self, job_name: str, delivery_date: date) -> int:
+        stmt = (
+            update(JobWorkItem)
+            .where(
+                and_(
+                    JobWorkItem.job_name == job_name,
+                    JobWorkItem.delivery_date == delivery_date,
+                    JobWorkItem.status == WORK_ITEM_STATUS_FAILED,
+                )
+            )
+            .values(status=WORK_ITEM_STATUS_PENDING, attempts=0, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        return int(self.session.execute(stmt).rowcount or 0)
+
+    def count_by_status(self, job_name: str, delivery_date: date) -> dict[int, int]:
+        stmt = (
+            select(JobWorkItem.status, func.count())
+            .where(
+                and_(
+                    JobWorkItem.job_name == job_name,
+                    JobWorkItem.delivery_date == delivery_date,
+                )
+            )
+            .group_by(JobWorkItem.status)
+        )
+        return {status: int(n) for status, n in self.session.execute(stmt).all()}
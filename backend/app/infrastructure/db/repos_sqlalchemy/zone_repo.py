@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models.zone import Zone
+
+
+class SqlAlchemyZoneRepo:
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def list_active_ids(self) -> list[int]:
+        """
+        Ids of active zones (small table, read whole).
+        """
+        stmt = select(Zone.id).where(Zone.is_active == 1).order_by(Zone.id.asc())
+        return list(self.session.scalars(stmt).all())
+
+    def get_batch_limits(self) -> dict[int, tuple[int | None, int | None]]:
+        """
+        {zone_id: (max_batch_orders, max_batch_items)} for all zones; NULL means "use the default".
+        """
+        stmt = select(Zone.id, Zone.max_batch_orders, Zone.max_batch_items)
+        return {zone_id: (max_orders, max_items) for zone_id, max_orders, max_items in self.session.execute(stmt).all()}
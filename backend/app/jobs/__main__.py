@@ -0,0 +1,201 @@
+# app/jobs/__main__.py
+"""
+Run one job or a chain of jobs in one process, on one engine (JobSessionFactory).
+
+Usage:
+  python -m app.jobs generate --date 2025-12-29
+  python -m app.jobs generate,batch,lock --date 2025-12-29 --bulk
+  python -m app.jobs batch --date 2025-12-29 --incremental --workers 4
+  python -m app.jobs pipeline --date 2025-12-29
+  python -m app.jobs generate,batch,lock --date 2025-12-29 --adaptive
+
+Each stage prints one JSON line:
+  {"stage", "delivery_date", "ok", "wall_seconds", "statements", "rows", "peak_rss_kb", "result" | "error"}
+A failing stage stops the chain (exit code 1).
+Every stage is also recorded in job_runs (see python -m app.jobs.history).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import date
+from typing import Callable
+
+from app.services.unit_of_work import UnitOfWork
+from app.jobs.chunking import AdaptiveChunker, chunker_for
+from app.jobs.history import record_run
+from app.jobs.metrics import StageMetrics, measure
+
+
+def _chunker(job_name: str, args: argparse.Namespace, initial: int | None = None) -> AdaptiveChunker | None:
+    if not args.adaptive:
+        return None
+    return chunker_for(job_name, initial=initial, target_seconds=args.target_seconds)
+
+
+def _generate(uow_factory: Callable[[], UnitOfWork], args: argparse.Namespace) -> dict:
+    from app.jobs.tasks.generate_orders import run_generate_orders
+
+    return run_generate_orders(
+        uow_factory,
+        args.date,
+        page_size=args.page_size,
+        bulk=args.bulk,
+        continue_on_error=args.continue_on_error,
+        advance_schedule=args.advance_schedule,
+        use_due_queue=args.due_queue,
+        commit_batch_size=args.commit_batch_size,
+        retry_failed=args.retry_failed,
+        from_scratch=args.from_scratch,
+        chunker=_chunker("generate_orders", args, initial=args.page_size),
+    )
+
+
+def _zones(uow_factory: Callable[[], UnitOfWork], args: argparse.Namespace) -> dict:
+    from app.jobs.tasks.assign_zones import run_assign_zones
+
+    return run_assign_zones(uow_factory, args.date)
+
+
+def _batch(uow_factory: Callable[[], UnitOfWork], args: argparse.Namespace) -> dict:
+    from app.jobs.tasks.create_batches import run_create_batches
+
+    return run_create_batches(
+        uow_factory,
+        args.date,
+        max_orders_per_batch=args.max_orders,
+        max_items_per_batch=args.max_items,
+        workers=args.workers,
+        incremental=args.incremental,
+        assign_zones=args.assign_zones,
+        chunker=_chunker("create_batches", args),
+    )
+
+
+def _lock(uow_factory: Callable[[], UnitOfWork], args: argparse.Namespace) -> dict:
+    from app.jobs.tasks.lock_batches import run_lock_batches
+
+    return run_lock_batches(
+        uow_factory,
+        args.date,
+        reserve_inventory=args.reserve_inventory,
+        chunker=_chunker("lock_batches", args),
+    )
+
+
+def _pipeline(uow_factory: Callable[[], UnitOfWork], args: argparse.Namespace) -> dict:
+    from app.jobs.tasks.pipeline import run_pipeline
+
+    return run_pipeline(
+        uow_factory,
+        args.date,
+        max_orders_per_batch=args.max_orders,
+        max_items_per_batch=args.max_items,
+        reserve_inventory=args.reserve_inventory,
+        page_size=args.page_size,
+        bulk=args.bulk,
+        continue_on_error=args.continue_on_error,
+        advance_schedule=args.advance_schedule,
+        use_due_queue=args.due_queue,
+        commit_batch_size=args.commit_batch_size,
+        retry_failed=args.retry_failed,
+        from_scratch=args.from_scratch,
+        chunker=_chunker("generate_orders", args, initial=args.page_size),
+    )
+
+
+STAGES: dict[str, Callable[[Callable[[], UnitOfWork], argparse.Namespace], dict]] = {
+    "generate": _generate,
+    "zones": _zones,
+    "batch": _batch,
+    "lock": _lock,
+    "pipeline": _pipeline,
+}
+
+# job_runs.job_name per stage (same names as the app.jobs.tasks modules)
+JOB_NAMES = {
+    "generate": "generate_orders",
+    "zones": "assign_zones",
+    "batch": "create_batches",
+    "lock": "lock_batches",
+    "pipeline": "pipeline",
+}
+
+
+def _parse_stages(value: str) -> list[str]:
+    stages = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in stages if name not in STAGES]
+    if not stages or unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown stage(s) {', '.join(unknown) or repr(value)}; choose from {', '.join(STAGES)}"
+        )
+    return stages
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.jobs")
+    parser.add_argument("stages", type=_parse_stages, help=f"comma separated: {','.join(STAGES)}")
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today(), help="delivery date (YYYY-MM-DD)")
+    # generate
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--bulk", action="store_true")
+    parser.add_argument("--continue-on-error", action="store_true")
+    parser.add_argument("--advance-schedule", action="store_true")
+    parser.add_argument("--due-queue", action="store_true")
+    parser.add_argument("--commit-batch-size", type=int, default=1, help="subscriptions per transaction")
+    parser.add_argument("--retry-failed", action="store_true", help="only re-process unresolved failures")
+    parser.add_argument("--from-scratch", action="store_true", help="ignore the saved generate checkpoint")
+    # batch
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="batch zone workers (sharded generate: app.jobs.tasks.generate_orders)"
+    )
+    parser.add_argument("--max-orders", type=int, default=None)
+    parser.add_argument("--max-items", type=int, default=None)
+    parser.add_argument(
+        "--no-assign-zones", dest="assign_zones", action="store_false", help="skip zone routing (zones stage ran)"
+    )
+    # lock
+    parser.add_argument("--reserve-inventory", action="store_true", help="also reserve inventory for locked batches")
+    # generate / batch / lock
+    parser.add_argument("--adaptive", action="store_true", help="AIMD-tuned page / INSERT / lock chunk sizes")
+    parser.add_argument("--target-seconds", type=float, default=1.0, help="adaptive: target latency per chunk")
+    args = parser.parse_args(argv)
+
+    from app.settings import settings
+    from app.jobs.session import JobSessionFactory
+
+    # batch --workers N needs N connections at once, the pipeline two
+    uow_factory = JobSessionFactory(pool_size=max(settings.job_db_pool_size, args.workers + 1))
+
+    exit_code = 0
+    try:
+        for name in args.stages:
+            record: dict = {"stage": name, "delivery_date": args.date.isoformat()}
+            # stays empty if record_run / measure fail on enter, so the failure record still prints
+            metrics = StageMetrics()
+            try:
+                with record_run(uow_factory, JOB_NAMES[name], args.date) as run:
+                    try:
+                        with measure(uow_factory.engine) as metrics:
+                            result = run.result = STAGES[name](uow_factory, args)
+                    finally:
+                        run.statements, run.peak_rss_kb = metrics.statements, metrics.peak_rss_kb
+            except Exception as exc:
+                record.update(ok=False, **metrics.as_dict(), error=f"{type(exc).__name__}: {exc}")
+                exit_code = 1
+            else:
+                record.update(ok=True, **metrics.as_dict(), result=result)
+
+            print(json.dumps(record, default=str), flush=True)
+            if exit_code:
+                break
+    finally:
+        uow_factory.dispose()
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
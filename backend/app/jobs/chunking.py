@@ -0,0 +1,134 @@
+# app/jobs/chunking.py
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy.exc import DBAPIError
+
+from app.logging import get_logger
+
+logger = get_logger(__name__)
+
+# MySQL: 1205 = lock wait timeout exceeded, 1213 = deadlock found
+LOCK_ERROR_CODES = (1205, 1213)
+
+
+def is_lock_error(exc: BaseException) -> bool:
+    if not isinstance(exc, DBAPIError) or exc.orig is None:
+        return False
+    args = getattr(exc.orig, "args", ())
+    return bool(args) and args[0] in LOCK_ERROR_CODES
+
+
+class AdaptiveChunker:
+    """
+    AIMD chunk size controller shared by the batch jobs.
+
+    - a chunk that finishes within target_seconds grows the size by `step` (additive increase)
+    - a slow chunk or a lock wait timeout / deadlock multiplies it by
+      `backoff` (multiplicative decrease)
+    - the size always stays within [minimum, maximum]
+
+    Jobs read `size` before each chunk and wrap the chunk in `measure()`.
+    Size changes are logged; `summary()` goes into the job result.
+    Thread-safe (create_batches workers share one chunker).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        minimum: int = 1,
+        maximum: int = 10_000,
+        target_seconds: float = 1.0,
+        step: int | None = None,
+        backoff: float = 0.5,
+    ) -> None:
+        if not 1 <= minimum <= maximum or not 0 < backoff < 1 or target_seconds <= 0:
+            raise ValueError("CHUNKER_CONFIG_INVALID")
+
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+        self.step = step if step is not None else max(1, initial // 10)
+        self.backoff = backoff
+
+        self._size = min(max(initial, minimum), maximum)
+        self._lock = threading.Lock()
+        self._chunks = 0
+        self._lock_errors = 0
+        self._seen_min = self._size
+        self._seen_max = self._size
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def record(self, elapsed: float) -> int:
+        with self._lock:
+            self._chunks += 1
+            if elapsed <= self.target_seconds:
+                return self._resize(self._size + self.step, f"{elapsed:.3f}s <= target")
+            return self._resize(int(self._size * self.backoff), f"{elapsed:.3f}s > target")
+
+    def record_lock_error(self) -> int:
+        with self._lock:
+            self._chunks += 1
+            self._lock_errors += 1
+            return self._resize(int(self._size * self.backoff), "lock wait / deadlock")
+
+    def _resize(self, new_size: int, reason: str) -> int:
+        new_size = min(max(new_size, self.minimum), self.maximum)
+        if new_size != self._size:
+            logger.info("[chunking] %s size %d -> %d (%s)", self.name, self._size, new_size, reason)
+            self._size = new_size
+            self._seen_min = min(self._seen_min, new_size)
+            self._seen_max = max(self._seen_max, new_size)
+        return self._size
+
+    @contextmanager
+    def measure(self) -> Iterator[None]:
+        """
+        Time one chunk. Lock errors shrink the size and are re-raised (callers retry);
+        other errors propagate without feedback.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as exc:
+            if is_lock_error(exc):
+                self.record_lock_error()
+            raise
+        self.record(time.perf_counter() - started)
+
+    def summary(self) -> dict:
+        return {
+            "final": self._size,
+            "min": self._seen_min,
+            "max": self._seen_max,
+            "chunks": self._chunks,
+            "lock_errors": self._lock_errors,
+        }
+
+
+# (initial, minimum, maximum) per job chunk
+JOB_CHUNK_BOUNDS: dict[str, tuple[int, int, int]] = {
+    "generate_orders": (200, 20, 5000),      # subscriptions per page
+    "create_batches": (1000, 100, 20000),    # order ids per attach INSERT
+    "lock_batches": (100, 5, 5000),          # batches per lock transaction
+}
+
+
+def chunker_for(job_name: str, initial: int | None = None, target_seconds: float = 1.0) -> AdaptiveChunker:
+    default_initial, minimum, maximum = JOB_CHUNK_BOUNDS[job_name]
+    return AdaptiveChunker(
+        job_name,
+        initial=initial if initial is not None else default_initial,
+        minimum=minimum,
+        maximum=maximum,
+        target_seconds=target_seconds,
+    )
@@ -0,0 +1,227 @@
+# app/jobs/history.py
+"""
+Job run history (job_runs) and regression check against recent runs.
+
+Usage:
+  python -m app.jobs.history list generate_orders --limit 10
+  python -m app.jobs.history compare generate_orders --window 7 --threshold 0.2
+  (compare exits with code 1 when the latest run regressed → usable in CI / cron alerts)
+"""
+from __future__ import annotations
+
+import os
+import socket
+import statistics
+import subprocess
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Callable, Iterator
+
+from app.logging import get_logger
+from app.services.unit_of_work import UnitOfWork
+from app.infrastructure.db.repos_sqlalchemy.job_run_repo import (
+    JOB_RUN_STATUS_FAILED,
+    JOB_RUN_STATUS_SUCCEEDED,
+)
+
+logger = get_logger(__name__)
+
+# summary keys that count the rows a job worked through (throughput numerator)
+THROUGHPUT_KEYS: dict[str, tuple[str, ...]] = {
+    "generate_orders": ("created", "existing"),
+    "create_batches": ("orders_attached",),
+    "lock_batches": ("locked",),
+    "assign_zones": ("orders_zoned",),
+    "pipeline": ("created", "existing"),
+}
+
+
+def rows_processed(job_name: str, result: dict | None) -> int:
+    if not result:
+        return 0
+    keys = THROUGHPUT_KEYS.get(job_name)
+    if keys is None:
+        keys = tuple(k for k, v in result.items() if isinstance(v, int) and not isinstance(v, bool))
+    return sum(int(result.get(key) or 0) for key in keys)
+
+
+@lru_cache(maxsize=1)
+def git_revision() -> str | None:
+    """
+    GIT_REVISION env (set at deploy / image build), else `git rev-parse HEAD`, else None.
+    """
+    revision = os.getenv("GIT_REVISION")
+    if revision:
+        return revision[:40]
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=2,
+            check=True,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip()[:40] or None
+
+
+@dataclass
+class JobRunRecord:
+    job_name: str
+    delivery_date: date | None
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    result: dict | None = None
+    statements: int | None = None
+    peak_rss_kb: int | None = None
+
+
+@contextmanager
+def record_run(
+    uow_factory: Callable[[], UnitOfWork],
+    job_name: str,
+    delivery_date: date | None = None,
+) -> Iterator[JobRunRecord]:
+    """
+    Persist one job_runs row when the block ends (success or exception).
+
+        with record_run(uow_factory, "generate_orders", d) as run:
+            run.result = run_generate_orders(uow_factory, d)
+
+    Writing history never masks the job's own outcome: a failed insert is logged.
+    """
+    record = JobRunRecord(job_name=job_name, delivery_date=delivery_date)
+    error: BaseException | None = None
+    try:
+        yield record
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        try:
+            _save(uow_factory, record, error)
+        except Exception:
+            logger.exception("job_runs insert failed for %s", job_name)
+
+
+def _save(uow_factory: Callable[[], UnitOfWork], record: JobRunRecord, error: BaseException | None) -> None:
+    finished_at = datetime.utcnow()
+    duration_ms = max(0, int((finished_at - record.started_at).total_seconds() * 1000))
+    rows = rows_processed(record.job_name, record.result)
+    error_count = int((record.result or {}).get("failed") or 0) + (1 if error is not None else 0)
+
+    uow = uow_factory()
+    with uow:
+        uow.job_runs.add(
+            {
+                "job_name": record.job_name,
+                "delivery_date": record.delivery_date,
+                "status": JOB_RUN_STATUS_FAILED if error is not None else JOB_RUN_STATUS_SUCCEEDED,
+                "started_at": record.started_at,
+                "finished_at": finished_at,
+                "duration_ms": duration_ms,
+                "rows_processed": rows,
+                "rows_per_second": rows * 1000 // duration_ms if duration_ms else rows,
+                "error_count": error_count,
+                "error": f"{type(error).__name__}: {error}"[:255] if error is not None else None,
+                "statements": record.statements,
+                "peak_rss_kb": record.peak_rss_kb,
+                "summary": record.result,
+                "host": socket.gethostname()[:128],
+                "git_revision": git_revision(),
+                "created_at": finished_at,
+            }
+        )
+
+
+def compare_latest(
+    uow_factory: Callable[[], UnitOfWork],
+    job_name: str,
+    window: int = 7,
+    threshold: float = 0.2,
+) -> dict:
+    """
+    Latest successful run vs the median of the `window` successful runs before it.
+    Regression = rows/sec below baseline * (1 - threshold), or duration above
+    baseline * (1 + threshold) while processing no more rows than the baseline.
+    """
+    uow = uow_factory()
+    with uow:
+        runs = uow.job_runs.list_recent(job_name, limit=window + 1, status=JOB_RUN_STATUS_SUCCEEDED)
+
+    if not runs:
+        return {"job_name": job_name, "latest": None, "baseline_runs": 0, "regression": False}
+
+    latest, history = runs[0], runs[1:]
+    report = {
+        "job_name": job_name,
+        "latest": {
+            "started_at": latest.started_at.isoformat(),
+            "delivery_date": latest.delivery_date.isoformat() if latest.delivery_date else None,
+            "duration_ms": latest.duration_ms,
+            "rows_processed": latest.rows_processed,
+            "rows_per_second": latest.rows_per_second,
+            "git_revision": latest.git_revision,
+        },
+        "baseline_runs": len(history),
+        "regression": False,
+        "reasons": [],
+    }
+    if not history:
+        return report
+
+    baseline_rps = statistics.median(run.rows_per_second for run in history)
+    baseline_ms = statistics.median(run.duration_ms for run in history)
+    baseline_rows = statistics.median(run.rows_processed for run in history)
+    report["baseline"] = {
+        "duration_ms": baseline_ms,
+        "rows_processed": baseline_rows,
+        "rows_per_second": baseline_rps,
+    }
+
+    if baseline_rps and latest.rows_per_second < baseline_rps * (1 - threshold):
+        report["reasons"].append("rows_per_second")
+    if latest.duration_ms > baseline_ms * (1 + threshold) and latest.rows_processed <= baseline_rows:
+        report["reasons"].append("duration_ms")
+    report["regression"] = bool(report["reasons"])
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+    import json
+
+    from app.jobs.session import JobSessionFactory
+
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.history")
+    parser.add_argument("command", choices=["list", "compare"])
+    parser.add_argument("job_name", help="e.g. generate_orders, create_batches, lock_batches, pipeline")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--window", type=int, default=7, help="successful runs in the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    with JobSessionFactory() as uow_factory:
+        if args.command == "compare":
+            report = compare_latest(uow_factory, args.job_name, window=args.window, threshold=args.threshold)
+            print(json.dumps(report, default=str))
+            return 1 if report["regression"] else 0
+
+        uow = uow_factory()
+        with uow:
+            runs = uow.job_runs.list_recent(args.job_name, limit=args.limit)
+            for run in runs:
+                print(
+                    f"{run.started_at.isoformat()} "
+                    f"{'ok    ' if run.status == JOB_RUN_STATUS_SUCCEEDED else 'FAILED'} "
+                    f"date={run.delivery_date} {run.duration_ms}ms rows={run.rows_processed} "
+                    f"rps={run.rows_per_second} errors={run.error_count} "
+                    f"host={run.host} rev={(run.git_revision or '-')[:10]}"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,67 @@
+# app/jobs/metrics.py
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+def peak_rss_kb() -> int | None:
+    """
+    Peak resident set size of this process so far (KB on Linux, bytes on macOS).
+    It never goes down, so per stage it is "peak up to the end of the stage".
+    """
+    if resource is None:
+        return None
+    return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+@dataclass
+class StageMetrics:
+    wall_seconds: float = 0.0
+    statements: int = 0
+    rows: int = 0            # sum of cursor.rowcount (rows written, or fetched for SELECTs)
+    peak_rss_kb: int | None = None
+
+    def as_dict(self) -> dict:
+        return {
+            "wall_seconds": round(self.wall_seconds, 3),
+            "statements": self.statements,
+            "rows": self.rows,
+            "peak_rss_kb": self.peak_rss_kb,
+        }
+
+
+@contextmanager
+def measure(engine: Engine) -> Iterator[StageMetrics]:
+    """
+    Count statements / rowcount issued on `engine` (all connections and threads)
+    while the block runs, plus wall time and peak RSS.
+    """
+    metrics = StageMetrics()
+    lock = threading.Lock()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        rowcount = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+        with lock:
+            metrics.statements += 1
+            metrics.rows += rowcount
+
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    started = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.wall_seconds = time.perf_counter() - started
+        metrics.peak_rss_kb = peak_rss_kb()
+        event.remove(engine, "after_cursor_execute", after_cursor_execute)
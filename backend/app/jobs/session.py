@@ -0,0 +1,52 @@
+# app/jobs/session.py
+from __future__ import annotations
+
+from sqlalchemy.engine import Engine
+
+from app.infrastructure.db.models.session import build_engine, build_session_factory
+from app.services.unit_of_work import UnitOfWork
+
+
+class JobSessionFactory:
+    """
+    uow_factory for batch jobs / CLIs.
+
+    - one engine (connection pool) per process, sized by Settings.job_db_*
+    - every call returns a UnitOfWork that owns a fresh session; the session
+      is closed when the `with uow:` block exits, so its connection goes back
+      to the pool right away instead of waiting for GC
+    - dispose() (or leaving `with JobSessionFactory() as uow_factory:`) closes the pool
+
+    API requests keep using dependencies.get_db_session (FastAPI closes it).
+    """
+
+    def __init__(
+        self,
+        database_url: str | None = None,
+        pool_size: int | None = None,
+        max_overflow: int | None = None,
+        pool_recycle: int | None = None,
+        pool_timeout: int | None = None,
+    ) -> None:
+        from app.settings import settings
+
+        self.engine: Engine = build_engine(
+            database_url or settings.database_url,
+            pool_size=pool_size if pool_size is not None else settings.job_db_pool_size,
+            max_overflow=max_overflow if max_overflow is not None else settings.job_db_max_overflow,
+            pool_recycle=pool_recycle if pool_recycle is not None else settings.job_db_pool_recycle,
+            pool_timeout=pool_timeout if pool_timeout is not None else settings.job_db_pool_timeout,
+        )
+        self.session_factory = build_session_factory(self.engine)
+
+    def __call__(self) -> UnitOfWork:
+        return UnitOfWork(session=self.session_factory(), owns_session=True)
+
+    def dispose(self) -> None:
+        self.engine.dispose()
+
+    def __enter__(self) -> "JobSessionFactory":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.dispose()
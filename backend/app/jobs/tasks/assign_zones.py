@@ -0,0 +1,24 @@
+# app/jobs/tasks/assign_zones.py
+from __future__ import annotations
+
+from datetime import date
+from typing import Callable
+
+from app.services.unit_of_work import UnitOfWork
+from app.services.zone_service import ZoneService
+
+
+def run_assign_zones(
+    uow_factory: Callable[[], UnitOfWork],
+    delivery_date: date,
+    after_id: int = 0,
+) -> dict:
+    """
+    Route orders of delivery_date to their shipping address zone before batching.
+    Idempotent: only orders with zone_id IS NULL that are not in a batch are touched.
+    """
+    assigned = ZoneService(uow_factory()).assign_order_zones(delivery_date, after_id)
+    return {
+        "delivery_date": delivery_date.isoformat(),
+        "orders_zoned": assigned,
+    }
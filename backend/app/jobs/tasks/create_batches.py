@@ -1,15 +1,18 @@
 from __future__ import annotations
 
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
-from typing import Callable, Dict, Tuple
+from functools import partial
+from typing import Callable, Dict, TypeVar
 
-from sqlalchemy import select, and_
 from sqlalchemy.orm import Session
 
 from app.services.unit_of_work import UnitOfWork
-from app.infrastructure.db.models.order import Order
+from app.services.delivery_batch_service import pack_orders
+from app.jobs.tasks.assign_zones import run_assign_zones
+from app.jobs.chunking import AdaptiveChunker, is_lock_error
 from app.infrastructure.db.models.delivery_batch import DeliveryBatch
-from app.infrastructure.db.models.delivery_batch_order import DeliveryBatchOrder
 
 
 # NOTE:
@@ -18,12 +21,217 @@ from app.infrastructure.db.models.delivery_batch_order import DeliveryBatchOrder
 DEFAULT_ELIGIBLE_ORDER_STATUS = 1   # เช่น PENDING / READY
 DEFAULT_BATCH_STATUS = 1            # เช่น OPEN
 
+JOB_NAME = "create_batches"
+
+T = TypeVar("T")
+
+
+def _batch_code(d_date: date, zone_id: int | None, seq: int) -> str:
+    # seq 1 keeps the historical code; extra batches of the same zone get -2, -3, ...
+    base = f"{d_date.isoformat()}-{zone_id or 'ALL'}"
+    return base if seq == 1 else f"{base}-{seq}"
+
+
+def _save_watermark(uow_factory: Callable[[], UnitOfWork], delivery_date: date, last_id: int) -> None:
+    # GREATEST upsert: overlapping --incremental runs can never move the watermark back
+    uow = uow_factory()
+    with uow:
+        uow.checkpoints.advance(JOB_NAME, delivery_date, last_id)
+
+
+def _zone_capacity(
+    zone_limits: dict[int, tuple[int | None, int | None]],
+    zone_id: int | None,
+    max_orders: int | None,
+    max_items: int | None,
+) -> tuple[int | None, int | None]:
+    # zone override → job / settings default
+    zone_max_orders, zone_max_items = zone_limits.get(zone_id, (None, None))
+    return (
+        zone_max_orders if zone_max_orders is not None else max_orders,
+        zone_max_items if zone_max_items is not None else max_items,
+    )
+
+
+def _pack_zone(
+    uow: UnitOfWork,
+    d_date: date,
+    zone_id: int | None,
+    order_ids: array,
+    items: array | None,
+    max_orders: int | None,
+    max_items: int | None,
+    batch_status: int,
+) -> tuple[int, list[tuple[int, list[int]]]]:
+    """
+    Lock the zone's batches, pack its unbatched orders and create the new batches
+    needed. Returns (batches_created, [(batch_id, order ids to attach)]).
+    """
+    created_batches = 0
+    plan: list[tuple[int, list[int]]] = []
+
+    # 3.1 batches ของ zone นี้ (lock ไว้กัน run ซ้อน) → เฉพาะที่ยังไม่ lock รับ order ได้
+    batches = uow.batches.list_for_zone_for_update(d_date, zone_id)
+    open_batches = [b for b in batches if b.locked_at is None]
+    loads = uow.batches.get_loads([b.id for b in open_batches], with_items=max_items is not None)
+
+    # 3.2 bin packing (deterministic)
+    bins = pack_orders(
+        [(oid, items[i] if items is not None else 0) for i, oid in enumerate(order_ids)],
+        [loads[b.id] for b in open_batches],
+        max_orders,
+        max_items,
+    )
+
+    next_seq = len(batches) + 1
+    for i, bin_order_ids in enumerate(bins):
+        if not bin_order_ids:
+            continue
+
+        if i < len(open_batches):
+            batch = open_batches[i]
+        else:
+            # 3.3 batch ใหม่ (code ต่อท้าย seq)
+            now = datetime.utcnow()
+            batch = DeliveryBatch(
+                public_id=None,
+                batch_code=_batch_code(d_date, zone_id, next_seq),
+                delivery_date=d_date,
+                zone_id=zone_id,
+                cutoff_at=now,   # NOTE: ถ้ามี cutoff rule จริง ค่อยย้าย logic มาตรงนี้
+                status=batch_status,
+                locked_at=None,
+                dispatched_at=None,
+                completed_at=None,
+                created_at=now,
+                updated_at=now,
+            )
+            uow.session.add(batch)
+            uow.session.flush()
+            created_batches += 1
+            next_seq += 1
+
+        plan.append((batch.id, bin_order_ids))
+
+    return created_batches, plan
+
+
+def _pack_zone_tx(uow_factory: Callable[[], UnitOfWork], *args) -> tuple[int, list[tuple[int, list[int]]]]:
+    uow = uow_factory()
+    with uow:
+        return _pack_zone(uow, *args)
+
+
+def _attach_chunk(
+    uow_factory: Callable[[], UnitOfWork],
+    chunker: AdaptiveChunker,
+    batch_id: int,
+    order_ids: list[int],
+) -> tuple[int, list[int]]:
+    # own short transaction, timed including the commit → (attached, ids left unattached)
+    with chunker.measure():
+        uow = uow_factory()
+        with uow:
+            attached = uow.batches.attach_unbatched_orders(batch_id, order_ids)
+            # short only if the batch was locked meanwhile, or another run took some orders
+            skipped = uow.batches.filter_unattached(order_ids) if attached < len(order_ids) else []
+            return attached, skipped
+
+
+def _batch_zone(
+    uow_factory: Callable[[], UnitOfWork],
+    d_date: date,
+    zone_id: int | None,
+    order_ids: array,
+    items: array | None,
+    max_orders: int | None,
+    max_items: int | None,
+    batch_status: int,
+    chunker: AdaptiveChunker | None = None,
+    lock_retries: int = 3,
+) -> tuple[int, int, list[int]]:
+    """
+    Pack one zone's unbatched orders into its open / new batches.
+    Returns (batches_created, orders_attached, order ids left unbatched).
+
+    Without a chunker everything runs in one transaction under the zone lock.
+    With one, the packing + new batches commit first and every attach chunk
+    (chunker.size rows) commits on its own, so no transaction outlives a chunk.
+    Chunks then run outside the zone lock, so they use attach_unbatched_orders
+    (skips orders another run attached meanwhile, and batches locked
+    meanwhile). Orders skipped because their batch got locked are packed
+    again into the zone's remaining open / new batches, up to lock_retries
+    times; whatever is still left is returned so the caller keeps its
+    watermark below it. A lock wait timeout / deadlock retries only the
+    statement that hit it (up to lock_retries).
+    """
+    if chunker is None:
+        uow = uow_factory()
+        with uow:
+            created_batches, plan = _pack_zone(
+                uow, d_date, zone_id, order_ids, items, max_orders, max_items, batch_status
+            )
+            # 3.4 attach orders (idempotent, one INSERT IGNORE per batch)
+            attached_orders = sum(uow.batches.attach_orders(batch_id, ids) for batch_id, ids in plan)
+        return created_batches, attached_orders, []
+
+    created_batches = 0
+    attached_orders = 0
+    attempt = 0
+    while True:
+        args = (d_date, zone_id, order_ids, items, max_orders, max_items, batch_status)
+        created, plan = _retry_on_lock_error(partial(_pack_zone_tx, uow_factory, *args), lock_retries)
+        created_batches += created
+
+        # 3.4 attach orders: one INSERT IGNORE ... SELECT + commit per chunk
+        skipped: list[int] = []
+        for batch_id, ids in plan:
+            pos = 0
+            while pos < len(ids):
+                size = chunker.size
+                attached, chunk_skipped = _retry_on_lock_error(
+                    partial(_attach_chunk, uow_factory, chunker, batch_id, ids[pos : pos + size]), lock_retries
+                )
+                attached_orders += attached
+                skipped.extend(chunk_skipped)
+                pos += size
+
+        if not skipped or attempt >= lock_retries:
+            return created_batches, attached_orders, sorted(skipped)
+
+        # 3.5 batch locked between pack and attach → pack the leftovers again
+        attempt += 1
+        if items is not None:
+            quantities = dict(zip(order_ids, items))
+            items = array("L", (quantities[oid] for oid in skipped))
+        order_ids = array("Q", skipped)
+
+
+def _retry_on_lock_error(job: Callable[[], T], lock_retries: int) -> T:
+    # the failed statement's transaction rolled back as a whole and both steps are idempotent → rerun it
+    attempt = 0
+    while True:
+        try:
+            return job()
+        except Exception as exc:
+            if not is_lock_error(exc) or attempt >= lock_retries:
+                raise
+            attempt += 1
+
 
 def run_create_batches(
     uow_factory: Callable[[], UnitOfWork],
     delivery_date: date,
     eligible_order_status: int = DEFAULT_ELIGIBLE_ORDER_STATUS,
     batch_status: int = DEFAULT_BATCH_STATUS,
+    assign_zones: bool = True,
+    max_orders_per_batch: int | None = None,
+    max_items_per_batch: int | None = None,
+    workers: int = 1,
+    incremental: bool = False,
+    zone_ids: list[int | None] | None = None,
+    chunker: AdaptiveChunker | None = None,
+    lock_retries: int = 3,
 ) -> Dict[str, int]:
     """
     Create delivery batches and attach eligible orders.
@@ -33,105 +241,193 @@ def run_create_batches(
     - order ที่ attach แล้วจะไม่ attach ซ้ำ
     - batch ที่ถูก lock แล้วจะไม่ถูกแก้
 
+    assign_zones=True (default) first routes unzoned, unbatched orders to their
+    shipping address zone (run_assign_zones: one UPDATE, only ids above the
+    watermark on incremental runs), so batches split per zone. Pass False only
+    when routing already ran (work queue enqueue, the "zones" stage).
+
+    Capacity: zones.max_batch_orders / max_batch_items, else max_*_per_batch,
+    else Settings.batch_max_orders / batch_max_items (unset = one batch per zone).
+    Unbatched orders are packed first-fit decreasing into the zone's open
+    batches, then into new batches coded <date>-<zone>-<seq>.
+
+    workers > 1 runs zone groups concurrently in a thread pool. Each zone uses
+    its own UnitOfWork, so uow_factory must hand out a new session per call
+    (one pooled connection per worker); keep the engine pool >= workers.
+
+    incremental=True only looks at orders with id above the per-date
+    high-water mark stored in job_checkpoints ("create_batches", delivery_date),
+    so frequent runs cost a few indexed reads. Every run moves the mark to the
+    highest order id it saw. Orders that become eligible late (status change)
+    or commit out of id order are picked up by the next full run
+    (incremental=False), which is the reconciliation pass.
+
+    zone_ids limits the run to those zones (None = unzoned orders); used by
+    work queue workers that lease one zone at a time. Such runs leave the
+    incremental high-water mark alone, since they only saw part of the day.
+
+    chunker=AdaptiveChunker(...) sizes the attach INSERTs (AIMD on statement
+    latency, shared by all zone workers) and commits each one separately; a
+    chunk that hits a lock wait timeout / deadlock is retried (up to
+    lock_retries). Sizes are returned under "chunking".
+
     Returns summary counts.
     """
+    from app.settings import settings
+
+    if max_orders_per_batch is None:
+        max_orders_per_batch = settings.batch_max_orders
+    if max_items_per_batch is None:
+        max_items_per_batch = settings.batch_max_items
+
     created_batches = 0
     attached_orders = 0
 
-    # ---------- STEP 1: ดึง orders ที่ eligible ----------
+    watermark = 0
+    if incremental:
+        uow = uow_factory()
+        with uow:
+            watermark = uow.checkpoints.get_last_id(JOB_NAME, delivery_date) or 0
+
+    # ---------- STEP 0: zone routing (one UPDATE) ----------
+    if assign_zones:
+        run_assign_zones(uow_factory, delivery_date, after_id=watermark)
+
+    # ---------- STEP 1 + 2: stream unbatched (id, zone_id, items) → per-zone arrays ----------
+    # only a few columns per order, read in yield_per chunks; ids are packed into
+    # array("Q") (8 bytes each) so memory stays flat as daily volume grows
+    groups: Dict[int | None, array] = {}
+    group_items: Dict[int | None, array] = {}
+    max_seen = watermark
     uow = uow_factory()
     with uow:
-        orders = (
-            uow.session.execute(
-                select(Order).where(
-                    and_(
-                        Order.delivery_date == delivery_date,
-                        Order.status == eligible_order_status,
-                    )
-                )
-            )
-            .scalars()
-            .all()
+        zone_limits = uow.zones.get_batch_limits()
+        with_items = max_items_per_batch is not None or any(
+            items is not None for _, items in zone_limits.values()
         )
 
-    if not orders:
+        for order_id, zone_id, item_qty in uow.orders.iter_unbatched(
+            delivery_date,
+            eligible_order_status,
+            with_item_counts=with_items,
+            after_id=watermark,
+            zone_ids=zone_ids,
+        ):
+            max_seen = max(max_seen, order_id)
+            ids = groups.get(zone_id)
+            if ids is None:
+                ids = groups[zone_id] = array("Q")
+                group_items[zone_id] = array("L")
+            ids.append(order_id)
+            if with_items:
+                group_items[zone_id].append(item_qty)
+
+    if not groups:
         return {
             "delivery_date": delivery_date.isoformat(),
             "batches_created": 0,
             "orders_attached": 0,
         }
 
-    # ---------- STEP 2: group orders by (delivery_date, zone_id) ----------
-    groups: Dict[Tuple[date, int | None], list[Order]] = {}
-    for order in orders:
-        key = (order.delivery_date, order.zone_id)
-        groups.setdefault(key, []).append(order)
-
-    # ---------- STEP 3: create / reuse batch + attach orders ----------
-    for (d_date, zone_id), group_orders in groups.items():
-        uow2 = uow_factory()
-        with uow2:
-            # 3.1 หา batch ที่ยังไม่ lock
-            batch = (
-                uow2.session.execute(
-                    select(DeliveryBatch).where(
-                        and_(
-                            DeliveryBatch.delivery_date == d_date,
-                            DeliveryBatch.zone_id == zone_id,
-                            DeliveryBatch.locked_at.is_(None),
-                        )
-                    )
-                )
-                .scalar_one_or_none()
+    # ---------- STEP 3: pack into open / new batches + attach orders ----------
+    # zones never share batches → each zone group is independent (own UoW / connection)
+    jobs = []
+    for zone_id, order_ids in groups.items():
+        zone_max_orders, zone_max_items = _zone_capacity(
+            zone_limits, zone_id, max_orders_per_batch, max_items_per_batch
+        )
+        jobs.append(
+            partial(
+                _batch_zone,
+                uow_factory,
+                delivery_date,
+                zone_id,
+                order_ids,
+                group_items[zone_id] if with_items else None,
+                zone_max_orders,
+                zone_max_items,
+                batch_status,
+                chunker,
+                lock_retries,
             )
+        )
 
-            # 3.2 ถ้าไม่มี batch → create ใหม่
-            if not batch:
-                now = datetime.utcnow()
-                batch = DeliveryBatch(
-                    public_id=None,
-                    batch_code=f"{d_date.isoformat()}-{zone_id or 'ALL'}",
-                    delivery_date=d_date,
-                    zone_id=zone_id,
-                    cutoff_at=now,   # NOTE: ถ้ามี cutoff rule จริง ค่อยย้าย logic มาตรงนี้
-                    status=batch_status,
-                    locked_at=None,
-                    dispatched_at=None,
-                    completed_at=None,
-                    created_at=now,
-                    updated_at=now,
-                )
-                uow2.session.add(batch)
-                uow2.session.flush()
-                created_batches += 1
-
-            # 3.3 attach orders (idempotent)
-            for order in group_orders:
-                exists = (
-                    uow2.session.execute(
-                        select(DeliveryBatchOrder).where(
-                            and_(
-                                DeliveryBatchOrder.batch_id == batch.id,
-                                DeliveryBatchOrder.order_id == order.id,
-                            )
-                        )
-                    )
-                    .first()
-                )
+    if workers > 1 and len(jobs) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(lambda job: job(), jobs))
+    else:
+        results = [job() for job in jobs]
 
-                if exists:
-                    continue
+    for zone_created, zone_attached, zone_skipped in results:
+        created_batches += zone_created
+        attached_orders += zone_attached
+        if zone_skipped:
+            # never move the mark past an order that is still unbatched
+            max_seen = min(max_seen, zone_skipped[0] - 1)
 
-                link = DeliveryBatchOrder(
-                    batch_id=batch.id,
-                    order_id=order.id,
-                    created_at=datetime.utcnow(),
-                )
-                uow2.session.add(link)
-                attached_orders += 1
+    # every zone committed → advance the high-water mark
+    if zone_ids is None:
+        _save_watermark(uow_factory, delivery_date, max_seen)
 
-    return {
+    summary = {
         "delivery_date": delivery_date.isoformat(),
         "batches_created": created_batches,
         "orders_attached": attached_orders,
     }
+    if chunker is not None:
+        summary["chunking"] = chunker.summary()
+    return summary
+
+
+def main() -> None:
+    """
+    CLI entrypoint (cron / ops).
+
+    Usage:
+      python -m app.jobs.tasks.create_batches 2025-12-29                 # full reconciliation
+      python -m app.jobs.tasks.create_batches 2025-12-29 --incremental   # every few minutes
+      python -m app.jobs.tasks.create_batches 2025-12-29 --workers 4 --max-orders 200
+      python -m app.jobs.tasks.create_batches 2025-12-29 --adaptive --target-seconds 0.5
+      python -m app.jobs.tasks.create_batches 2025-12-29 --no-assign-zones  # zones stage already ran
+    """
+    import argparse
+
+    from app.jobs.chunking import chunker_for
+    from app.jobs.history import record_run
+    from app.jobs.session import JobSessionFactory
+
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.tasks.create_batches")
+    parser.add_argument("delivery_date", nargs="?", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--incremental", action="store_true", help="only orders above the stored high-water mark")
+    parser.add_argument("--workers", type=int, default=1, help="zone groups processed concurrently")
+    parser.add_argument("--max-orders", type=int, default=None, help="default max orders per batch")
+    parser.add_argument("--max-items", type=int, default=None, help="default max item quantity per batch")
+    parser.add_argument("--adaptive", action="store_true", help="tune rows per attach INSERT (AIMD on statement latency)")
+    parser.add_argument("--target-seconds", type=float, default=1.0, help="adaptive: target latency per INSERT")
+    parser.add_argument(
+        "--no-assign-zones", dest="assign_zones", action="store_false", help="skip zone routing (already done)"
+    )
+    args = parser.parse_args()
+
+    from app.settings import settings
+
+    # one pooled connection per zone worker (+1 for the read/watermark steps)
+    pool_size = max(settings.job_db_pool_size, args.workers + 1)
+    with JobSessionFactory(pool_size=pool_size) as uow_factory, record_run(
+        uow_factory, JOB_NAME, args.delivery_date
+    ) as run:
+        result = run.result = run_create_batches(
+            uow_factory,
+            args.delivery_date,
+            max_orders_per_batch=args.max_orders,
+            max_items_per_batch=args.max_items,
+            workers=args.workers,
+            incremental=args.incremental,
+            assign_zones=args.assign_zones,
+            chunker=chunker_for(JOB_NAME, target_seconds=args.target_seconds) if args.adaptive else None,
+        )
+        print(f"[create_batches] {result}")
+
+
+if __name__ == "__main__":
+    main()
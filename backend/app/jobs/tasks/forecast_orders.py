@@ -0,0 +1,55 @@
+# app/jobs/tasks/forecast_orders.py
+from __future__ import annotations
+
+from datetime import date
+from typing import Callable
+
+from app.services.forecast_service import ForecastService
+from app.services.unit_of_work import UnitOfWork
+
+
+def run_forecast_orders(
+    uow_factory: Callable[[], UnitOfWork],
+    from_date: date,
+    days: int = 7,
+) -> dict:
+    """
+    Dry run of generate_orders over the next `days` delivery dates.
+    Nothing is written; see ForecastService.forecast for the shape of "dates".
+    """
+    dates = ForecastService(uow_factory()).forecast(from_date, days)
+    return {
+        "from_date": from_date.isoformat(),
+        "days": days,
+        "orders": sum(d["orders"] for d in dates),
+        "amount": sum(d["amount"] for d in dates),
+        "dates": dates,
+    }
+
+
+def main() -> None:
+    """
+    Usage:
+      python -m app.jobs.tasks.forecast_orders              # next 7 days from today
+      python -m app.jobs.tasks.forecast_orders 2025-12-29 --days 30
+    """
+    import argparse
+
+    from app.jobs.session import JobSessionFactory
+
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.tasks.forecast_orders")
+    parser.add_argument("from_date", nargs="?", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--days", type=int, default=7)
+    args = parser.parse_args()
+
+    with JobSessionFactory() as uow_factory:
+        result = run_forecast_orders(uow_factory, args.from_date, days=args.days)
+        print(f"[forecast_orders] from={result['from_date']} days={result['days']} "
+              f"orders={result['orders']} amount={result['amount']}")
+        for day in result["dates"]:
+            print(f"  {day['delivery_date']} orders={day['orders']} amount={day['amount']} "
+                  f"zones={day['zones']} variants={day['variants']}")
+
+
+if __name__ == "__main__":
+    main()
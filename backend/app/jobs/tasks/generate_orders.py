@@ -2,44 +2,491 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Callable
+from functools import partial
+from typing import Callable, Iterator
 
 from app.services.unit_of_work import UnitOfWork
-from app.services.order_service import OrderService
+from app.services.order_service import GenerationBatchResult, OrderService
+from app.services.schedule_service import ScheduleService
+from app.jobs.chunking import AdaptiveChunker, is_lock_error
+
+
+def iter_due_subscription_ids(
+    uow_factory: Callable[[], UnitOfWork],
+    delivery_date: date,
+    chunk_size: int = 200,
+    after_id: int = 0,
+    shard: tuple[int, int] | None = None,
+    use_due_queue: bool = False,
+    until_id: int | None = None,
+    chunker: AdaptiveChunker | None = None,
+) -> Iterator[list[int]]:
+    """
+    Stream due subscription ids in keyset order (id > last seen id).
+    Each chunk is read in its own short read transaction.
+
+    use_due_queue=True reads subscription_due_queue instead of filtering subscriptions.
+    until_id stops the scan after that id (inclusive upper bound of a work item range).
+    chunker (if given) decides the size of every next chunk instead of chunk_size.
+    """
+    last_id = after_id
+    while True:
+        uow = uow_factory()
+        with uow:
+            source = uow.due_queue.list_due_ids if use_due_queue else uow.subscriptions.list_due_active_ids
+            ids = source(
+                delivery_date,
+                limit=chunker.size if chunker is not None else chunk_size,
+                after_id=last_id,
+                shard=shard,
+            )
+
+        if until_id is not None:
+            reached_end = bool(ids) and ids[-1] >= until_id
+            ids = [sid for sid in ids if sid <= until_id]
+        else:
+            reached_end = False
+
+        if not ids:
+            return
+
+        yield ids
+        if reached_end:
+            return
+        last_id = ids[-1]
+
+
+def iter_failed_subscription_ids(
+    uow_factory: Callable[[], UnitOfWork],
+    delivery_date: date,
+    chunk_size: int = 200,
+    shard: tuple[int, int] | None = None,
+) -> Iterator[list[int]]:
+    """
+    Stream unresolved dead-letter subscription ids for delivery_date (targeted retry).
+    """
+    last_id = 0
+    while True:
+        uow = uow_factory()
+        with uow:
+            ids = uow.generation_failures.list_unresolved_ids(
+                delivery_date, limit=chunk_size, after_id=last_id, shard=shard
+            )
+
+        if not ids:
+            return
+
+        yield ids
+        last_id = ids[-1]
+
+
+def _generate_page_single(
+    uow_factory: Callable[[], UnitOfWork],
+    subscription_ids: list[int],
+    delivery_date: date,
+    continue_on_error: bool = False,
+) -> GenerationBatchResult:
+    result = GenerationBatchResult()
+
+    # items + variants for the whole page in batched IN queries (no per-item lazy loads)
+    uow = uow_factory()
+    with uow:
+        items_by_sub = uow.subscriptions.list_items_with_variants(subscription_ids)
+        # detach so commit (expire_on_commit) cannot trigger per-item reloads later
+        uow.session.expunge_all()
+
+    for subscription_id in subscription_ids:
+        # One subscription = one transaction
+        uow = uow_factory()
+        svc = OrderService(uow)
+
+        try:
+            _, was_created = svc.generate_from_subscription(
+                subscription_id,
+                delivery_date,
+                items=items_by_sub.get(subscription_id, []),
+            )
+        except ValueError as exc:
+            if not continue_on_error:
+                raise
+            result.failures.append((subscription_id, str(exc)))
+            continue
+
+        if was_created:
+            result.created += 1
+        else:
+            result.existing += 1
+
+    return result
+
+
+def _generate_page_bulk(
+    uow_factory: Callable[[], UnitOfWork],
+    subscription_ids: list[int],
+    delivery_date: date,
+    continue_on_error: bool = False,
+) -> GenerationBatchResult:
+    try:
+        # One page = one transaction, a few multi-row statements
+        created, existing = OrderService(uow_factory()).generate_bulk_from_subscriptions(
+            subscription_ids, delivery_date
+        )
+        return GenerationBatchResult(created=created, existing=existing)
+    except ValueError:
+        # page rolled back → fall back to the per-subscription path so good
+        # subscriptions still get their order and the bad one is isolated
+        return _generate_page_single(uow_factory, subscription_ids, delivery_date, continue_on_error)
+
+
+def _generate_page_batched(
+    uow_factory: Callable[[], UnitOfWork],
+    subscription_ids: list[int],
+    delivery_date: date,
+    continue_on_error: bool = False,
+    commit_batch_size: int = 100,
+) -> GenerationBatchResult:
+    result = GenerationBatchResult()
+
+    for start in range(0, len(subscription_ids), commit_batch_size):
+        # N subscriptions = one transaction, one SAVEPOINT each
+        batch = subscription_ids[start : start + commit_batch_size]
+        batch_result = OrderService(uow_factory()).generate_batch_from_subscriptions(batch, delivery_date)
+        result.created += batch_result.created
+        result.existing += batch_result.existing
+        result.failures.extend(batch_result.failures)
+
+        if batch_result.failures and not continue_on_error:
+            # good subscriptions of this batch are committed; stop like the per-subscription path
+            _, reason = batch_result.failures[0]
+            raise ValueError(reason)
+
+    return result
+
+
+def _generate_page_adaptive(
+    generate_page: Callable[..., GenerationBatchResult],
+    uow_factory: Callable[[], UnitOfWork],
+    subscription_ids: list[int],
+    delivery_date: date,
+    continue_on_error: bool,
+    chunker: AdaptiveChunker,
+    lock_retries: int,
+) -> GenerationBatchResult:
+    """
+    generate_page timed by the chunker. On a lock wait timeout / deadlock the
+    page is redone in pieces of the (now smaller) chunk size; generation is
+    idempotent, so subscriptions committed before the error count as existing.
+    """
+    try:
+        with chunker.measure():
+            return generate_page(uow_factory, subscription_ids, delivery_date, continue_on_error)
+    except Exception as exc:
+        if not is_lock_error(exc) or lock_retries <= 0:
+            raise
+
+    result = GenerationBatchResult()
+    size = max(1, min(chunker.size, len(subscription_ids) // 2))
+    for start in range(0, len(subscription_ids), size):
+        part = _generate_page_adaptive(
+            generate_page,
+            uow_factory,
+            subscription_ids[start : start + size],
+            delivery_date,
+            continue_on_error,
+            chunker,
+            lock_retries - 1,
+        )
+        result.created += part.created
+        result.existing += part.existing
+        result.failures.extend(part.failures)
+    return result
+
+
+def _update_dead_letter(
+    uow_factory: Callable[[], UnitOfWork],
+    delivery_date: date,
+    subscription_ids: list[int],
+    failures: list[tuple[int, str]],
+    resolve: bool,
+) -> None:
+    """
+    Record the page's failures; resolve=True also marks its other subscriptions
+    resolved (only needed when the day has open failures to close).
+    """
+    if not failures and not resolve:
+        return
+    failed_ids = {subscription_id for subscription_id, _ in failures}
+    uow = uow_factory()
+    with uow:
+        uow.generation_failures.record_many(delivery_date, failures)
+        if resolve:
+            uow.generation_failures.resolve_many(
+                delivery_date, [sid for sid in subscription_ids if sid not in failed_ids]
+            )
+
+
+JOB_NAME = "generate_orders"
+
+
+def _checkpoint_name(shard: tuple[int, int] | None) -> str:
+    if shard is None:
+        return JOB_NAME
+    index, count = shard
+    return f"{JOB_NAME}[{index}/{count}]"
+
+
+def _load_checkpoint(uow_factory: Callable[[], UnitOfWork], job_name: str, delivery_date: date) -> int:
+    uow = uow_factory()
+    with uow:
+        return uow.checkpoints.get_last_id(job_name, delivery_date) or 0
+
+
+def _save_checkpoint(
+    uow_factory: Callable[[], UnitOfWork],
+    job_name: str,
+    delivery_date: date,
+    last_id: int,
+) -> None:
+    uow = uow_factory()
+    with uow:
+        uow.checkpoints.save(job_name, delivery_date, last_id)
+
+
+def _clear_checkpoint(uow_factory: Callable[[], UnitOfWork], job_name: str, delivery_date: date) -> None:
+    uow = uow_factory()
+    with uow:
+        uow.checkpoints.clear(job_name, delivery_date)
 
 
 def run_generate_orders(
     uow_factory: Callable[[], UnitOfWork],
     delivery_date: date,
     page_size: int = 200,
+    bulk: bool = False,
+    shard: tuple[int, int] | None = None,
+    commit_batch_size: int = 1,
+    continue_on_error: bool = False,
+    retry_failed: bool = False,
+    from_scratch: bool = False,
+    advance_schedule: bool = False,
+    use_due_queue: bool = False,
+    on_page: Callable[[list[int]], None] | None = None,
+    subscription_id_range: tuple[int, int] | None = None,
+    chunker: AdaptiveChunker | None = None,
+    lock_retries: int = 3,
 ) -> dict:
+    """
+    Generate orders for every due subscription.
+
+    Modes:
+    - default: one transaction per subscription (OrderService.generate_from_subscription)
+    - commit_batch_size=N (>1): N subscriptions per transaction, one SAVEPOINT each
+      (batches never span pages, so keep page_size >= N)
+    - bulk=True: one transaction per page using multi-row INSERT IGNORE
+      (falls back to the per-subscription path for a page that fails validation)
+
+    Failure handling:
+    - default: the first ValueError aborts the run (as before)
+    - continue_on_error=True: failed subscriptions are recorded in
+      order_generation_failures with their reason code and the run goes on
+    - retry_failed=True: only re-process unresolved failures for delivery_date
+      (implies continue_on_error); successes are marked resolved. Combines
+      with shard like a normal run.
+    - successes only run the resolve UPDATE when delivery_date had unresolved
+      failures at the start of the run (or under retry_failed)
+
+    shard=(index, count) restricts the run to subscriptions where id % count == index.
+
+    Checkpoint/resume:
+    - after each fully committed page the last subscription id is saved in
+      job_checkpoints (keyed by job name + shard, delivery_date)
+    - a rerun resumes the scan after that id; from_scratch=True ignores it
+    - the checkpoint is removed when the run completes
+    - retry_failed runs do not use checkpoints
+
+    advance_schedule=True moves next_run_date to the next cycle (Plan.interval_unit /
+    interval_count) for every subscription that has its order for delivery_date,
+    so later runs only scan that day's deliveries. Failed subscriptions stay due.
+    A plan that cannot produce a next date is a SCHEDULE_INVALID failure (the
+    order is kept, the subscription stays due): dead-lettered under
+    continue_on_error, otherwise it aborts the run like any other error.
+
+    use_due_queue=True takes due ids from subscription_due_queue (keyset ranges
+    on its (run_date, subscription_id) index) instead of the subscriptions table.
+    The queue is kept current by the subscription endpoints and advance_schedule;
+    rebuild it with app.jobs.tasks.rebuild_due_queue.
+
+    on_page(subscription_ids) is called after each committed page with the
+    subscriptions that have their order (failures excluded); the fused
+    pipeline (app.jobs.tasks.pipeline) uses it to batch orders as they appear.
+
+    subscription_id_range=(first, last) only processes due subscriptions with
+    first <= id <= last (one leased work item, see app.jobs.tasks.work_queue);
+    such runs keep no checkpoint, the work item lease tracks progress.
+
+    chunker=AdaptiveChunker(...) replaces the fixed page_size: each page is
+    timed and the next page grows or shrinks (AIMD) within the chunker's
+    bounds; a page hitting a lock wait timeout / deadlock is retried in
+    smaller pieces (up to lock_retries times). The chosen sizes are returned
+    under "chunking".
+    """
     created = 0
     existing = 0
-    offset = 0
+    failed = 0
 
-    while True:
-        # read page of eligible subscriptions (read txn)
+    track_failures = continue_on_error or retry_failed
+
+    if bulk:
+        generate_page = _generate_page_bulk
+    elif commit_batch_size > 1:
+        generate_page = partial(_generate_page_batched, commit_batch_size=commit_batch_size)
+    else:
+        generate_page = _generate_page_single
+
+    use_checkpoint = not retry_failed and subscription_id_range is None
+    job_name = _checkpoint_name(shard)
+
+    resolve_failures = retry_failed
+    if track_failures and not retry_failed:
         uow = uow_factory()
         with uow:
-            subs = uow.subscriptions.list_due_active(delivery_date, limit=page_size, offset=offset)
+            resolve_failures = uow.generation_failures.has_unresolved(delivery_date)
+
+    if retry_failed:
+        pages = iter_failed_subscription_ids(uow_factory, delivery_date, chunk_size=page_size, shard=shard)
+    else:
+        if subscription_id_range is not None:
+            after_id, until_id = subscription_id_range[0] - 1, subscription_id_range[1]
+        else:
+            after_id = 0 if from_scratch else _load_checkpoint(uow_factory, job_name, delivery_date)
+            until_id = None
+        pages = iter_due_subscription_ids(
+            uow_factory,
+            delivery_date,
+            chunk_size=page_size,
+            after_id=after_id,
+            shard=shard,
+            use_due_queue=use_due_queue,
+            until_id=until_id,
+            chunker=chunker,
+        )
+
+    for subscription_ids in pages:
+        if chunker is None:
+            result = generate_page(uow_factory, subscription_ids, delivery_date, track_failures)
+        else:
+            result = _generate_page_adaptive(
+                generate_page,
+                uow_factory,
+                subscription_ids,
+                delivery_date,
+                track_failures,
+                chunker,
+                lock_retries,
+            )
+        created += result.created
+        existing += result.existing
+
+        failures = result.failures
+        failed_ids = {subscription_id for subscription_id, _ in failures}
+        generated_ids = [sid for sid in subscription_ids if sid not in failed_ids]
+
+        if advance_schedule:
+            # orders are committed; a plan that cannot advance is dead-lettered, not fatal
+            advanced = ScheduleService(uow_factory()).advance_after_generation(generated_ids, delivery_date)
+            if advanced.failures and not track_failures:
+                _, reason = advanced.failures[0]
+                raise ValueError(reason)
+            failures = failures + advanced.failures
+
+        failed += len(failures)
+
+        if track_failures:
+            _update_dead_letter(uow_factory, delivery_date, subscription_ids, failures, resolve_failures)
+
+        if on_page is not None and generated_ids:
+            on_page(generated_ids)
+
+        if use_checkpoint:
+            # whole page committed (failures, if any, are in the dead-letter table)
+            _save_checkpoint(uow_factory, job_name, delivery_date, subscription_ids[-1])
+
+    if use_checkpoint:
+        _clear_checkpoint(uow_factory, job_name, delivery_date)
+
+    summary = {
+        "delivery_date": delivery_date.isoformat(),
+        "created": created,
+        "existing": existing,
+        "failed": failed,
+    }
+    if chunker is not None:
+        summary["chunking"] = chunker.summary()
+    return summary
+
+
+def _run_shard(
+    database_url: str,
+    delivery_date: date,
+    shard: tuple[int, int] | None,
+    options: dict,
+) -> dict:
+    """
+    Process-pool entrypoint: one engine (and connection pool) per worker process.
+    `options` are passed through to run_generate_orders; "chunker_options"
+    (kwargs of chunker_for) gives every process its own AdaptiveChunker.
+    """
+    from app.jobs.chunking import chunker_for
+    from app.jobs.session import JobSessionFactory
+
+    # chunkers hold a lock (not picklable) → each process builds its own;
+    # copy first: with workers=1 the caller's dict is passed in directly
+    options = dict(options)
+    chunker_options = options.pop("chunker_options", None)
+    if chunker_options is not None:
+        options["chunker"] = chunker_for(JOB_NAME, **chunker_options)
+
+    with JobSessionFactory(database_url) as uow_factory:
+        return run_generate_orders(
+            uow_factory=uow_factory,
+            delivery_date=delivery_date,
+            shard=shard,
+            **options,
+        )
+
 
-        if not subs:
-            break
+def run_generate_orders_sharded(
+    database_url: str,
+    delivery_date: date,
+    workers: int,
+    **options,
+) -> dict:
+    """
+    Split due subscriptions into `workers` disjoint shards (id % workers)
+    and generate them in a process pool. Per-shard counts are merged into
+    the usual summary.
 
-        for sub in subs:
-            # One subscription = one transaction
-            uow2 = uow_factory()
-            svc = OrderService(uow2)
+    Safe because every subscription is independent and row-locked by the
+    generation path itself.
+    """
+    from concurrent.futures import ProcessPoolExecutor
 
-            _, was_created = svc.generate_from_subscription(sub.id, delivery_date)
-            if was_created:
-                created += 1
-            else:
-                existing += 1
+    if workers <= 1:
+        return _run_shard(database_url, delivery_date, None, options)
 
-        offset += page_size
+    summary = {"delivery_date": delivery_date.isoformat(), "created": 0, "existing": 0, "failed": 0}
 
-    return {"delivery_date": delivery_date.isoformat(), "created": created, "existing": existing}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_run_shard, database_url, delivery_date, (i, workers), options)
+            for i in range(workers)
+        ]
+        for fut in futures:
+            result = fut.result()
+            for key in ("created", "existing", "failed"):
+                summary[key] += result[key]
+
+    return summary
 
 
 def main() -> None:
@@ -49,23 +496,107 @@ def main() -> None:
     Usage:
       python -m app.jobs.tasks.generate_orders 2025-12-29
       python -m app.jobs.tasks.generate_orders   # defaults to today's date
+      python -m app.jobs.tasks.generate_orders 2025-12-29 --bulk
+      python -m app.jobs.tasks.generate_orders 2025-12-29 --commit-batch-size 100
+      python -m app.jobs.tasks.generate_orders 2025-12-29 --workers 4
+      python -m app.jobs.tasks.generate_orders 2025-12-29 --continue-on-error
+      python -m app.jobs.tasks.generate_orders 2025-12-29 --retry-failed
+      python -m app.jobs.tasks.generate_orders 2025-12-29 --retry-failed --workers 4
+      python -m app.jobs.tasks.generate_orders 2025-12-29 --from-scratch
+      python -m app.jobs.tasks.generate_orders 2025-12-29 --advance-schedule
+      python -m app.jobs.tasks.generate_orders 2025-12-29 --advance-schedule --due-queue
+      python -m app.jobs.tasks.generate_orders 2025-12-29 --bulk --adaptive
     """
-    import sys
+    import argparse
 
-    from app.dependencies import get_db_session
+    from app.jobs.chunking import chunker_for
+    from app.jobs.history import record_run
+    from app.jobs.session import JobSessionFactory
 
-    if len(sys.argv) >= 2:
-        delivery_date = date.fromisoformat(sys.argv[1])
-    else:
-        delivery_date = date.today()
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.tasks.generate_orders")
+    parser.add_argument("delivery_date", nargs="?", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="set-based generation: one transaction + multi-row inserts per page",
+    )
+    parser.add_argument(
+        "--commit-batch-size",
+        type=int,
+        default=1,
+        help="subscriptions per transaction (each in its own SAVEPOINT)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="split due subscriptions into N shards (id %% N) processed in a process pool",
+    )
+    parser.add_argument(
+        "--continue-on-error",
+        action="store_true",
+        help="record failing subscriptions in order_generation_failures instead of aborting",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="only re-process unresolved failures recorded for delivery_date",
+    )
+    parser.add_argument(
+        "--from-scratch",
+        action="store_true",
+        help="ignore the saved checkpoint and scan all due subscriptions again",
+    )
+    parser.add_argument(
+        "--advance-schedule",
+        action="store_true",
+        help="move next_run_date to the next cycle for subscriptions that got their order",
+    )
+    parser.add_argument(
+        "--due-queue",
+        action="store_true",
+        help="read due subscriptions from subscription_due_queue",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="tune the page size per page (AIMD on page latency, starting at --page-size)",
+    )
+    parser.add_argument("--target-seconds", type=float, default=1.0, help="adaptive: target latency per page")
+    args = parser.parse_args()
+
+    options = {
+        "page_size": args.page_size,
+        "bulk": args.bulk,
+        "commit_batch_size": args.commit_batch_size,
+        "continue_on_error": args.continue_on_error,
+        "retry_failed": args.retry_failed,
+        "from_scratch": args.from_scratch,
+        "advance_schedule": args.advance_schedule,
+        "use_due_queue": args.due_queue,
+    }
 
-    def uow_factory() -> UnitOfWork:
-        # get_db_session() is a generator dependency; grab one session per UoW
-        db = next(get_db_session())
-        return UnitOfWork(session=db)
+    with JobSessionFactory() as uow_factory, record_run(uow_factory, JOB_NAME, args.delivery_date) as run:
+        chunker_options = {"initial": args.page_size, "target_seconds": args.target_seconds}
+        if args.workers > 1:
+            from app.settings import settings
 
-    result = run_generate_orders(uow_factory=uow_factory, delivery_date=delivery_date)
-    print(f"[generate_orders] {result}")
+            if args.adaptive:
+                options["chunker_options"] = chunker_options
+            result = run.result = run_generate_orders_sharded(
+                database_url=settings.database_url,
+                delivery_date=args.delivery_date,
+                workers=args.workers,
+                **options,
+            )
+        else:
+            if args.adaptive:
+                options["chunker"] = chunker_for(JOB_NAME, **chunker_options)
+            result = run.result = run_generate_orders(
+                uow_factory=uow_factory, delivery_date=args.delivery_date, **options
+            )
+        print(f"[generate_orders] {result}")
 
 
 if __name__ == "__main__":
@@ -5,24 +5,134 @@ from datetime import date, datetime
 from typing import Callable, Optional
 
 from app.services.unit_of_work import UnitOfWork
-from app.services.delivery_batch_service import DeliveryBatchService
+from app.services.delivery_batch_service import DeliveryBatchService, LockResult
+from app.jobs.chunking import AdaptiveChunker, is_lock_error
+
+
+def _lock_in_chunks(
+    svc: DeliveryBatchService,
+    delivery_date: date,
+    now: datetime,
+    reserve_inventory: bool,
+    chunker: AdaptiveChunker,
+    lock_retries: int,
+) -> LockResult:
+    total = LockResult()
+    retries = 0
+    while True:
+        try:
+            with chunker.measure():
+                chunk = svc.lock_and_reserve_chunk(
+                    delivery_date, now, limit=chunker.size, reserve_inventory=reserve_inventory
+                )
+        except Exception as exc:
+            # chunk rolled back; retry with the (smaller) size
+            if not is_lock_error(exc) or retries >= lock_retries:
+                raise
+            retries += 1
+            continue
+
+        retries = 0
+        if not chunk.batch_ids:
+            return total
+
+        total.batch_ids.extend(chunk.batch_ids)
+        for variant_id, quantity in chunk.reserved.items():
+            total.reserved[variant_id] = total.reserved.get(variant_id, 0) + quantity
+        for variant_id, (requested, available) in chunk.shortfalls.items():
+            previous, _ = total.shortfalls.get(variant_id, (0, 0))
+            total.shortfalls[variant_id] = (previous + requested, available)
 
 
 def run_lock_batches(
     uow_factory: Callable[[], UnitOfWork],
     delivery_date: date,
     now: Optional[datetime] = None,
+    reserve_inventory: bool = False,
+    chunker: AdaptiveChunker | None = None,
+    lock_retries: int = 3,
 ) -> dict:
+    """
+    Lock due batches of delivery_date; reserve_inventory=True also reserves inventory
+    for the batches this call locked (opt-in: the plain job only locks).
+    shortfalls: {variant_id: {"requested", "available"}} for variants that could not be reserved.
+
+    chunker=AdaptiveChunker(...) locks in chunks of chunker.size batches (one
+    transaction each, SKIP LOCKED) sized by AIMD on chunk latency; a chunk hitting
+    a lock wait timeout / deadlock is retried smaller. Reservation shortfalls
+    are then decided per chunk. The chosen sizes are returned under "chunking".
+    """
     if now is None:
         now = datetime.utcnow()
 
     uow = uow_factory()
     svc = DeliveryBatchService(uow)
 
-    locked = svc.lock_batches_if_due(delivery_date=delivery_date, now=now)
+    if chunker is not None:
+        result = _lock_in_chunks(svc, delivery_date, now, reserve_inventory, chunker, lock_retries)
+        summary = {
+            "delivery_date": delivery_date.isoformat(),
+            "locked": len(result.batch_ids),
+            "now": now.isoformat(),
+        }
+        if reserve_inventory:
+            summary["reserved_variants"] = len(result.reserved)
+            summary["shortfalls"] = {
+                variant_id: {"requested": requested, "available": available}
+                for variant_id, (requested, available) in result.shortfalls.items()
+            }
+        summary["chunking"] = chunker.summary()
+        return summary
+
+    if not reserve_inventory:
+        locked = svc.lock_batches_if_due(delivery_date=delivery_date, now=now)
+        return {
+            "delivery_date": delivery_date.isoformat(),
+            "locked": locked,
+            "now": now.isoformat(),
+        }
+
+    result = svc.lock_and_reserve(delivery_date=delivery_date, now=now)
 
     return {
         "delivery_date": delivery_date.isoformat(),
-        "locked": locked,
+        "locked": len(result.batch_ids),
         "now": now.isoformat(),
+        "reserved_variants": len(result.reserved),
+        "shortfalls": {
+            variant_id: {"requested": requested, "available": available}
+            for variant_id, (requested, available) in result.shortfalls.items()
+        },
     }
+
+
+def main() -> None:
+    """
+    Usage:
+      python -m app.jobs.tasks.lock_batches 2025-12-29
+      python -m app.jobs.tasks.lock_batches 2025-12-29 --reserve-inventory
+      python -m app.jobs.tasks.lock_batches 2025-12-29 --adaptive
+    """
+    import argparse
+
+    from app.jobs.chunking import chunker_for
+    from app.jobs.history import record_run
+    from app.jobs.session import JobSessionFactory
+
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.tasks.lock_batches")
+    parser.add_argument("delivery_date", nargs="?", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--reserve-inventory", action="store_true", help="also reserve inventory for locked batches")
+    parser.add_argument("--adaptive", action="store_true", help="lock in chunks sized by AIMD on transaction latency")
+    parser.add_argument("--target-seconds", type=float, default=1.0, help="adaptive: target latency per chunk")
+    args = parser.parse_args()
+
+    chunker = chunker_for("lock_batches", target_seconds=args.target_seconds) if args.adaptive else None
+    with JobSessionFactory() as uow_factory, record_run(uow_factory, "lock_batches", args.delivery_date) as run:
+        result = run.result = run_lock_batches(
+            uow_factory, args.delivery_date, reserve_inventory=args.reserve_inventory, chunker=chunker
+        )
+        print(f"[lock_batches] {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# app/jobs/tasks/lock_scheduler.py
+from __future__ import annotations
+
+import heapq
+import threading
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+from app.logging import get_logger
+from app.services.unit_of_work import UnitOfWork
+from app.services.delivery_batch_service import DeliveryBatchService
+
+logger = get_logger(__name__)
+
+
+class LockScheduler:
+    """
+    Long-running batch locker driven by cutoff_at instead of cron polling.
+
+    - keeps upcoming (cutoff_at, delivery_date) in a min-heap
+    - sleeps until the earliest cutoff (or the next refresh) and locks that
+      date's due batches with one conditional UPDATE
+    - reloads the heap every refresh_seconds (one indexed query) so batches
+      created meanwhile are picked up; create_batches runs in its own process
+      and sets cutoff_at = now, so a new batch is locked within one refresh
+      interval (overdue cutoffs are included in the reload)
+    - reserve_inventory=True also reserves inventory for locked batches
+      (same as run_lock_batches)
+    - a failing iteration (DB error, deadlock) is logged and retried after
+      an exponential backoff; dates that were not locked stay queued
+
+    Idle DB load is one small query per refresh interval.
+    """
+
+    def __init__(
+        self,
+        uow_factory: Callable[[], UnitOfWork],
+        refresh_seconds: float = 30.0,
+        horizon: timedelta = timedelta(hours=24),
+        clock: Callable[[], datetime] = datetime.utcnow,
+        reserve_inventory: bool = False,
+        error_backoff_seconds: float = 1.0,
+        max_error_backoff_seconds: float = 60.0,
+    ) -> None:
+        self.uow_factory = uow_factory
+        self.reserve_inventory = reserve_inventory
+        self.error_backoff_seconds = error_backoff_seconds
+        self.max_error_backoff_seconds = max_error_backoff_seconds
+        self.refresh_seconds = refresh_seconds
+        self.horizon = horizon
+        self.clock = clock
+
+        self._heap: list[tuple[datetime, date]] = []
+        self._queued: set[tuple[datetime, date]] = set()
+        self._next_refresh: datetime | None = None
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+    def stop(self) -> None:
+        self._stopped = True
+        self._wakeup.set()
+
+    def refresh(self) -> None:
+        now = self.clock()
+        uow = self.uow_factory()
+        with uow:
+            cutoffs = uow.batches.list_upcoming_cutoffs(until=now + self.horizon)
+
+        for delivery_date, cutoff_at in cutoffs:
+            self._push((cutoff_at, delivery_date))
+
+        self._next_refresh = now + timedelta(seconds=self.refresh_seconds)
+
+    def _push(self, key: tuple[datetime, date]) -> None:
+        if key not in self._queued:
+            self._queued.add(key)
+            heapq.heappush(self._heap, key)
+
+    def run_due(self) -> dict[str, list[int]]:
+        """
+        Lock every delivery date whose earliest queued cutoff has passed.
+        Returns {delivery_date: [locked batch ids]} for dates that locked something.
+        If locking a date fails, its keys (and those of the dates after it) are
+        queued again before the error propagates.
+        """
+        now = self.clock()
+        due: dict[date, list[tuple[datetime, date]]] = {}
+        while self._heap and self._heap[0][0] <= now:
+            key = heapq.heappop(self._heap)
+            self._queued.discard(key)
+            due.setdefault(key[1], []).append(key)
+
+        locked: dict[str, list[int]] = {}
+        dates = sorted(due)
+        for i, delivery_date in enumerate(dates):
+            try:
+                ids = self._lock(delivery_date, now)
+            except Exception:
+                for pending in dates[i:]:
+                    for key in due[pending]:
+                        self._push(key)
+                raise
+            if ids:
+                locked[delivery_date.isoformat()] = ids
+        return locked
+
+    def _lock(self, delivery_date: date, now: datetime) -> list[int]:
+        svc = DeliveryBatchService(self.uow_factory())
+        if not self.reserve_inventory:
+            return svc.lock_due_batch_ids(delivery_date, now)
+
+        result = svc.lock_and_reserve(delivery_date, now)
+        for variant_id, (requested, available) in result.shortfalls.items():
+            self.on_shortfall(delivery_date, variant_id, requested, available)
+        return result.batch_ids
+
+    def on_shortfall(self, delivery_date: date, variant_id: int, requested: int, available: int) -> None:
+        logger.warning(
+            "[lock_scheduler] shortfall %s variant=%s requested=%s available=%s",
+            delivery_date.isoformat(),
+            variant_id,
+            requested,
+            available,
+        )
+
+    def seconds_until_next_event(self) -> float:
+        now = self.clock()
+        targets = []
+        if self._heap:
+            targets.append(self._heap[0][0])
+        if self._next_refresh is not None:
+            targets.append(self._next_refresh)
+        if not targets:
+            return 0.0
+        return max(0.0, (min(targets) - now).total_seconds())
+
+    def run_forever(self, on_locked: Callable[[dict[str, list[int]]], None] | None = None) -> None:
+        backoff = self.error_backoff_seconds
+        while not self._stopped:
+            try:
+                if self._next_refresh is None or self.clock() >= self._next_refresh:
+                    self.refresh()
+                locked = self.run_due()
+            except Exception:
+                # transient DB errors / deadlocks must not kill the daemon
+                logger.exception("[lock_scheduler] iteration failed; retrying in %.1fs", backoff)
+                self._wakeup.wait(timeout=backoff)
+                self._wakeup.clear()
+                backoff = min(backoff * 2, self.max_error_backoff_seconds)
+                continue
+
+            backoff = self.error_backoff_seconds
+            if locked and on_locked is not None:
+                on_locked(locked)
+
+            self._wakeup.wait(timeout=self.seconds_until_next_event())
+            self._wakeup.clear()
+
+
+def main() -> None:
+    """
+    Usage:
+      python -m app.jobs.tasks.lock_scheduler
+      python -m app.jobs.tasks.lock_scheduler --refresh-seconds 10
+    """
+    import argparse
+    import signal
+
+    from app.jobs.session import JobSessionFactory
+
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.tasks.lock_scheduler")
+    parser.add_argument("--refresh-seconds", type=float, default=30.0, help="how often to reload upcoming cutoffs")
+    parser.add_argument("--horizon-hours", type=float, default=24.0, help="how far ahead to queue cutoffs")
+    parser.add_argument("--reserve-inventory", action="store_true", help="also reserve inventory for locked batches")
+    args = parser.parse_args()
+
+    with JobSessionFactory() as uow_factory:
+        scheduler = LockScheduler(
+            uow_factory,
+            refresh_seconds=args.refresh_seconds,
+            horizon=timedelta(hours=args.horizon_hours),
+            reserve_inventory=args.reserve_inventory,
+        )
+        signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+        signal.signal(signal.SIGINT, lambda *_: scheduler.stop())
+
+        scheduler.run_forever(on_locked=lambda locked: print(f"[lock_scheduler] locked {locked}", flush=True))
+
+
+if __name__ == "__main__":
+    main()
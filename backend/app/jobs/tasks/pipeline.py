@@ -0,0 +1,295 @@
+# app/jobs/tasks/pipeline.py
+from __future__ import annotations
+
+import queue
+import threading
+from array import array
+from datetime import date, datetime
+from typing import Callable, Dict, Optional
+
+from app.services.unit_of_work import UnitOfWork
+from app.services.zone_service import ZoneService
+from app.jobs.tasks.generate_orders import run_generate_orders
+from app.jobs.tasks.create_batches import (
+    DEFAULT_BATCH_STATUS,
+    DEFAULT_ELIGIBLE_ORDER_STATUS,
+    _batch_zone,
+    _zone_capacity,
+)
+from app.jobs.tasks.lock_batches import run_lock_batches
+
+
+_DONE = object()
+
+
+class _BatchingStage:
+    """
+    Consumer side of the pipeline: buffers (order id, items) per zone and
+    attaches a zone's buffer with _batch_zone once it reaches micro_batch_size.
+    Open batches are filled first, so micro-batches of one zone end up in the
+    same batches a single create_batches run would produce (up to packing order).
+    """
+
+    def __init__(
+        self,
+        uow_factory: Callable[[], UnitOfWork],
+        delivery_date: date,
+        zone_limits: dict[int, tuple[int | None, int | None]],
+        max_orders: int | None,
+        max_items: int | None,
+        with_items: bool,
+        batch_status: int,
+        micro_batch_size: int,
+    ) -> None:
+        self.uow_factory = uow_factory
+        self.delivery_date = delivery_date
+        self.zone_limits = zone_limits
+        self.max_orders = max_orders
+        self.max_items = max_items
+        self.with_items = with_items
+        self.batch_status = batch_status
+        self.micro_batch_size = micro_batch_size
+
+        self.groups: Dict[int | None, array] = {}
+        self.group_items: Dict[int | None, array] = {}
+        self.batches_created = 0
+        self.orders_attached = 0
+
+    def add(self, rows: list[tuple[int, int | None, int]]) -> None:
+        for order_id, zone_id, item_qty in rows:
+            ids = self.groups.get(zone_id)
+            if ids is None:
+                ids = self.groups[zone_id] = array("Q")
+                self.group_items[zone_id] = array("L")
+            ids.append(order_id)
+            if self.with_items:
+                self.group_items[zone_id].append(item_qty)
+
+            if len(ids) >= self.micro_batch_size:
+                self.flush(zone_id)
+
+    def flush(self, zone_id: int | None) -> None:
+        order_ids = self.groups.pop(zone_id, None)
+        items = self.group_items.pop(zone_id, None)
+        if not order_ids:
+            return
+
+        max_orders, max_items = _zone_capacity(self.zone_limits, zone_id, self.max_orders, self.max_items)
+        created, attached, _ = _batch_zone(
+            self.uow_factory,
+            self.delivery_date,
+            zone_id,
+            order_ids,
+            items if self.with_items else None,
+            max_orders,
+            max_items,
+            self.batch_status,
+        )
+        self.batches_created += created
+        self.orders_attached += attached
+
+    def flush_all(self) -> None:
+        for zone_id in list(self.groups):
+            self.flush(zone_id)
+
+
+def run_pipeline(
+    uow_factory: Callable[[], UnitOfWork],
+    delivery_date: date,
+    eligible_order_status: int = DEFAULT_ELIGIBLE_ORDER_STATUS,
+    batch_status: int = DEFAULT_BATCH_STATUS,
+    max_orders_per_batch: int | None = None,
+    max_items_per_batch: int | None = None,
+    queue_size: int = 8,
+    micro_batch_size: int = 500,
+    lock: bool = True,
+    now: Optional[datetime] = None,
+    reserve_inventory: bool = False,
+    **generate_options,
+) -> dict:
+    """
+    generate → batch → lock in one pass, without re-reading the day between stages.
+
+    - generation (run_generate_orders, options passed through) hands every
+      committed page to the batching stage: the page's orders are zoned and
+      read back by subscription id (two statements on indexed columns)
+    - pages travel through a bounded queue.Queue(queue_size) to a batching
+      thread; a full queue blocks generation (backpressure), so at most
+      queue_size pages + one micro-batch per zone are held in memory
+    - the batching thread attaches a zone once micro_batch_size of its orders
+      are buffered, and flushes the rest at the end
+    - lock=True then locks due batches as run_lock_batches (reserve_inventory=True
+      also reserves inventory for them)
+
+    queue_size=0 runs batching inline in the generation thread (one connection).
+    Otherwise the two stages use separate UnitOfWorks at the same time, so
+    uow_factory must hand out a new session per call.
+
+    Orders not batched here (crash, late status change) are picked up by the
+    next create_batches run, which stays the reconciliation pass.
+    """
+    from app.settings import settings
+
+    if micro_batch_size < 1:
+        raise ValueError("PIPELINE_MICRO_BATCH_SIZE_INVALID")
+
+    if max_orders_per_batch is None:
+        max_orders_per_batch = settings.batch_max_orders
+    if max_items_per_batch is None:
+        max_items_per_batch = settings.batch_max_items
+
+    uow = uow_factory()
+    with uow:
+        zone_limits = uow.zones.get_batch_limits()
+        # read once per run, not once per page
+        active_zone_ids = uow.zones.list_active_ids()
+    with_items = max_items_per_batch is not None or any(items is not None for _, items in zone_limits.values())
+
+    stage = _BatchingStage(
+        uow_factory,
+        delivery_date,
+        zone_limits,
+        max_orders_per_batch,
+        max_items_per_batch,
+        with_items,
+        batch_status,
+        micro_batch_size,
+    )
+
+    def read_page(subscription_ids: list[int]) -> list[tuple[int, int | None, int]]:
+        ZoneService(uow_factory()).assign_order_zones(
+            delivery_date, subscription_ids=subscription_ids, zone_ids=active_zone_ids
+        )
+        uow = uow_factory()
+        with uow:
+            return uow.orders.list_unbatched_for_subscriptions(
+                delivery_date, subscription_ids, eligible_order_status, with_item_counts=with_items
+            )
+
+    if queue_size <= 0:
+        generated = run_generate_orders(
+            uow_factory,
+            delivery_date,
+            on_page=lambda subscription_ids: stage.add(read_page(subscription_ids)),
+            **generate_options,
+        )
+        stage.flush_all()
+    else:
+        pages: queue.Queue = queue.Queue(maxsize=queue_size)
+        errors: list[BaseException] = []
+
+        def consume() -> None:
+            while True:
+                rows = pages.get()
+                if rows is _DONE:
+                    break
+                if errors:
+                    continue   # keep draining so the producer never blocks on a dead consumer
+                try:
+                    stage.add(rows)
+                except BaseException as exc:
+                    errors.append(exc)
+            if not errors:
+                try:
+                    stage.flush_all()
+                except BaseException as exc:
+                    errors.append(exc)
+
+        def produce(subscription_ids: list[int]) -> None:
+            if errors:
+                raise errors[0]
+            pages.put(read_page(subscription_ids))
+
+        consumer = threading.Thread(target=consume, name="pipeline-batching", daemon=True)
+        consumer.start()
+        try:
+            generated = run_generate_orders(uow_factory, delivery_date, on_page=produce, **generate_options)
+        finally:
+            pages.put(_DONE)
+            consumer.join()
+
+        if errors:
+            raise errors[0]
+
+    summary = {
+        "delivery_date": delivery_date.isoformat(),
+        "created": generated["created"],
+        "existing": generated["existing"],
+        "failed": generated["failed"],
+        "batches_created": stage.batches_created,
+        "orders_attached": stage.orders_attached,
+    }
+    if "chunking" in generated:
+        summary["chunking"] = generated["chunking"]
+
+    if lock:
+        locked = run_lock_batches(uow_factory, delivery_date, now=now, reserve_inventory=reserve_inventory)
+        summary["locked"] = locked["locked"]
+        if reserve_inventory:
+            summary["reserved_variants"] = locked["reserved_variants"]
+            summary["shortfalls"] = locked["shortfalls"]
+
+    return summary
+
+
+def main() -> None:
+    """
+    CLI entrypoint.
+
+    Usage:
+      python -m app.jobs.tasks.pipeline 2025-12-29
+      python -m app.jobs.tasks.pipeline 2025-12-29 --bulk --advance-schedule --due-queue
+      python -m app.jobs.tasks.pipeline 2025-12-29 --no-lock --micro-batch-size 1000
+      python -m app.jobs.tasks.pipeline 2025-12-29 --adaptive
+    """
+    import argparse
+
+    from app.jobs.chunking import chunker_for
+    from app.jobs.history import record_run
+    from app.jobs.session import JobSessionFactory
+
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.tasks.pipeline")
+    parser.add_argument("delivery_date", nargs="?", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--bulk", action="store_true", help="set-based generation (see generate_orders --bulk)")
+    parser.add_argument("--continue-on-error", action="store_true")
+    parser.add_argument("--advance-schedule", action="store_true")
+    parser.add_argument("--due-queue", action="store_true")
+    parser.add_argument("--queue-size", type=int, default=8, help="generated pages buffered before generation waits")
+    parser.add_argument("--micro-batch-size", type=int, default=500, help="orders per zone attached at once")
+    parser.add_argument("--max-orders", type=int, default=None, help="default max orders per batch")
+    parser.add_argument("--max-items", type=int, default=None, help="default max item quantity per batch")
+    parser.add_argument("--no-lock", action="store_true", help="stop after batching")
+    parser.add_argument("--reserve-inventory", action="store_true", help="also reserve inventory for locked batches")
+    parser.add_argument("--adaptive", action="store_true", help="tune the generation page size (see generate_orders)")
+    parser.add_argument("--target-seconds", type=float, default=1.0, help="adaptive: target latency per page")
+    args = parser.parse_args()
+
+    chunker = (
+        chunker_for("generate_orders", initial=args.page_size, target_seconds=args.target_seconds)
+        if args.adaptive
+        else None
+    )
+
+    with JobSessionFactory() as uow_factory, record_run(uow_factory, "pipeline", args.delivery_date) as run:
+        result = run.result = run_pipeline(
+            uow_factory,
+            args.delivery_date,
+            max_orders_per_batch=args.max_orders,
+            max_items_per_batch=args.max_items,
+            queue_size=args.queue_size,
+            micro_batch_size=args.micro_batch_size,
+            lock=not args.no_lock,
+            reserve_inventory=args.reserve_inventory,
+            page_size=args.page_size,
+            bulk=args.bulk,
+            continue_on_error=args.continue_on_error,
+            advance_schedule=args.advance_schedule,
+            use_due_queue=args.due_queue,
+            chunker=chunker,
+        )
+        print(f"[pipeline] {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# app/jobs/tasks/rebuild_due_queue.py
+from __future__ import annotations
+
+from typing import Callable
+
+from app.services.unit_of_work import UnitOfWork
+
+
+def run_rebuild_due_queue(
+    uow_factory: Callable[[], UnitOfWork],
+    check_only: bool = False,
+) -> dict:
+    """
+    Consistency check for subscription_due_queue against subscriptions.
+
+    - missing: schedulable subscriptions without a queue row at next_run_date
+    - stale:   queue rows with no matching schedulable subscription
+
+    Unless check_only, the queue is rebuilt from scratch in one transaction
+    when anything is off.
+    """
+    uow = uow_factory()
+    with uow:
+        missing = uow.due_queue.count_missing()
+        stale = uow.due_queue.count_stale()
+
+    queued = None
+    if not check_only and (missing or stale):
+        uow = uow_factory()
+        with uow:
+            queued = uow.due_queue.rebuild()
+
+    return {
+        "missing": missing,
+        "stale": stale,
+        "rebuilt": queued is not None,
+        "queued": queued,
+    }
+
+
+def main() -> None:
+    """
+    Usage:
+      python -m app.jobs.tasks.rebuild_due_queue
+      python -m app.jobs.tasks.rebuild_due_queue --check-only
+    """
+    import argparse
+
+    from app.jobs.session import JobSessionFactory
+
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.tasks.rebuild_due_queue")
+    parser.add_argument("--check-only", action="store_true", help="report drift without rebuilding")
+    args = parser.parse_args()
+
+    with JobSessionFactory() as uow_factory:
+        result = run_rebuild_due_queue(uow_factory, check_only=args.check_only)
+        print(f"[rebuild_due_queue] {result}")
+
+
+if __name__ == "__main__":
+    main()
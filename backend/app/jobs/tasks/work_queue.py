@@ -0,0 +1,465 @@
+# app/jobs/tasks/work_queue.py
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+from app.logging import get_logger
+from app.services.unit_of_work import UnitOfWork
+from app.infrastructure.db.repos_sqlalchemy.work_item_repo import (
+    WORK_ITEM_STATUS_DONE,
+    WORK_ITEM_STATUS_FAILED,
+    WORK_ITEM_STATUS_LEASED,
+    WORK_ITEM_STATUS_PENDING,
+)
+from app.jobs.tasks.assign_zones import run_assign_zones
+from app.jobs.tasks.create_batches import run_create_batches
+from app.jobs.tasks.generate_orders import iter_due_subscription_ids, run_generate_orders
+
+logger = get_logger(__name__)
+
+GENERATE_JOB = "generate_orders"
+BATCH_JOB = "create_batches"
+
+# create_batches items carry the zone id in range_start; unzoned orders use 0
+UNZONED = 0
+
+_STATUS_NAMES = {
+    WORK_ITEM_STATUS_PENDING: "pending",
+    WORK_ITEM_STATUS_LEASED: "leased",
+    WORK_ITEM_STATUS_DONE: "done",
+    WORK_ITEM_STATUS_FAILED: "failed",
+}
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _enqueue(uow_factory: Callable[[], UnitOfWork], job_name: str, delivery_date: date, ranges: list) -> int:
+    enqueued = 0
+    for start in range(0, len(ranges), 1000):
+        uow = uow_factory()
+        with uow:
+            enqueued += uow.work_items.enqueue_many(job_name, delivery_date, ranges[start : start + 1000])
+    return enqueued
+
+
+def enqueue_generate_orders(
+    uow_factory: Callable[[], UnitOfWork],
+    delivery_date: date,
+    unit_size: int = 1000,
+    use_due_queue: bool = False,
+) -> dict:
+    """
+    One work item per fixed-width subscription id bucket that has due subscriptions
+    ([k * unit_size + 1, (k + 1) * unit_size]). Buckets do not depend on which
+    subscriptions are due, so enqueueing again only adds buckets that are new.
+
+    A bucket whose item is already DONE but has due subscriptions without an
+    order for delivery_date (due after it was worked) is set back to PENDING,
+    so enqueue can be rerun during the day like enqueue_create_batches.
+    """
+    if unit_size < 1:
+        raise ValueError("WORK_UNIT_SIZE_INVALID")
+
+    buckets: list[int] = []
+    open_buckets: list[int] = []
+    for ids in iter_due_subscription_ids(uow_factory, delivery_date, chunk_size=2000, use_due_queue=use_due_queue):
+        uow = uow_factory()
+        with uow:
+            generated = uow.orders.list_subscription_ids_with_order(delivery_date, ids)
+        for subscription_id in ids:
+            bucket = (subscription_id - 1) // unit_size
+            if not buckets or buckets[-1] != bucket:
+                buckets.append(bucket)
+            if subscription_id not in generated and (not open_buckets or open_buckets[-1] != bucket):
+                open_buckets.append(bucket)
+
+    ranges = [(bucket * unit_size + 1, (bucket + 1) * unit_size) for bucket in buckets]
+    enqueued = _enqueue(uow_factory, GENERATE_JOB, delivery_date, ranges)
+
+    reopened = 0
+    for start in range(0, len(open_buckets), 1000):
+        uow = uow_factory()
+        with uow:
+            reopened += uow.work_items.reopen_done(
+                GENERATE_JOB,
+                delivery_date,
+                [bucket * unit_size + 1 for bucket in open_buckets[start : start + 1000]],
+            )
+
+    return {
+        "job_name": GENERATE_JOB,
+        "delivery_date": delivery_date.isoformat(),
+        "units": len(ranges),
+        "enqueued": enqueued,
+        "reopened": reopened,
+    }
+
+
+def enqueue_create_batches(
+    uow_factory: Callable[[], UnitOfWork],
+    delivery_date: date,
+    eligible_order_status: int = 1,
+    assign_zones: bool = True,
+) -> dict:
+    """
+    One work item per zone that has unbatched orders (zones never share batches).
+    Zone routing runs once here, not in every worker.
+
+    A zone whose item is already DONE but has unbatched orders again (orders
+    that arrived after it was worked) is set back to PENDING.
+    """
+    if assign_zones:
+        run_assign_zones(uow_factory, delivery_date)
+
+    uow = uow_factory()
+    with uow:
+        zone_ids = uow.orders.list_unbatched_zone_ids(delivery_date, eligible_order_status)
+
+    ranges = [(zone_id or UNZONED, zone_id or UNZONED) for zone_id in zone_ids]
+    enqueued = _enqueue(uow_factory, BATCH_JOB, delivery_date, ranges)
+
+    reopened = 0
+    for start in range(0, len(ranges), 1000):
+        uow = uow_factory()
+        with uow:
+            reopened += uow.work_items.reopen_done(
+                BATCH_JOB, delivery_date, [zone for zone, _ in ranges[start : start + 1000]]
+            )
+
+    return {
+        "job_name": BATCH_JOB,
+        "delivery_date": delivery_date.isoformat(),
+        "units": len(ranges),
+        "enqueued": enqueued,
+        "reopened": reopened,
+    }
+
+
+class _Heartbeat:
+    """
+    Background lease extension for the items a worker currently holds.
+    Uses its own UnitOfWork per beat, so uow_factory must hand out a new session per call.
+
+    A failing beat (DB error) is logged and retried on the next tick, so one
+    transient error does not let the leases run out while the worker keeps going.
+    lost = most items found no longer held by owner in one beat (lease expired and
+    taken over); errors = failed beats. Both go into the worker summary.
+    """
+
+    def __init__(
+        self,
+        uow_factory: Callable[[], UnitOfWork],
+        owner: str,
+        item_ids: list[int],
+        lease_seconds: float,
+    ) -> None:
+        self.uow_factory = uow_factory
+        self.owner = owner
+        self.item_ids = list(item_ids)
+        self.lease_seconds = lease_seconds
+        self.lost = 0
+        self.errors = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="work-item-heartbeat", daemon=True)
+
+    def start(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def release(self, item_id: int) -> None:
+        if item_id in self.item_ids:
+            self.item_ids.remove(item_id)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.lease_seconds / 3):
+            item_ids = list(self.item_ids)
+            if not item_ids:
+                continue
+            try:
+                uow = self.uow_factory()
+                with uow:
+                    held = uow.work_items.heartbeat(
+                        item_ids,
+                        self.owner,
+                        datetime.utcnow() + timedelta(seconds=self.lease_seconds),
+                    )
+            except Exception:
+                self.errors += 1
+                logger.exception("[work_queue] heartbeat failed for %s; retrying", self.owner)
+                continue
+
+            if held < len(item_ids):
+                logger.warning(
+                    "[work_queue] %s lost the lease of %d item(s); results may be redone by another worker",
+                    self.owner,
+                    len(item_ids) - held,
+                )
+            self.lost = max(self.lost, len(item_ids) - held)
+
+
+def run_worker(
+    uow_factory: Callable[[], UnitOfWork],
+    job_name: str,
+    delivery_date: date,
+    process: Callable[[int, int], dict],
+    owner: str | None = None,
+    claim_size: int = 1,
+    lease_seconds: float = 300.0,
+    max_attempts: int = 3,
+    poll_seconds: float = 5.0,
+    heartbeat: bool = True,
+) -> dict:
+    """
+    Stateless worker loop: claim → process(range_start, range_end) → done / failed.
+
+    - claims use SELECT ... FOR UPDATE SKIP LOCKED (short transaction), so any
+      number of workers on any number of hosts can run against the same MySQL
+    - while an item is processed its lease is extended every lease_seconds / 3;
+      a crashed worker's items become claimable again once the lease expires
+    - an exception gives the item back (pending) until max_attempts, then FAILED;
+      an item whose lease expired max_attempts times (worker crashed on it) is
+      set FAILED at the next claim instead of looping forever
+    - the loop ends when nothing is pending or leased; while other workers
+      still hold leases it polls every poll_seconds (to pick up expired ones)
+
+    process must be idempotent: after a lease expires an item can run twice.
+    Numeric result values are summed into the returned summary; items_lost counts
+    items whose lease was gone at completion, leases_lost / heartbeat_errors what
+    the heartbeat saw while processing.
+    """
+    owner = owner or default_owner()
+    summary: dict = {
+        "job_name": job_name,
+        "delivery_date": delivery_date.isoformat(),
+        "owner": owner,
+        "items_done": 0,
+        "items_failed": 0,
+        "items_lost": 0,
+        "leases_lost": 0,
+        "heartbeat_errors": 0,
+    }
+
+    while True:
+        uow = uow_factory()
+        with uow:
+            items = uow.work_items.claim(
+                job_name,
+                delivery_date,
+                owner,
+                limit=claim_size,
+                lease_seconds=lease_seconds,
+                now=datetime.utcnow(),
+                max_attempts=max_attempts,
+            )
+
+        if not items:
+            uow = uow_factory()
+            with uow:
+                counts = uow.work_items.count_by_status(job_name, delivery_date)
+            if not counts.get(WORK_ITEM_STATUS_PENDING) and not counts.get(WORK_ITEM_STATUS_LEASED):
+                return summary
+            time.sleep(poll_seconds)
+            continue
+
+        beat = _Heartbeat(uow_factory, owner, [item[0] for item in items], lease_seconds).start() if heartbeat else None
+        try:
+            for item_id, range_start, range_end, attempts in items:
+                try:
+                    result = process(range_start, range_end)
+                except Exception as exc:
+                    uow = uow_factory()
+                    with uow:
+                        uow.work_items.fail(
+                            item_id, owner, f"{type(exc).__name__}: {exc}", retry=attempts < max_attempts
+                        )
+                    summary["items_failed"] += 1
+                    continue
+                finally:
+                    if beat is not None:
+                        beat.release(item_id)
+
+                uow = uow_factory()
+                with uow:
+                    held = uow.work_items.complete(item_id, owner)
+                if held:
+                    summary["items_done"] += 1
+                else:
+                    # lease expired and another worker took the item over
+                    summary["items_lost"] += 1
+
+                for key, value in result.items():
+                    if isinstance(value, int) and not isinstance(value, bool):
+                        summary[key] = summary.get(key, 0) + value
+        finally:
+            if beat is not None:
+                beat.stop()
+                summary["leases_lost"] += beat.lost
+                summary["heartbeat_errors"] += beat.errors
+
+
+def run_generate_orders_worker(
+    uow_factory: Callable[[], UnitOfWork],
+    delivery_date: date,
+    owner: str | None = None,
+    claim_size: int = 1,
+    lease_seconds: float = 300.0,
+    max_attempts: int = 3,
+    poll_seconds: float = 5.0,
+    heartbeat: bool = True,
+    **options,
+) -> dict:
+    """
+    Work generate_orders items: run_generate_orders over each leased
+    subscription id range (`options` are passed through, e.g. bulk=True).
+    """
+    return run_worker(
+        uow_factory,
+        GENERATE_JOB,
+        delivery_date,
+        lambda first_id, last_id: run_generate_orders(
+            uow_factory, delivery_date, subscription_id_range=(first_id, last_id), **options
+        ),
+        owner=owner,
+        claim_size=claim_size,
+        lease_seconds=lease_seconds,
+        max_attempts=max_attempts,
+        poll_seconds=poll_seconds,
+        heartbeat=heartbeat,
+    )
+
+
+def run_create_batches_worker(
+    uow_factory: Callable[[], UnitOfWork],
+    delivery_date: date,
+    owner: str | None = None,
+    claim_size: int = 1,
+    lease_seconds: float = 300.0,
+    max_attempts: int = 3,
+    poll_seconds: float = 5.0,
+    heartbeat: bool = True,
+    **options,
+) -> dict:
+    """
+    Work create_batches items: run_create_batches for each leased zone
+    (zones were routed at enqueue time, so assign_zones is off here).
+    """
+    return run_worker(
+        uow_factory,
+        BATCH_JOB,
+        delivery_date,
+        lambda zone_id, _: run_create_batches(
+            uow_factory,
+            delivery_date,
+            assign_zones=False,
+            zone_ids=[None if zone_id == UNZONED else zone_id],
+            **options,
+        ),
+        owner=owner,
+        claim_size=claim_size,
+        lease_seconds=lease_seconds,
+        max_attempts=max_attempts,
+        poll_seconds=poll_seconds,
+        heartbeat=heartbeat,
+    )
+
+
+def work_queue_status(uow_factory: Callable[[], UnitOfWork], job_name: str, delivery_date: date) -> dict:
+    uow = uow_factory()
+    with uow:
+        counts = uow.work_items.count_by_status(job_name, delivery_date)
+    return {
+        "job_name": job_name,
+        "delivery_date": delivery_date.isoformat(),
+        **{name: counts.get(status, 0) for status, name in _STATUS_NAMES.items()},
+    }
+
+
+def main() -> None:
+    """
+    Usage:
+      python -m app.jobs.tasks.work_queue enqueue generate 2025-12-29 --unit-size 1000
+      python -m app.jobs.tasks.work_queue work generate 2025-12-29 --bulk      # on every worker node
+      python -m app.jobs.tasks.work_queue enqueue generate 2025-12-29          # again later: reopens buckets with new due subs
+      python -m app.jobs.tasks.work_queue enqueue batch 2025-12-29
+      python -m app.jobs.tasks.work_queue work batch 2025-12-29
+      python -m app.jobs.tasks.work_queue status generate 2025-12-29
+      python -m app.jobs.tasks.work_queue retry-failed generate 2025-12-29
+    """
+    import argparse
+
+    from app.jobs.session import JobSessionFactory
+
+    jobs = {"generate": GENERATE_JOB, "batch": BATCH_JOB}
+
+    parser = argparse.ArgumentParser(prog="python -m app.jobs.tasks.work_queue")
+    parser.add_argument("command", choices=["enqueue", "work", "status", "retry-failed"])
+    parser.add_argument("job", choices=sorted(jobs))
+    parser.add_argument("delivery_date", nargs="?", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--unit-size", type=int, default=1000, help="subscription ids per generate item")
+    parser.add_argument(
+        "--due-queue", action="store_true", help="generate: read due ids from subscription_due_queue (enqueue + work)"
+    )
+    parser.add_argument("--claim-size", type=int, default=1, help="items leased per claim")
+    parser.add_argument("--lease-seconds", type=float, default=300.0)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--bulk", action="store_true", help="generate: set-based pages")
+    parser.add_argument("--continue-on-error", action="store_true", help="generate: dead-letter failing subscriptions")
+    parser.add_argument("--max-orders", type=int, default=None, help="batch: default max orders per batch")
+    parser.add_argument("--max-items", type=int, default=None, help="batch: default max item quantity per batch")
+    args = parser.parse_args()
+
+    job_name = jobs[args.job]
+    worker_options = {
+        "claim_size": args.claim_size,
+        "lease_seconds": args.lease_seconds,
+        "max_attempts": args.max_attempts,
+    }
+
+    with JobSessionFactory() as uow_factory:
+        if args.command == "enqueue" and args.job == "generate":
+            result = enqueue_generate_orders(
+                uow_factory, args.delivery_date, unit_size=args.unit_size, use_due_queue=args.due_queue
+            )
+        elif args.command == "enqueue":
+            result = enqueue_create_batches(uow_factory, args.delivery_date)
+        elif args.command == "work" and args.job == "generate":
+            result = run_generate_orders_worker(
+                uow_factory,
+                args.delivery_date,
+                bulk=args.bulk,
+                continue_on_error=args.continue_on_error,
+                use_due_queue=args.due_queue,
+                **worker_options,
+            )
+        elif args.command == "work":
+            result = run_create_batches_worker(
+                uow_factory,
+                args.delivery_date,
+                max_orders_per_batch=args.max_orders,
+                max_items_per_batch=args.max_items,
+                **worker_options,
+            )
+        elif args.command == "retry-failed":
+            uow = uow_factory()
+            with uow:
+                reset = uow.work_items.retry_failed(job_name, args.delivery_date)
+            result = {"job_name": job_name, "delivery_date": args.delivery_date.isoformat(), "reset": reset}
+        else:
+            result = work_queue_status(uow_factory, job_name, args.delivery_date)
+
+        print(f"[work_queue] {result}")
+
+
+if __name__ == "__main__":
+    main()
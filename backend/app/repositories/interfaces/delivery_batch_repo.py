@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from datetime import date
-from typing import Protocol
+from datetime import date, datetime
+from typing import Iterable, Protocol
 
 from app.infrastructure.db.models.delivery_batch import DeliveryBatch
 from app.infrastructure.db.models.order import Order
@@ -12,8 +12,30 @@ class DeliveryBatchRepo(Protocol):
 
     def create_open(self, delivery_date: date, zone_id: int | None, cutoff_at) -> DeliveryBatch: ...
 
+    def list_for_zone_for_update(self, delivery_date: date, zone_id: int | None) -> list[DeliveryBatch]: ...
+
+    def get_loads(self, batch_ids: list[int], with_items: bool = False) -> dict[int, tuple[int, int]]: ...
+
     def has_order(self, batch_id: int, order_id: int) -> bool: ...
 
     def add_order(self, batch: DeliveryBatch, order: Order) -> None: ...
 
+    def attach_orders(self, batch_id: int, order_ids: Iterable[int]) -> int: ...
+
+    def attach_unbatched_orders(self, batch_id: int, order_ids: Iterable[int]) -> int: ...
+
+    def filter_unattached(self, order_ids: list[int]) -> list[int]: ...
+
+    def sum_item_quantities_by_variant(self, batch_ids: list[int]) -> list[tuple[int, int]]: ...
+
+    def list_upcoming_cutoffs(self, until: datetime, limit: int = 1000) -> list[tuple[date, datetime]]: ...
+
     def lock_due_batches(self, delivery_date: date, now) -> int: ...
+
+    def lock_due_batch_ids(
+        self,
+        delivery_date: date,
+        now: datetime,
+        limit: int | None = None,
+        skip_locked: bool = False,
+    ) -> list[int]: ...
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Protocol
+
+
+class DueQueueRepo(Protocol):
+    def list_due_ids(
+        self,
+        cycle_date: date,
+        limit: int,
+        after_id: int = 0,
+        shard: tuple[int, int] | None = None,
+    ) -> list[int]: ...
+
+    def sync(self, subscription_id: int) -> None: ...
+
+    def reschedule(self, subscription_ids: list[int], from_date: date, to_date: date) -> int: ...
+
+    def remove_many(self, subscription_ids: list[int]) -> int: ...
+
+    def count_missing(self) -> int: ...
+
+    def count_stale(self) -> int: ...
+
+    def rebuild(self) -> int: ...
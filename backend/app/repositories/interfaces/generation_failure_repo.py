@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Protocol
+
+
+class GenerationFailureRepo(Protocol):
+    def record_many(self, delivery_date: date, failures: list[tuple[int, str]]) -> None: ...
+
+    def resolve_many(self, delivery_date: date, subscription_ids: list[int]) -> int: ...
+
+    def has_unresolved(self, delivery_date: date) -> bool: ...
+
+    def list_unresolved_ids(
+        self,
+        delivery_date: date,
+        limit: int,
+        after_id: int = 0,
+        shard: tuple[int, int] | None = None,
+    ) -> list[int]: ...
@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+from typing import Protocol
+
+
+class InventoryRepo(Protocol):
+    def reserve(self, variant_id: int, quantity: int) -> bool: ...
+
+    def get_available(self, variant_ids: list[int]) -> dict[int, int]: ...
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Protocol
+
+
+class JobCheckpointRepo(Protocol):
+    def get_last_id(self, job_name: str, delivery_date: date) -> int | None: ...
+
+    def save(self, job_name: str, delivery_date: date, last_id: int) -> None: ...
+
+    def advance(self, job_name: str, delivery_date: date, last_id: int) -> None: ...
+
+    def clear(self, job_name: str, delivery_date: date) -> None: ...
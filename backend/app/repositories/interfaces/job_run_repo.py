@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from typing import Any, Protocol
+
+from app.infrastructure.db.models.job_run import JobRun
+
+
+class JobRunRepo(Protocol):
+    def add(self, values: dict[str, Any]) -> int: ...
+
+    def list_recent(self, job_name: str, limit: int = 20, status: int | None = None) -> list[JobRun]: ...
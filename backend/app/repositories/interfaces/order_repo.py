@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+from datetime import date
+from typing import Any, Iterator
+
 from app.infrastructure.db.models.order import Order
 
 
@@ -7,3 +10,43 @@ class OrderRepo:
     def get_by_generated_key(self, generated_key: str) -> Order | None: ...
 
     def add(self, order: Order) -> None: ...
+
+    def insert_one(self, values: dict[str, Any]) -> int: ...
+
+    def list_existing_generated_keys(self, generated_keys: list[str]) -> set[str]: ...
+
+    def get_ids_by_generated_keys(self, generated_keys: list[str]) -> dict[str, int]: ...
+
+    def insert_ignore_many(self, rows: list[dict[str, Any]]) -> int: ...
+
+    def insert_items_ignore_many(self, rows: list[dict[str, Any]]) -> int: ...
+
+    def iter_unbatched(
+        self,
+        delivery_date: date,
+        status: int,
+        with_item_counts: bool = False,
+        chunk_size: int = 2000,
+        after_id: int = 0,
+        zone_ids: list[int | None] | None = None,
+    ) -> Iterator[tuple[int, int | None, int]]: ...
+
+    def list_unbatched_zone_ids(self, delivery_date: date, status: int) -> list[int | None]: ...
+
+    def list_subscription_ids_with_order(self, delivery_date: date, subscription_ids: list[int]) -> set[int]: ...
+
+    def list_unbatched_for_subscriptions(
+        self,
+        delivery_date: date,
+        subscription_ids: list[int],
+        status: int,
+        with_item_counts: bool = False,
+    ) -> list[tuple[int, int | None, int]]: ...
+
+    def assign_zones_from_shipping_address(
+        self,
+        delivery_date: date,
+        zone_ids: list[int],
+        after_id: int = 0,
+        subscription_ids: list[int] | None = None,
+    ) -> int: ...
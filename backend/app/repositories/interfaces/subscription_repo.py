@@ -4,6 +4,7 @@ from datetime import date
 from typing import Protocol
 
 from app.infrastructure.db.models.subscription import Subscription
+from app.infrastructure.db.models.subscription_item import SubscriptionItem
 
 
 class SubscriptionRepo(Protocol):
@@ -11,4 +12,28 @@ class SubscriptionRepo(Protocol):
 
     def lock_by_id(self, subscription_id: int) -> Subscription | None: ...
 
+    def lock_many_by_ids(self, subscription_ids: list[int]) -> list[Subscription]: ...
+
+    def list_items_with_variants(self, subscription_ids: list[int]) -> dict[int, list[SubscriptionItem]]: ...
+
     def list_due_active(self, cycle_date: date, limit: int, offset: int = 0) -> list[Subscription]: ...
+
+    def list_due_active_ids(
+        self,
+        cycle_date: date,
+        limit: int,
+        after_id: int = 0,
+        shard: tuple[int, int] | None = None,
+    ) -> list[int]: ...
+
+    def list_schedule_rows(
+        self,
+        subscription_ids: list[int],
+        cycle_date: date,
+    ) -> list[tuple[int, date, date, date | None, str, int]]: ...
+
+    def advance_next_run_date(self, subscription_ids: list[int], from_date: date, to_date: date) -> int: ...
+
+    def list_schedule_cohorts(self, until_date: date) -> list[tuple]: ...
+
+    def list_schedule_cohort_items(self, until_date: date) -> list[tuple]: ...
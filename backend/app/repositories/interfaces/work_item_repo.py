@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Iterable, Protocol
+
+
+class WorkItemRepo(Protocol):
+    def enqueue_many(self, job_name: str, delivery_date: date, ranges: Iterable[tuple[int, int]]) -> int: ...
+
+    def reopen_done(self, job_name: str, delivery_date: date, range_starts: list[int]) -> int: ...
+
+    def claim(
+        self,
+        job_name: str,
+        delivery_date: date,
+        owner: str,
+        limit: int,
+        lease_seconds: float,
+        now: datetime,
+        max_attempts: int | None = None,
+    ) -> list[tuple[int, int, int, int]]: ...
+
+    def heartbeat(self, item_ids: list[int], owner: str, lease_expires_at: datetime) -> int: ...
+
+    def complete(self, item_id: int, owner: str) -> bool: ...
+
+    def fail(self, item_id: int, owner: str, error: str, retry: bool) -> bool: ...
+
+    def retry_failed(self, job_name: str, delivery_date: date) -> int: ...
+
+    def count_by_status(self, job_name: str, delivery_date: date) -> dict[int, int]: ...
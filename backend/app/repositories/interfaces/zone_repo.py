@@ -0,0 +1,7 @@
+from __future__ import annotations
+
+
+class ZoneRepo:
+    def list_active_ids(self) -> list[int]: ...
+
+    def get_batch_limits(self) -> dict[int, tuple[int | None, int | None]]: ...
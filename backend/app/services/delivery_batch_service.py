@@ -1,12 +1,68 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date, datetime
+from typing import Sequence
 
 from app.services.unit_of_work import UnitOfWork
 from app.infrastructure.db.models.order import Order
 
 
+@dataclass
+class LockResult:
+    batch_ids: list[int] = field(default_factory=list)
+    reserved: dict[int, int] = field(default_factory=dict)                 # variant_id -> qty
+    shortfalls: dict[int, tuple[int, int]] = field(default_factory=dict)   # variant_id -> (requested, available)
+
+
+def pack_orders(
+    orders: Sequence[tuple[int, int]],
+    loads: Sequence[tuple[int, int]],
+    max_orders: int | None,
+    max_items: int | None,
+) -> list[list[int]]:
+    """
+    First-fit decreasing bin packing of (order_id, item quantity) into batches.
+
+    `loads` are the (orders, items) already in the open batches; result[i] are
+    the order ids for loads[i], extra lists are new batches. Ordering is
+    (items desc, id asc), so the same input always packs the same way.
+    None = no limit; an order larger than max_items gets a batch of its own.
+    """
+    if (max_orders is not None and max_orders < 1) or (max_items is not None and max_items < 1):
+        raise ValueError("BATCH_CAPACITY_INVALID")
+
+    bin_orders = [n for n, _ in loads]
+    bin_items = [n for _, n in loads]
+    result: list[list[int]] = [[] for _ in loads]
+
+    first_open = 0
+    for order_id, items in sorted(orders, key=lambda o: (-o[1], o[0])):
+        # bins full by order count never reopen
+        while max_orders is not None and first_open < len(result) and bin_orders[first_open] >= max_orders:
+            first_open += 1
+
+        target = None
+        for b in range(first_open, len(result)):
+            if (max_orders is None or bin_orders[b] < max_orders) and (
+                max_items is None or bin_items[b] + items <= max_items
+            ):
+                target = b
+                break
+
+        if target is None:
+            result.append([])
+            bin_orders.append(0)
+            bin_items.append(0)
+            target = len(result) - 1
+
+        result[target].append(order_id)
+        bin_orders[target] += 1
+        bin_items[target] += items
+
+    return result
+
+
 @dataclass
 class DeliveryBatchService:
     uow: UnitOfWork
@@ -45,3 +101,69 @@ class DeliveryBatchService:
         """
         with self.uow:
             return self.uow.batches.lock_due_batches(delivery_date=delivery_date, now=now)
+
+    def lock_due_batch_ids(self, delivery_date: date, now: datetime) -> list[int]:
+        """
+        Same as lock_batches_if_due, returning the ids locked by this call
+        (the rows taken under SELECT ... FOR UPDATE).
+        """
+        with self.uow:
+            return self.uow.batches.lock_due_batch_ids(delivery_date=delivery_date, now=now)
+
+    def lock_and_reserve(self, delivery_date: date, now: datetime) -> LockResult:
+        """
+        Lock due batches and reserve inventory for their order lines, in one transaction.
+
+        - quantities per variant: one GROUP BY over the newly locked batches
+        - one conditional UPDATE per variant, in variant_id order (same lock
+          order for every caller → no deadlocks between concurrent lockers)
+        - a variant that cannot be fully reserved is left untouched and
+          reported in shortfalls with what was available
+
+        Only the batches this call took under the row lock are reserved, so
+        re-runs (even with the same `now`) never double-reserve.
+        """
+        result = LockResult()
+        with self.uow:
+            result.batch_ids = self.uow.batches.lock_due_batch_ids(delivery_date=delivery_date, now=now)
+            if result.batch_ids:
+                self._reserve(result)
+
+        return result
+
+    def lock_and_reserve_chunk(
+        self,
+        delivery_date: date,
+        now: datetime,
+        limit: int,
+        reserve_inventory: bool = True,
+    ) -> LockResult:
+        """
+        lock_and_reserve for at most `limit` due batches (one transaction per chunk).
+        Shortfalls are decided per chunk. An empty batch_ids means nothing is left to lock.
+        """
+        result = LockResult()
+        with self.uow:
+            result.batch_ids = self.uow.batches.lock_due_batch_ids(
+                delivery_date=delivery_date, now=now, limit=limit, skip_locked=True
+            )
+            if result.batch_ids and reserve_inventory:
+                self._reserve(result)
+        return result
+
+    def _reserve(self, result: LockResult) -> None:
+        requested = self.uow.batches.sum_item_quantities_by_variant(result.batch_ids)
+        short: dict[int, int] = {}
+        for variant_id, quantity in requested:
+            if quantity <= 0:
+                continue
+            if self.uow.inventory.reserve(variant_id, quantity):
+                result.reserved[variant_id] = quantity
+            else:
+                short[variant_id] = quantity
+
+        if short:
+            available = self.uow.inventory.get_available(list(short))
+            result.shortfalls = {
+                variant_id: (quantity, available.get(variant_id, 0)) for variant_id, quantity in short.items()
+            }
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from app.services.schedule_service import project_run_dates
+from app.services.unit_of_work import UnitOfWork
+
+
+@dataclass
+class ForecastService:
+    uow: UnitOfWork
+
+    def forecast(self, from_date: date, days: int) -> list[dict]:
+        """
+        Projected orders per delivery date in [from_date, from_date + days), read-only.
+
+        Subscriptions are aggregated in SQL into schedule cohorts (same next run,
+        anchor day, end date, plan interval, zone), so each cohort's dates are
+        projected once and its totals added per date: cost depends on the
+        number of distinct schedules, not on the number of subscriptions.
+
+        Returns one dict per date:
+          {"delivery_date", "orders", "amount",
+           "zones": {zone_id: {"orders", "amount"}}, "variants": {variant_id: quantity}}
+        """
+        if days < 1:
+            raise ValueError("FORECAST_DAYS_INVALID")
+        until_date = from_date + timedelta(days=days - 1)
+
+        with self.uow:
+            cohorts = self.uow.subscriptions.list_schedule_cohorts(until_date)
+            cohort_items = self.uow.subscriptions.list_schedule_cohort_items(until_date)
+
+        items_by_cohort: dict[tuple, list[tuple[int, int, int]]] = {}
+        for *key, variant_id, quantity, amount in cohort_items:
+            items_by_cohort.setdefault(tuple(key), []).append((variant_id, int(quantity), int(amount)))
+
+        by_date: dict[date, dict] = {
+            from_date + timedelta(days=i): {"orders": 0, "amount": 0, "zones": {}, "variants": {}}
+            for i in range(days)
+        }
+
+        for *key, subscriptions in cohorts:
+            next_run, anchor_day, end_date, interval_unit, interval_count, zone_id = key
+            run_dates = project_run_dates(
+                next_run,
+                from_date,
+                until_date,
+                interval_unit,
+                interval_count,
+                anchor_day=int(anchor_day),
+                end_date=end_date,
+            )
+            if not run_dates:
+                continue
+
+            items = items_by_cohort.get(tuple(key), [])
+            amount = sum(a for _, _, a in items)
+
+            for d in run_dates:
+                day = by_date[d]
+                day["orders"] += subscriptions
+                day["amount"] += amount
+
+                zone = day["zones"].setdefault(zone_id, {"orders": 0, "amount": 0})
+                zone["orders"] += subscriptions
+                zone["amount"] += amount
+
+                for variant_id, quantity, _ in items:
+                    day["variants"][variant_id] = day["variants"].get(variant_id, 0) + quantity
+
+        return [{"delivery_date": d.isoformat(), **totals} for d, totals in sorted(by_date.items())]
@@ -1,20 +1,27 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date, datetime
 import hashlib
 
-from sqlalchemy import select, and_
-
 from app.services.unit_of_work import UnitOfWork
 from app.infrastructure.db.models.order import Order
 from app.infrastructure.db.models.order_item import OrderItem
+from app.infrastructure.db.models.subscription import Subscription
+from app.infrastructure.db.models.subscription_item import SubscriptionItem
 
 
 # TODO: ปรับให้ตรงกับ enum/status จริงของโปรเจกต์
 ORDER_STATUS_PENDING = 1
 
 
+@dataclass
+class GenerationBatchResult:
+    created: int = 0
+    existing: int = 0
+    failures: list[tuple[int, str]] = field(default_factory=list)  # (subscription_id, reason code)
+
+
 @dataclass
 class OrderService:
     uow: UnitOfWork
@@ -30,18 +37,92 @@ class OrderService:
         digest = hashlib.sha1(generated_key.encode("utf-8")).hexdigest()[:12].upper()
         return f"O{digest}"
 
-    def _order_item_exists(self, order_id: int, variant_id: int) -> bool:
-        stmt = (
-            select(OrderItem.id)
-            .where(
-                and_(
-                    OrderItem.order_id == order_id,
-                    OrderItem.variant_id == variant_id,
-                )
-            )
-            .limit(1)
-        )
-        return self.uow.session.execute(stmt).first() is not None
+    def _ensure_due(self, sub: Subscription, delivery_date: date) -> None:
+        # active + due checks (based on real schema)
+        if sub.deleted_at is not None or sub.canceled_at is not None or sub.paused_at is not None:
+            raise ValueError("SUBSCRIPTION_NOT_ACTIVE")
+
+        if sub.next_run_date > delivery_date:
+            raise ValueError("SUBSCRIPTION_NOT_DUE")
+
+        if sub.end_date is not None and sub.next_run_date > sub.end_date:
+            raise ValueError("SUBSCRIPTION_ENDED")
+
+    def _build_order_values(
+        self,
+        sub: Subscription,
+        generated_key: str,
+        delivery_date: date,
+        now: datetime,
+    ) -> dict:
+        if sub.default_address_id is None:
+            raise ValueError("SUBSCRIPTION_DEFAULT_ADDRESS_REQUIRED")
+
+        return {
+            "generated_key": generated_key,
+            "order_no": self._build_order_no(generated_key),
+            "user_id": sub.user_id,
+            "subscription_id": sub.id,
+            "status": ORDER_STATUS_PENDING,
+            "delivery_date": delivery_date,
+            "zone_id": None,  # assigned in bulk by run_assign_zones (before batching)
+            "shipping_address_id": sub.default_address_id,
+            "notes": None,
+            "currency": "THB",
+            "subtotal_amount": 0,
+            "shipping_amount": 0,
+            "total_amount": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def _build_item_values(self, si: SubscriptionItem, now: datetime) -> dict | None:
+        """
+        OrderItem values for one SubscriptionItem, or None if the item is skipped
+        (inactive / non-positive quantity).
+        """
+        if si.is_active != 1:
+            return None
+
+        qty = int(si.quantity)
+        if qty <= 0:
+            return None
+
+        if si.variant is None:
+            raise ValueError("SUBSCRIPTION_ITEM_VARIANT_MISSING")
+
+        unit_amount = int(si.unit_amount)
+        if unit_amount < 0:
+            raise ValueError("SUBSCRIPTION_ITEM_PRICE_INVALID")
+
+        return {
+            "variant_id": si.variant_id,
+            "sku": si.variant.sku,
+            "name": si.variant.name or "",
+            "quantity": qty,
+            "unit_amount": unit_amount,
+            "line_total_amount": unit_amount * qty,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def _build_item_rows(self, items: list[SubscriptionItem], now: datetime) -> list[dict]:
+        """
+        OrderItem values for a subscription basket, deduped on variant_id
+        (mirrors uq_order_items_order_id_variant_id) without touching the DB.
+        """
+        rows: dict[int, dict] = {}
+        for si in items:
+            values = self._build_item_values(si, now)
+            if values is None or values["variant_id"] in rows:
+                continue
+            rows[values["variant_id"]] = values
+        return list(rows.values())
+
+    def _apply_totals(self, order_values: dict, item_rows: list[dict]) -> None:
+        subtotal = sum(v["line_total_amount"] for v in item_rows)
+        order_values["subtotal_amount"] = subtotal
+        order_values["total_amount"] = subtotal + int(order_values["shipping_amount"] or 0)
 
     # ---------- main use case ----------
 
@@ -49,6 +130,7 @@ class OrderService:
         self,
         subscription_id: int,
         delivery_date: date,
+        items: list[SubscriptionItem] | None = None,
     ) -> tuple[Order, bool]:
         """
         Returns (order, was_created)
@@ -58,6 +140,11 @@ class OrderService:
         - One subscription = one transaction
         - Idempotent via Order.generated_key
         - OrderItem price comes from SubscriptionItem.unit_amount
+
+        `items` (with variant loaded) can be preloaded for a whole page via
+        SubscriptionRepo.list_items_with_variants; otherwise they are loaded
+        after the lock with batched IN queries. Either way the statement count
+        per order does not depend on basket size.
         """
         with self.uow:
             # 1) lock subscription
@@ -65,12 +152,8 @@ class OrderService:
             if not sub:
                 raise ValueError("SUBSCRIPTION_NOT_FOUND")
 
-            # 2) active + due checks (based on real schema)
-            if sub.deleted_at is not None or sub.canceled_at is not None or sub.paused_at is not None:
-                raise ValueError("SUBSCRIPTION_NOT_ACTIVE")
-
-            if sub.next_run_date > delivery_date:
-                raise ValueError("SUBSCRIPTION_NOT_DUE")
+            # 2) active + due checks
+            self._ensure_due(sub, delivery_date)
 
             # 3) idempotent order check
             generated_key = self._build_generated_key(sub.id, delivery_date)
@@ -78,76 +161,158 @@ class OrderService:
             if existing:
                 return existing, False
 
-            if sub.default_address_id is None:
-                raise ValueError("SUBSCRIPTION_DEFAULT_ADDRESS_REQUIRED")
-
             now = datetime.utcnow()
+            order_values = self._build_order_values(sub, generated_key, delivery_date, now)
 
-            # 4) create Order
-            order = Order(
-                generated_key=generated_key,
-                order_no=self._build_order_no(generated_key),
-                user_id=sub.user_id,
-                subscription_id=sub.id,
-                status=ORDER_STATUS_PENDING,
-                delivery_date=delivery_date,
-                zone_id=None,  # routing can assign later
-                shipping_address_id=sub.default_address_id,
-                notes=None,
-                currency="THB",
-                subtotal_amount=0,
-                shipping_amount=0,
-                total_amount=0,
-                created_at=now,
-                updated_at=now,
-            )
+            # 4) build OrderItems from SubscriptionItems (in memory)
+            if items is None:
+                items = self.uow.subscriptions.list_items_with_variants([sub.id]).get(sub.id, [])
+            item_rows = self._build_item_rows(items, now)
+            self._apply_totals(order_values, item_rows)
+
+            # 5) create Order
+            order = Order(**order_values)
             self.uow.orders.add(order)
             self.uow.session.flush()  # ensure order.id
 
-            # 5) generate OrderItems from SubscriptionItems
-            subtotal = 0
+            # 6) create OrderItems in one multi-row insert
+            # (order is new in this transaction, so it cannot have items yet)
+            self.uow.orders.insert_items_ignore_many(
+                [{"order_id": order.id, **values} for values in item_rows]
+            )
 
-            for si in sub.items:
-                if si.is_active != 1:
-                    continue
+            return order, True
 
-                qty = int(si.quantity)
-                if qty <= 0:
-                    continue
+    def generate_bulk_from_subscriptions(
+        self,
+        subscription_ids: list[int],
+        delivery_date: date,
+    ) -> tuple[int, int]:
+        """
+        Set-based variant of generate_from_subscription for a page of subscriptions.
+        Returns (created, existing)
 
-                if si.variant is None:
-                    raise ValueError("SUBSCRIPTION_ITEM_VARIANT_MISSING")
+        Rules:
+        - Lock the whole page with one SELECT ... FOR UPDATE (ordered by id)
+        - One page = one transaction (any error rolls back the whole page)
+        - Idempotent via uq_orders_generated_key (INSERT IGNORE), so a concurrent
+          run that inserted the same order first is counted as existing
+        - Same validation errors as the per-subscription path
+        """
+        if not subscription_ids:
+            return 0, 0
+
+        with self.uow:
+            # 1) lock page
+            subs = self.uow.subscriptions.lock_many_by_ids(subscription_ids)
+            if len(subs) != len(set(subscription_ids)):
+                raise ValueError("SUBSCRIPTION_NOT_FOUND")
+
+            # 2) active + due checks
+            for sub in subs:
+                self._ensure_due(sub, delivery_date)
+
+            # 3) idempotent order check (one query for the page)
+            keys = {sub.id: self._build_generated_key(sub.id, delivery_date) for sub in subs}
+            existing_keys = self.uow.orders.list_existing_generated_keys(list(keys.values()))
+            pending = [sub for sub in subs if keys[sub.id] not in existing_keys]
+            if not pending:
+                return 0, len(subs)
+
+            # 4) build Order / OrderItem rows in memory
+            items_by_sub = self.uow.subscriptions.list_items_with_variants([sub.id for sub in pending])
+            now = datetime.utcnow()
+
+            order_rows: list[dict] = []
+            item_rows_by_key: dict[str, list[dict]] = {}
+            for sub in pending:
+                generated_key = keys[sub.id]
+                order_values = self._build_order_values(sub, generated_key, delivery_date, now)
+                item_rows = self._build_item_rows(items_by_sub.get(sub.id, []), now)
+                self._apply_totals(order_values, item_rows)
+
+                order_rows.append(order_values)
+                item_rows_by_key[generated_key] = item_rows
+
+            # 5) multi-row inserts
+            created = self.uow.orders.insert_ignore_many(order_rows)
+
+            order_ids = self.uow.orders.get_ids_by_generated_keys(list(item_rows_by_key))
+            self.uow.orders.insert_items_ignore_many(
+                [
+                    {"order_id": order_ids[key], **values}
+                    for key, rows in item_rows_by_key.items()
+                    for values in rows
+                ]
+            )
+
+            return created, len(subs) - created
+
+    def generate_batch_from_subscriptions(
+        self,
+        subscription_ids: list[int],
+        delivery_date: date,
+    ) -> GenerationBatchResult:
+        """
+        Micro-batched variant: many subscriptions, one transaction (one commit).
 
-                unit_amount = int(si.unit_amount)
-                if unit_amount < 0:
-                    raise ValueError("SUBSCRIPTION_ITEM_PRICE_INVALID")
+        Rules:
+        - Each subscription runs in its own SAVEPOINT; a ValueError rolls back
+          only that subscription and is reported in `failures`
+        - Same lock / due / idempotency rules as generate_from_subscription
+        - Order + OrderItems are written with Core inserts (one statement each),
+          not per-object session.add + flush
+        """
+        result = GenerationBatchResult()
+        if not subscription_ids:
+            return result
 
-                # idempotent on (order_id, variant_id)
-                if self._order_item_exists(order.id, si.variant_id):
+        with self.uow:
+            items_by_sub = self.uow.subscriptions.list_items_with_variants(subscription_ids)
+
+            for subscription_id in subscription_ids:
+                try:
+                    with self.uow.session.begin_nested():
+                        was_created = self._generate_one_locked(
+                            subscription_id,
+                            delivery_date,
+                            items_by_sub.get(subscription_id, []),
+                        )
+                except ValueError as exc:
+                    result.failures.append((subscription_id, str(exc)))
                     continue
 
-                line_total = unit_amount * qty
-
-                oi = OrderItem(
-                    order_id=order.id,
-                    variant_id=si.variant_id,
-                    sku=si.variant.sku,
-                    name=si.variant.name or "",
-                    quantity=qty,
-                    unit_amount=unit_amount,
-                    line_total_amount=line_total,
-                    created_at=now,
-                    updated_at=now,
-                )
-                self.uow.session.add(oi)
-
-                subtotal += line_total
-
-            # 6) finalize totals
-            order.subtotal_amount = subtotal
-            order.total_amount = subtotal + int(order.shipping_amount or 0)
-            order.updated_at = now
-            self.uow.session.add(order)
-
-            self.uow.session.flush()
-            return order, True
+                if was_created:
+                    result.created += 1
+                else:
+                    result.existing += 1
+
+        return result
+
+    def _generate_one_locked(
+        self,
+        subscription_id: int,
+        delivery_date: date,
+        items: list[SubscriptionItem],
+    ) -> bool:
+        # caller owns the transaction / savepoint
+        sub = self.uow.subscriptions.lock_by_id(subscription_id)
+        if not sub:
+            raise ValueError("SUBSCRIPTION_NOT_FOUND")
+
+        self._ensure_due(sub, delivery_date)
+
+        generated_key = self._build_generated_key(sub.id, delivery_date)
+        if self.uow.orders.list_existing_generated_keys([generated_key]):
+            return False
+
+        now = datetime.utcnow()
+        order_values = self._build_order_values(sub, generated_key, delivery_date, now)
+        item_rows = self._build_item_rows(items, now)
+        self._apply_totals(order_values, item_rows)
+
+        order_id = self.uow.orders.insert_one(order_values)
+        self.uow.orders.insert_items_ignore_many(
+            [{"order_id": order_id, **values} for values in item_rows]
+        )
+        return True
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import calendar
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from app.services.unit_of_work import UnitOfWork
+
+
+# ต้องตรงกับ ENUM plans.interval_unit
+INTERVAL_UNIT_DAY = "day"
+INTERVAL_UNIT_WEEK = "week"
+INTERVAL_UNIT_MONTH = "month"
+
+
+def _add_months(d: date, months: int, anchor_day: int) -> date:
+    # clamp to month end: anchor 31 → Feb 28/29, Apr 30, ...
+    year, month0 = divmod(d.month - 1 + months, 12)
+    year += d.year
+    month = month0 + 1
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, min(anchor_day, last_day))
+
+
+def compute_next_run_date(
+    current: date,
+    interval_unit: str,
+    interval_count: int,
+    anchor_day: int | None = None,
+) -> date:
+    """
+    One interval after `current`.
+    Monthly plans keep `anchor_day` (usually start_date.day) so a 31st
+    subscription goes Jan 31 → Feb 28 → Mar 31 instead of drifting to the 28th.
+    """
+    if interval_count < 1:
+        raise ValueError("PLAN_INTERVAL_COUNT_INVALID")
+
+    if interval_unit == INTERVAL_UNIT_DAY:
+        return current + timedelta(days=interval_count)
+    if interval_unit == INTERVAL_UNIT_WEEK:
+        return current + timedelta(weeks=interval_count)
+    if interval_unit == INTERVAL_UNIT_MONTH:
+        return _add_months(current, interval_count, anchor_day or current.day)
+
+    raise ValueError("PLAN_INTERVAL_UNIT_INVALID")
+
+
+def next_run_date_after(
+    next_run_date: date,
+    cycle_date: date,
+    interval_unit: str,
+    interval_count: int,
+    anchor_day: int | None = None,
+) -> date:
+    """
+    First run date strictly after cycle_date (missed cycles are skipped, not replayed).
+    """
+    if next_run_date > cycle_date:
+        return next_run_date
+
+    if interval_unit in (INTERVAL_UNIT_DAY, INTERVAL_UNIT_WEEK):
+        step = interval_count * (7 if interval_unit == INTERVAL_UNIT_WEEK else 1)
+        if step < 1:
+            raise ValueError("PLAN_INTERVAL_COUNT_INVALID")
+        steps = (cycle_date - next_run_date).days // step + 1
+        return next_run_date + timedelta(days=steps * step)
+
+    d = next_run_date
+    while d <= cycle_date:
+        d = compute_next_run_date(d, interval_unit, interval_count, anchor_day)
+    return d
+
+
+def project_run_dates(
+    next_run_date: date,
+    from_date: date,
+    until_date: date,
+    interval_unit: str,
+    interval_count: int,
+    anchor_day: int | None = None,
+    end_date: date | None = None,
+) -> list[date]:
+    """
+    Delivery dates in [from_date, until_date] for one schedule, assuming a daily
+    run with advancement: an overdue subscription is generated on from_date,
+    then follows its plan interval.
+    """
+    dates: list[date] = []
+    d = next_run_date
+    if end_date is not None and d > end_date:
+        return dates
+
+    if d < from_date:
+        dates.append(from_date)
+        d = next_run_date_after(d, from_date, interval_unit, interval_count, anchor_day)
+
+    while d <= until_date and (end_date is None or d <= end_date):
+        dates.append(d)
+        d = compute_next_run_date(d, interval_unit, interval_count, anchor_day)
+    return dates
+
+
+SCHEDULE_INVALID = "SCHEDULE_INVALID"
+
+
+@dataclass
+class ScheduleAdvanceResult:
+    advanced: int = 0
+    failures: list[tuple[int, str]] = field(default_factory=list)  # (subscription_id, reason code)
+
+
+@dataclass
+class ScheduleService:
+    uow: UnitOfWork
+
+    def advance_after_generation(self, subscription_ids: list[int], cycle_date: date) -> ScheduleAdvanceResult:
+        """
+        Move next_run_date past cycle_date for subscriptions that got their order.
+
+        Subscriptions sharing (current date, new date) are advanced with one
+        conditional UPDATE, so a run costs a handful of statements per page.
+        Already-advanced rows are skipped, which keeps reruns idempotent.
+        subscription_due_queue follows in the same transaction; subscriptions
+        whose new date is past end_date leave the queue (and the due scan).
+
+        A subscription whose plan cannot produce a next date (interval_count < 1,
+        unknown interval_unit) is left as is and returned in failures with
+        SCHEDULE_INVALID; the rest of the page still advances.
+        """
+        result = ScheduleAdvanceResult()
+        with self.uow:
+            rows = self.uow.subscriptions.list_schedule_rows(subscription_ids, cycle_date)
+
+            groups: dict[tuple[date, date], list[int]] = {}
+            ended: list[int] = []
+            for subscription_id, next_run, start_date, end_date, interval_unit, interval_count in rows:
+                try:
+                    new_date = next_run_date_after(
+                        next_run,
+                        cycle_date,
+                        interval_unit,
+                        interval_count,
+                        anchor_day=start_date.day,
+                    )
+                except ValueError:
+                    result.failures.append((subscription_id, SCHEDULE_INVALID))
+                    continue
+                if end_date is not None and new_date > end_date:
+                    ended.append(subscription_id)
+                groups.setdefault((next_run, new_date), []).append(subscription_id)
+
+            for (from_date, to_date), ids in groups.items():
+                result.advanced += self.uow.subscriptions.advance_next_run_date(ids, from_date, to_date)
+                self.uow.due_queue.reschedule(ids, from_date, to_date)
+
+            self.uow.due_queue.remove_many(ended)
+        return result
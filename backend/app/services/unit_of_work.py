@@ -10,23 +10,53 @@ from sqlalchemy.orm import Session
 from app.repositories.interfaces.subscription_repo import SubscriptionRepo
 from app.repositories.interfaces.order_repo import OrderRepo
 from app.repositories.interfaces.delivery_batch_repo import DeliveryBatchRepo
+from app.repositories.interfaces.generation_failure_repo import GenerationFailureRepo
+from app.repositories.interfaces.job_checkpoint_repo import JobCheckpointRepo
+from app.repositories.interfaces.due_queue_repo import DueQueueRepo
+from app.repositories.interfaces.zone_repo import ZoneRepo
+from app.repositories.interfaces.inventory_repo import InventoryRepo
+from app.repositories.interfaces.work_item_repo import WorkItemRepo
+from app.repositories.interfaces.job_run_repo import JobRunRepo
 
 from app.infrastructure.db.repos_sqlalchemy.subscription_repo import SqlAlchemySubscriptionRepo
 from app.infrastructure.db.repos_sqlalchemy.order_repo import SqlAlchemyOrderRepo
 from app.infrastructure.db.repos_sqlalchemy.delivery_batch_repo import SqlAlchemyDeliveryBatchRepo
+from app.infrastructure.db.repos_sqlalchemy.generation_failure_repo import SqlAlchemyGenerationFailureRepo
+from app.infrastructure.db.repos_sqlalchemy.job_checkpoint_repo import SqlAlchemyJobCheckpointRepo
+from app.infrastructure.db.repos_sqlalchemy.due_queue_repo import SqlAlchemyDueQueueRepo
+from app.infrastructure.db.repos_sqlalchemy.zone_repo import SqlAlchemyZoneRepo
+from app.infrastructure.db.repos_sqlalchemy.inventory_repo import SqlAlchemyInventoryRepo
+from app.infrastructure.db.repos_sqlalchemy.work_item_repo import SqlAlchemyWorkItemRepo
+from app.infrastructure.db.repos_sqlalchemy.job_run_repo import SqlAlchemyJobRunRepo
 
 @dataclass
 class UnitOfWork(AbstractContextManager):
     session: Session
+    # True when the UoW created its session (jobs): closed on exit → connection back to the pool
+    owns_session: bool = False
 
     subscriptions: SubscriptionRepo = None  # type: ignore[assignment]
     orders: OrderRepo = None                # type: ignore[assignment]
     batches: DeliveryBatchRepo = None       # type: ignore[assignment]
+    generation_failures: GenerationFailureRepo = None  # type: ignore[assignment]
+    checkpoints: JobCheckpointRepo = None   # type: ignore[assignment]
+    due_queue: DueQueueRepo = None          # type: ignore[assignment]
+    zones: ZoneRepo = None                  # type: ignore[assignment]
+    inventory: InventoryRepo = None         # type: ignore[assignment]
+    work_items: WorkItemRepo = None         # type: ignore[assignment]
+    job_runs: JobRunRepo = None             # type: ignore[assignment]
 
     def __post_init__(self) -> None:
         self.subscriptions = SqlAlchemySubscriptionRepo(self.session)
         self.orders = SqlAlchemyOrderRepo(self.session)
         self.batches = SqlAlchemyDeliveryBatchRepo(self.session)
+        self.generation_failures = SqlAlchemyGenerationFailureRepo(self.session)
+        self.checkpoints = SqlAlchemyJobCheckpointRepo(self.session)
+        self.due_queue = SqlAlchemyDueQueueRepo(self.session)
+        self.zones = SqlAlchemyZoneRepo(self.session)
+        self.inventory = SqlAlchemyInventoryRepo(self.session)
+        self.work_items = SqlAlchemyWorkItemRepo(self.session)
+        self.job_runs = SqlAlchemyJobRunRepo(self.session)
 
     def __enter__(self) -> "UnitOfWork":
         # Session ถูกสร้างจาก DI (dependencies.py) อยู่แล้ว
@@ -38,9 +68,16 @@ class UnitOfWork(AbstractContextManager):
     def rollback(self) -> None:
         self.session.rollback()
 
+    def close(self) -> None:
+        self.session.close()
+
     def __exit__(self, exc_type, exc, tb) -> Optional[bool]:
-        if exc:
-            self.rollback()
-            return False
-        self.commit()
-        return None
+        try:
+            if exc:
+                self.rollback()
+                return False
+            self.commit()
+            return None
+        finally:
+            if self.owns_session:
+                self.close()
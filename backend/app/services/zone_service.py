@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+
+from app.services.unit_of_work import UnitOfWork
+
+
+@dataclass
+class ZoneService:
+    uow: UnitOfWork
+
+    def assign_order_zones(
+        self,
+        delivery_date: date,
+        after_id: int = 0,
+        subscription_ids: list[int] | None = None,
+        zone_ids: list[int] | None = None,
+    ) -> int:
+        """
+        Set orders.zone_id from the shipping address for delivery_date (one UPDATE).
+        Orders whose address has no zone, or an inactive one, stay unzoned (ALL batch).
+        after_id limits the update to newer orders (incremental batching);
+        subscription_ids to one generation page (fused pipeline).
+        zone_ids are the active zone ids when the caller already read them
+        (once per run); otherwise they are read in the same transaction.
+        """
+        with self.uow:
+            if zone_ids is None:
+                zone_ids = self.uow.zones.list_active_ids()
+            return self.uow.orders.assign_zones_from_shipping_address(
+                delivery_date, zone_ids, after_id, subscription_ids=subscription_ids
+            )
@@ -18,6 +18,16 @@ class Settings(BaseSettings):
     rate_limit_enabled: bool = Field(default=False, validation_alias="RATE_LIMIT_ENABLED")
     rate_limit_rpm: int = Field(default=120, validation_alias="RATE_LIMIT_RPM")
 
+    # Delivery batch capacity defaults (zones.max_batch_* override; unset = unlimited)
+    batch_max_orders: int | None = Field(default=None, validation_alias="BATCH_MAX_ORDERS")
+    batch_max_items: int | None = Field(default=None, validation_alias="BATCH_MAX_ITEMS")
+
+    # Job DB pool (app.jobs.session.JobSessionFactory); keep pool_size >= job workers
+    job_db_pool_size: int = Field(default=5, validation_alias="JOB_DB_POOL_SIZE")
+    job_db_max_overflow: int = Field(default=5, validation_alias="JOB_DB_MAX_OVERFLOW")
+    job_db_pool_recycle: int = Field(default=1800, validation_alias="JOB_DB_POOL_RECYCLE")
+    job_db_pool_timeout: int = Field(default=30, validation_alias="JOB_DB_POOL_TIMEOUT")
+
     model_config = SettingsConfigDict(
         env_file=".env",
         case_sensitive=False,
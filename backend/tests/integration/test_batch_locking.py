@@ -1,6 +1,10 @@
 # tests/integration/test_batch_locking.py
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 
+from sqlalchemy import select, update
+
+from app.infrastructure.db.models import DeliveryBatch
+from app.services.delivery_batch_service import DeliveryBatchService
 from app.jobs.tasks.generate_orders import run_generate_orders
 from app.jobs.tasks.create_batches import run_create_batches
 from app.jobs.tasks.lock_batches import run_lock_batches
@@ -29,3 +33,62 @@ def test_locked_batches_are_not_modified(uow_factory):
 
     assert result["orders_attached"] == 0
     assert result["batches_created"] == 0
+
+
+def test_lock_reserves_inventory_once(uow_factory):
+    delivery_date = date(2025, 1, 1)
+
+    run_generate_orders(uow_factory, delivery_date)
+    first = run_create_batches(uow_factory, delivery_date)
+    assert first["orders_attached"] > 0
+
+    # create_batches sets cutoff_at = utcnow → lock after it
+    now = datetime.utcnow() + timedelta(seconds=1)
+    locked = run_lock_batches(uow_factory, delivery_date, now=now, reserve_inventory=True)
+    assert locked["locked"] > 0
+    assert locked["reserved_variants"] + len(locked["shortfalls"]) > 0
+    for shortfall in locked["shortfalls"].values():
+        assert shortfall["available"] < shortfall["requested"]
+
+    # lock ซ้ำ → ไม่มี batch ใหม่ถูก lock จึงไม่ reserve ซ้ำ
+    again = run_lock_batches(uow_factory, delivery_date, now=now + timedelta(seconds=1), reserve_inventory=True)
+    assert again["locked"] == 0
+    assert again["reserved_variants"] == 0
+    assert again["shortfalls"] == {}
+
+
+def test_relock_with_same_now_reserves_only_new_batches(uow_factory):
+    delivery_date = date(2025, 1, 1)
+
+    run_generate_orders(uow_factory, delivery_date)
+    run_create_batches(uow_factory, delivery_date, max_orders_per_batch=1)
+
+    session = uow_factory().session
+    batch_ids = session.execute(
+        select(DeliveryBatch.id)
+        .where(DeliveryBatch.delivery_date == delivery_date, DeliveryBatch.locked_at.is_(None))
+        .order_by(DeliveryBatch.id)
+    ).scalars().all()
+    assert len(batch_ids) >= 2, "Seed at least two orders for this delivery_date."
+
+    now = datetime.utcnow().replace(microsecond=0)
+    late = batch_ids[-1]
+    session.execute(update(DeliveryBatch).where(DeliveryBatch.id.in_(batch_ids)).values(cutoff_at=now))
+    session.execute(update(DeliveryBatch).where(DeliveryBatch.id == late).values(cutoff_at=now + timedelta(hours=1)))
+    session.flush()
+
+    first = DeliveryBatchService(uow_factory()).lock_and_reserve(delivery_date, now)
+    assert late not in first.batch_ids
+
+    # the late batch becomes due; same `now` → only it is locked and reserved
+    session.execute(update(DeliveryBatch).where(DeliveryBatch.id == late).values(cutoff_at=now))
+    session.flush()
+
+    second = DeliveryBatchService(uow_factory()).lock_and_reserve(delivery_date, now)
+    assert second.batch_ids == [late]
+
+    uow = uow_factory()
+    requested = dict(uow.batches.sum_item_quantities_by_variant([late]))
+    assert second.reserved == {v: q for v, q in requested.items() if v not in second.shortfalls and q > 0}
+    for variant_id, (quantity, _) in second.shortfalls.items():
+        assert quantity == requested[variant_id]
@@ -1,6 +1,14 @@
 # tests/integration/test_create_batches.py
-from datetime import date
+from datetime import date, datetime
 
+from sqlalchemy import and_, func, select
+from sqlalchemy.exc import OperationalError
+
+from app.infrastructure.db.models.delivery_batch import DeliveryBatch
+from app.infrastructure.db.models.delivery_batch_order import DeliveryBatchOrder
+from app.infrastructure.db.repos_sqlalchemy import delivery_batch_repo
+from app.infrastructure.db.repos_sqlalchemy.delivery_batch_repo import SqlAlchemyDeliveryBatchRepo
+from app.jobs.chunking import AdaptiveChunker
 from app.jobs.tasks.generate_orders import run_generate_orders
 from app.jobs.tasks.create_batches import run_create_batches
 
@@ -24,3 +32,217 @@ def test_create_batches_is_idempotent(uow_factory):
 
     assert second["batches_created"] == 0
     assert second["orders_attached"] == 0
+
+
+def test_incremental_create_batches_skips_already_considered_orders(uow_factory):
+    delivery_date = date(2025, 1, 1)
+
+    gen = run_generate_orders(uow_factory, delivery_date)
+    assert (gen["created"] + gen["existing"]) > 0, (
+        "No due subscriptions found for this delivery_date. "
+        "Seed test data (subscriptions) before running integration tests."
+    )
+
+    run_create_batches(uow_factory, delivery_date, incremental=True)
+    second = run_create_batches(uow_factory, delivery_date, incremental=True)
+    full = run_create_batches(uow_factory, delivery_date)
+
+    assert second["orders_attached"] == 0
+    assert second["batches_created"] == 0
+    assert full["orders_attached"] == 0
+
+
+def test_create_batches_splits_orders_by_zone_by_default(uow_factory):
+    from app.infrastructure.db.models import Address, Order, Zone
+
+    delivery_date = date(2025, 1, 1)
+
+    run_generate_orders(uow_factory, delivery_date)
+    run_create_batches(uow_factory, delivery_date)
+
+    uow = uow_factory()
+    with uow:
+        rows = uow.session.execute(
+            select(DeliveryBatch.zone_id, Order.zone_id, Address.zone_id)
+            .select_from(DeliveryBatchOrder)
+            .join(DeliveryBatch, DeliveryBatch.id == DeliveryBatchOrder.batch_id)
+            .join(Order, Order.id == DeliveryBatchOrder.order_id)
+            .join(Address, Address.id == Order.shipping_address_id)
+            .join(Zone, and_(Zone.id == Address.zone_id, Zone.is_active == 1))
+        ).all()
+    assert rows, "Seed orders whose shipping address is in an active zone."
+
+    # ไม่ต้องรัน zones stage แยก: order ถูก route แล้ว batch แยกตาม zone
+    for batch_zone_id, order_zone_id, address_zone_id in rows:
+        assert batch_zone_id == order_zone_id == address_zone_id
+
+
+def test_watermark_only_moves_forward(uow_factory):
+    delivery_date = date(2025, 1, 1)
+
+    uow = uow_factory()
+    with uow:
+        uow.checkpoints.advance("create_batches", delivery_date, 10)
+        uow.checkpoints.advance("create_batches", delivery_date, 5)   # slower concurrent run
+        assert uow.checkpoints.get_last_id("create_batches", delivery_date) == 10
+        uow.checkpoints.advance("create_batches", delivery_date, 12)
+        assert uow.checkpoints.get_last_id("create_batches", delivery_date) == 12
+
+
+def test_pipeline_batches_generated_orders_without_rescan(uow_factory):
+    from app.jobs.tasks.pipeline import run_pipeline
+
+    delivery_date = date(2025, 1, 1)
+
+    # queue_size=0 → batching inline (the fixture shares one session)
+    result = run_pipeline(uow_factory, delivery_date, queue_size=0, micro_batch_size=2, lock=False)
+    assert (result["created"] + result["existing"]) > 0
+
+    # ทุก order ที่ pipeline สร้าง/เจอ ถูก attach แล้ว → create_batches ไม่เหลืออะไรให้ทำ
+    again = run_create_batches(uow_factory, delivery_date)
+    assert again["orders_attached"] == 0
+
+
+def test_chunked_attach_commits_per_chunk_and_retries_only_the_failed_chunk(uow_factory, monkeypatch):
+    delivery_date = date(2025, 1, 1)
+
+    gen = run_generate_orders(uow_factory, delivery_date)
+    assert (gen["created"] + gen["existing"]) > 1, "need at least two orders (seed more subscriptions)"
+
+    attach = SqlAlchemyDeliveryBatchRepo.attach_unbatched_orders
+    calls = {"n": 0}
+
+    def flaky(self, batch_id, order_ids):
+        calls["n"] += 1
+        if calls["n"] == 2:   # chunk ที่ 2 เจอ deadlock → retry เฉพาะ chunk นั้น
+            raise OperationalError("INSERT IGNORE INTO delivery_batch_orders ...", {}, Exception(1213, "deadlock"))
+        return attach(self, batch_id, order_ids)
+
+    monkeypatch.setattr(SqlAlchemyDeliveryBatchRepo, "attach_unbatched_orders", flaky)
+
+    chunker = AdaptiveChunker("attach", initial=1, minimum=1, maximum=1)
+    result = run_create_batches(uow_factory, delivery_date, chunker=chunker)
+
+    assert result["chunking"]["lock_errors"] == 1
+    uow = uow_factory()
+    with uow:
+        links = uow.session.scalar(select(func.count()).select_from(DeliveryBatchOrder))
+        distinct = uow.session.scalar(select(func.count(func.distinct(DeliveryBatchOrder.order_id))))
+    assert links == distinct == result["orders_attached"]
+    assert run_create_batches(uow_factory, delivery_date)["orders_attached"] == 0
+
+
+def test_attach_unbatched_orders_skips_batched_orders_and_locked_batches(uow_factory):
+    delivery_date = date(2025, 1, 1)
+
+    run_generate_orders(uow_factory, delivery_date)
+    run_create_batches(uow_factory, delivery_date)
+
+    uow = uow_factory()
+    with uow:
+        order_id = uow.session.scalar(select(DeliveryBatchOrder.order_id).limit(1))
+        now = datetime.utcnow()
+        other = DeliveryBatch(
+            batch_code=f"{delivery_date.isoformat()}-TEST", delivery_date=delivery_date, zone_id=None,
+            cutoff_at=now, status=1, created_at=now, updated_at=now,
+        )
+        uow.session.add(other)
+        uow.session.flush()
+
+        # order อยู่ใน batch อื่นแล้ว → ไม่ attach ซ้ำ
+        assert uow.batches.attach_unbatched_orders(other.id, [order_id]) == 0
+
+        # batch ถูก lock ระหว่างทาง → ไม่รับ order เพิ่ม
+        uow.session.execute(
+            DeliveryBatchOrder.__table__.delete().where(DeliveryBatchOrder.order_id == order_id)
+        )
+        other.locked_at = now
+        uow.session.flush()
+        assert uow.batches.attach_unbatched_orders(other.id, [order_id]) == 0
+
+        other.locked_at = None
+        uow.session.flush()
+        assert uow.batches.attach_unbatched_orders(other.id, [order_id]) == 1
+
+
+def test_attach_orders_inserts_in_bounded_slices(uow_factory, monkeypatch):
+    delivery_date = date(2025, 1, 1)
+
+    gen = run_generate_orders(uow_factory, delivery_date)
+    assert (gen["created"] + gen["existing"]) > 2, "need at least three orders (seed more subscriptions)"
+
+    # slice ละ 2 rows → หลาย INSERT ต่อ batch, ผลรวมต้องเท่าเดิม
+    monkeypatch.setattr(delivery_batch_repo, "ATTACH_ROWS_PER_INSERT", 2)
+    first = run_create_batches(uow_factory, delivery_date)
+
+    uow = uow_factory()
+    with uow:
+        links = uow.session.scalar(select(func.count()).select_from(DeliveryBatchOrder))
+    assert first["orders_attached"] == links > 2
+    assert run_create_batches(uow_factory, delivery_date)["orders_attached"] == 0
+
+
+def _lock_batch_before_attach(monkeypatch, times: int | None = None):
+    """attach_unbatched_orders that first locks the target batch (lock_batches winning the race)."""
+    attach = SqlAlchemyDeliveryBatchRepo.attach_unbatched_orders
+    calls = {"n": 0}
+
+    def racing(self, batch_id, order_ids):
+        calls["n"] += 1
+        if times is None or calls["n"] <= times:
+            self.session.execute(
+                DeliveryBatch.__table__.update().where(DeliveryBatch.id == batch_id).values(locked_at=datetime.utcnow())
+            )
+        return attach(self, batch_id, order_ids)
+
+    monkeypatch.setattr(SqlAlchemyDeliveryBatchRepo, "attach_unbatched_orders", racing)
+
+
+def test_orders_skipped_by_a_locked_batch_are_packed_again(uow_factory, monkeypatch):
+    delivery_date = date(2025, 1, 1)
+
+    gen = run_generate_orders(uow_factory, delivery_date)
+    due = gen["created"] + gen["existing"]
+    assert due > 0, "Seed test data (subscriptions) before running integration tests."
+
+    _lock_batch_before_attach(monkeypatch, times=1)
+    chunker = AdaptiveChunker("attach", initial=1000, minimum=1000, maximum=1000)
+    result = run_create_batches(uow_factory, delivery_date, chunker=chunker)
+
+    # batch แรกถูก lock ก่อน attach → order ทั้งหมดไปลง batch ใหม่ใน round ถัดไป
+    assert result["orders_attached"] == due
+    uow = uow_factory()
+    with uow:
+        in_locked = uow.session.scalar(
+            select(func.count())
+            .select_from(DeliveryBatchOrder)
+            .join(DeliveryBatch, DeliveryBatch.id == DeliveryBatchOrder.batch_id)
+            .where(DeliveryBatch.locked_at.is_not(None))
+        )
+    assert in_locked == 0
+
+
+def test_watermark_stays_below_orders_a_locked_batch_skipped(uow_factory, monkeypatch):
+    from app.infrastructure.db.models import Order
+
+    delivery_date = date(2025, 1, 1)
+
+    gen = run_generate_orders(uow_factory, delivery_date)
+    assert (gen["created"] + gen["existing"]) > 0, "Seed test data (subscriptions) before running integration tests."
+
+    # every batch gets locked before its attach → nothing can be attached this run
+    _lock_batch_before_attach(monkeypatch)
+    chunker = AdaptiveChunker("attach", initial=1000, minimum=1000, maximum=1000)
+    result = run_create_batches(uow_factory, delivery_date, incremental=True, chunker=chunker, lock_retries=1)
+    assert result["orders_attached"] == 0
+
+    uow = uow_factory()
+    with uow:
+        first_order = uow.session.scalar(select(func.min(Order.id)).where(Order.delivery_date == delivery_date))
+        mark = uow.checkpoints.get_last_id("create_batches", delivery_date) or 0
+    assert mark < first_order
+
+    # next incremental run (no race) still sees them
+    monkeypatch.undo()
+    again = run_create_batches(uow_factory, delivery_date, incremental=True)
+    assert again["orders_attached"] == gen["created"] + gen["existing"]
@@ -1,4 +1,9 @@
 from datetime import date
+
+import pytest
+from sqlalchemy import select, update
+
+from app.infrastructure.db.models import Subscription
 from app.jobs.tasks.generate_orders import run_generate_orders
 
 
@@ -15,3 +20,225 @@ def test_generate_orders_is_idempotent(uow_factory):
 
     assert second["created"] == 0
     assert second["existing"] >= first["created"]
+
+
+def test_generate_orders_bulk_is_idempotent(uow_factory):
+    delivery_date = date(2025, 1, 1)
+
+    first = run_generate_orders(uow_factory, delivery_date, bulk=True)
+    assert (first["created"] + first["existing"]) > 0, (
+        "No due subscriptions found for this delivery_date. "
+        "Seed test data (subscriptions) before running integration tests."
+    )
+
+    # bulk and per-subscription paths share uq_orders_generated_key
+    second = run_generate_orders(uow_factory, delivery_date)
+
+    assert second["created"] == 0
+    assert second["existing"] == first["created"] + first["existing"]
+
+
+def test_generate_orders_micro_batched_is_idempotent(uow_factory):
+    delivery_date = date(2025, 1, 1)
+
+    first = run_generate_orders(uow_factory, delivery_date, commit_batch_size=100)
+    assert (first["created"] + first["existing"]) > 0, (
+        "No due subscriptions found for this delivery_date. "
+        "Seed test data (subscriptions) before running integration tests."
+    )
+
+    second = run_generate_orders(uow_factory, delivery_date, commit_batch_size=100)
+
+    assert second["created"] == 0
+    assert second["existing"] >= first["created"]
+
+
+def test_generate_orders_resumes_from_checkpoint(uow_factory):
+    delivery_date = date(2025, 1, 1)
+
+    # pretend a previous run committed everything up to the highest possible id
+    uow = uow_factory()
+    with uow:
+        uow.checkpoints.save("generate_orders", delivery_date, 2**63 - 1)
+
+    resumed = run_generate_orders(uow_factory, delivery_date)
+    assert resumed["created"] + resumed["existing"] == 0
+
+    # completed run removes the checkpoint → the next run scans from the start again
+    uow = uow_factory()
+    with uow:
+        assert uow.checkpoints.get_last_id("generate_orders", delivery_date) is None
+
+    full = run_generate_orders(uow_factory, delivery_date, from_scratch=True)
+    assert (full["created"] + full["existing"]) > 0
+
+
+def test_generate_orders_from_due_queue_matches_table_scan(uow_factory):
+    from app.jobs.tasks.rebuild_due_queue import run_rebuild_due_queue
+
+    delivery_date = date(2025, 1, 1)
+
+    run_rebuild_due_queue(uow_factory)
+    assert run_rebuild_due_queue(uow_factory, check_only=True)["missing"] == 0
+
+    from_table = run_generate_orders(uow_factory, delivery_date)
+    from_queue = run_generate_orders(uow_factory, delivery_date, use_due_queue=True)
+
+    assert from_queue["created"] == 0
+    assert from_queue["existing"] == from_table["created"] + from_table["existing"]
+
+
+def test_due_queue_sync_uses_the_schedulable_predicate(uow_factory):
+    from app.jobs.tasks.rebuild_due_queue import run_rebuild_due_queue
+
+    delivery_date = date(2025, 1, 1)
+    run_rebuild_due_queue(uow_factory)
+
+    uow = uow_factory()
+    [subscription_id] = uow.due_queue.list_due_ids(delivery_date, limit=1)
+
+    # not ACTIVE (but neither paused nor canceled) → leaves the queue like it leaves the table scan
+    uow.session.execute(update(Subscription).where(Subscription.id == subscription_id).values(status=0))
+    uow.due_queue.sync(subscription_id)
+    assert subscription_id not in uow.due_queue.list_due_ids(delivery_date, limit=1000)
+    assert subscription_id not in uow.subscriptions.list_due_active_ids(delivery_date, limit=1000)
+
+    uow.session.execute(update(Subscription).where(Subscription.id == subscription_id).values(status=1))
+    uow.due_queue.sync(subscription_id)
+    assert subscription_id in uow.due_queue.list_due_ids(delivery_date, limit=1000)
+
+
+def test_due_queue_pages_across_run_dates_in_id_order(uow_factory):
+    from app.infrastructure.db.models.subscription_due_queue import SubscriptionDueQueue
+    from app.jobs.tasks.rebuild_due_queue import run_rebuild_due_queue
+
+    delivery_date = date(2025, 1, 1)
+    run_rebuild_due_queue(uow_factory)
+
+    uow = uow_factory()
+    due = uow.due_queue.list_due_ids(delivery_date, limit=1000)
+    assert len(due) >= 3, "need at least three due subscriptions (seed more)"
+
+    # overdue / ยังไม่ถึงกำหนด ปนกัน → page ต้องเรียงตาม id ข้ามทุก run_date ที่ due
+    uow.session.execute(
+        update(SubscriptionDueQueue)
+        .where(SubscriptionDueQueue.subscription_id == due[0])
+        .values(run_date=date(2024, 12, 30))
+    )
+    uow.session.execute(
+        update(SubscriptionDueQueue)
+        .where(SubscriptionDueQueue.subscription_id == due[1])
+        .values(run_date=date(2025, 1, 2))
+    )
+
+    expected = [sid for sid in due if sid != due[1]]
+    pages, after_id = [], 0
+    while True:
+        page = uow.due_queue.list_due_ids(delivery_date, limit=2, after_id=after_id)
+        if not page:
+            break
+        pages.extend(page)
+        after_id = page[-1]
+    assert pages == expected
+
+
+def _break_first_due_subscription(uow_factory, delivery_date):
+    """Drop the default address of one due subscription → SUBSCRIPTION_DEFAULT_ADDRESS_REQUIRED."""
+    uow = uow_factory()
+    ids = uow.subscriptions.list_due_active_ids(delivery_date, limit=1)
+    assert ids, "Seed test data (subscriptions) before running integration tests."
+    subscription = uow.session.get(Subscription, ids[0])
+    address_id = subscription.default_address_id
+    uow.session.execute(update(Subscription).where(Subscription.id == ids[0]).values(default_address_id=None))
+    uow.session.flush()
+    return ids[0], address_id
+
+
+def _unresolved(uow_factory, delivery_date, **kwargs):
+    uow = uow_factory()
+    with uow:
+        return uow.generation_failures.list_unresolved_ids(delivery_date, limit=100, **kwargs)
+
+
+def test_generate_orders_aborts_on_first_error_by_default(uow_factory):
+    delivery_date = date(2025, 1, 1)
+    _break_first_due_subscription(uow_factory, delivery_date)
+
+    with pytest.raises(ValueError, match="SUBSCRIPTION_DEFAULT_ADDRESS_REQUIRED"):
+        run_generate_orders(uow_factory, delivery_date)
+
+
+def test_continue_on_error_dead_letters_and_retry_resolves(uow_factory):
+    delivery_date = date(2025, 1, 1)
+    subscription_id, address_id = _break_first_due_subscription(uow_factory, delivery_date)
+
+    first = run_generate_orders(uow_factory, delivery_date, continue_on_error=True)
+    assert first["failed"] == 1
+    assert _unresolved(uow_factory, delivery_date) == [subscription_id]
+
+    # still broken → stays in the dead-letter table
+    retried = run_generate_orders(uow_factory, delivery_date, retry_failed=True)
+    assert retried["failed"] == 1
+    assert _unresolved(uow_factory, delivery_date) == [subscription_id]
+
+    session = uow_factory().session
+    session.execute(
+        update(Subscription).where(Subscription.id == subscription_id).values(default_address_id=address_id)
+    )
+    session.flush()
+
+    fixed = run_generate_orders(uow_factory, delivery_date, retry_failed=True)
+    assert fixed == {"delivery_date": delivery_date.isoformat(), "created": 1, "existing": 0, "failed": 0}
+    assert _unresolved(uow_factory, delivery_date) == []
+
+
+def test_invalid_plan_is_dead_lettered_when_advancing_schedule(uow_factory):
+    from datetime import datetime
+
+    from app.infrastructure.db.models import Plan
+
+    delivery_date = date(2025, 1, 1)
+    uow = uow_factory()
+    ids = uow.subscriptions.list_due_active_ids(delivery_date, limit=2)
+    assert len(ids) == 2, "need at least two due subscriptions (seed more)"
+    broken_id, ok_id = ids
+
+    # interval_count=0 → next_run_date_after raises PLAN_INTERVAL_COUNT_INVALID
+    now = datetime.utcnow()
+    plan = Plan(code="TEST-BROKEN", name="broken", interval_unit="day", interval_count=0, is_active=1,
+                created_at=now, updated_at=now)
+    uow.session.add(plan)
+    uow.session.flush()
+    uow.session.execute(update(Subscription).where(Subscription.id == broken_id).values(plan_id=plan.id))
+    uow.session.flush()
+
+    result = run_generate_orders(uow_factory, delivery_date, continue_on_error=True, advance_schedule=True)
+
+    # order ถูกสร้างแล้ว แต่เลื่อนรอบไม่ได้ → dead-letter, ไม่ abort ทั้ง run
+    assert result["failed"] == 1
+    assert _unresolved(uow_factory, delivery_date) == [broken_id]
+    uow = uow_factory()
+    with uow:
+        dates = dict(
+            uow.session.execute(
+                select(Subscription.id, Subscription.next_run_date).where(Subscription.id.in_([broken_id, ok_id]))
+            ).all()
+        )
+    assert dates[broken_id] == delivery_date
+    assert dates[ok_id] > delivery_date
+
+    with pytest.raises(ValueError, match="SCHEDULE_INVALID"):
+        run_generate_orders(uow_factory, delivery_date, advance_schedule=True, from_scratch=True)
+
+
+def test_retry_failed_is_split_by_shard(uow_factory):
+    delivery_date = date(2025, 1, 1)
+    subscription_id, _ = _break_first_due_subscription(uow_factory, delivery_date)
+    run_generate_orders(uow_factory, delivery_date, continue_on_error=True)
+
+    own_shard = (subscription_id % 2, 2)
+    other_shard = (1 - subscription_id % 2, 2)
+    assert _unresolved(uow_factory, delivery_date, shard=other_shard) == []
+
+    assert run_generate_orders(uow_factory, delivery_date, retry_failed=True, shard=other_shard)["failed"] == 0
+    assert run_generate_orders(uow_factory, delivery_date, retry_failed=True, shard=own_shard)["failed"] == 1
@@ -0,0 +1,44 @@
+# tests/integration/test_job_runs.py
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.jobs.history import compare_latest, record_run
+
+
+def test_failed_run_is_recorded_and_reraised(uow_factory):
+    with pytest.raises(ValueError):
+        with record_run(uow_factory, "test_job", date(2025, 1, 1)):
+            raise ValueError("BOOM")
+
+    uow = uow_factory()
+    with uow:
+        runs = uow.job_runs.list_recent("test_job", limit=1)
+    assert runs[0].error_count == 1
+    assert runs[0].error.startswith("ValueError")
+
+
+def test_compare_flags_slower_latest_run(uow_factory):
+    base = datetime(2025, 1, 1)
+    for i, rows_per_second in enumerate((1000, 1100, 900, 400)):
+        uow = uow_factory()
+        with uow:
+            uow.job_runs.add(
+                {
+                    "job_name": "test_job",
+                    "delivery_date": date(2025, 1, 1),
+                    "status": 1,
+                    "started_at": base + timedelta(days=i),
+                    "finished_at": base + timedelta(days=i, seconds=1),
+                    "duration_ms": 1000,
+                    "rows_processed": rows_per_second,
+                    "rows_per_second": rows_per_second,
+                    "error_count": 0,
+                    "created_at": base + timedelta(days=i, seconds=1),
+                }
+            )
+
+    report = compare_latest(uow_factory, "test_job", window=3, threshold=0.2)
+    assert report["baseline_runs"] == 3
+    assert report["regression"] is True
+    assert "rows_per_second" in report["reasons"]
@@ -0,0 +1,179 @@
+# tests/integration/test_work_queue.py
+from datetime import date, datetime, timedelta
+
+from app.infrastructure.db.repos_sqlalchemy.work_item_repo import (
+    WORK_ITEM_STATUS_DONE,
+    WORK_ITEM_STATUS_FAILED,
+    WORK_ITEM_STATUS_PENDING,
+)
+from app.jobs.tasks.create_batches import run_create_batches
+from app.jobs.tasks.generate_orders import run_generate_orders
+from app.jobs.tasks.work_queue import (
+    GENERATE_JOB,
+    enqueue_create_batches,
+    enqueue_generate_orders,
+    run_create_batches_worker,
+    run_generate_orders_worker,
+    work_queue_status,
+)
+
+
+def test_workers_process_every_item_once(uow_factory):
+    delivery_date = date(2025, 1, 1)
+
+    first = enqueue_generate_orders(uow_factory, delivery_date, unit_size=2)
+    assert first["units"] > 0, (
+        "No due subscriptions found for this delivery_date. "
+        "Seed test data (subscriptions) before running integration tests."
+    )
+    # enqueue ซ้ำ → ไม่เพิ่ม item
+    assert enqueue_generate_orders(uow_factory, delivery_date, unit_size=2)["enqueued"] == 0
+
+    # heartbeat ใช้ session แยก → ปิดไว้ (fixture ใช้ session เดียว)
+    worked = run_generate_orders_worker(uow_factory, delivery_date, owner="w1", heartbeat=False)
+    assert worked["items_done"] == first["units"]
+    assert worked["items_failed"] == 0
+
+    status = work_queue_status(uow_factory, GENERATE_JOB, delivery_date)
+    assert status["pending"] == 0 and status["leased"] == 0
+
+    # ทุก subscription ถูก generate แล้ว
+    again = run_generate_orders(uow_factory, delivery_date)
+    assert again["created"] == 0
+
+    enqueue_create_batches(uow_factory, delivery_date)
+    run_create_batches_worker(uow_factory, delivery_date, owner="w1", heartbeat=False)
+    assert run_create_batches(uow_factory, delivery_date)["orders_attached"] == 0
+
+
+def test_enqueue_generate_reopens_buckets_with_newly_due_subscriptions(uow_factory):
+    from sqlalchemy import update
+
+    from app.infrastructure.db.models import Subscription
+
+    delivery_date = date(2025, 1, 1)
+    uow = uow_factory()
+    ids = uow.subscriptions.list_due_active_ids(delivery_date, limit=1)
+    assert ids, "Seed test data (subscriptions) before running integration tests."
+    late_id = ids[0]
+
+    # ยังไม่ due ตอน enqueue/work รอบแรก
+    uow.session.execute(
+        update(Subscription).where(Subscription.id == late_id).values(next_run_date=date(2025, 1, 8))
+    )
+    uow.session.flush()
+
+    enqueue_generate_orders(uow_factory, delivery_date, unit_size=1000)
+    run_generate_orders_worker(uow_factory, delivery_date, owner="w1", heartbeat=False)
+    # ทุก bucket generate ครบ → enqueue ซ้ำไม่ reopen อะไร
+    assert enqueue_generate_orders(uow_factory, delivery_date, unit_size=1000)["reopened"] == 0
+
+    uow.session.execute(
+        update(Subscription).where(Subscription.id == late_id).values(next_run_date=delivery_date)
+    )
+    uow.session.flush()
+
+    again = enqueue_generate_orders(uow_factory, delivery_date, unit_size=1000)
+    assert again["enqueued"] == 0 and again["reopened"] == 1
+
+    worked = run_generate_orders_worker(uow_factory, delivery_date, owner="w1", heartbeat=False)
+    assert worked["items_done"] == 1
+    assert worked["created"] == 1
+
+
+JOB = "test_queue"
+DAY = date(2025, 1, 1)
+T0 = datetime(2025, 1, 1, 8, 0, 0)
+
+
+def _claim(uow_factory, owner, now, limit=1, max_attempts=None):
+    uow = uow_factory()
+    with uow:
+        return uow.work_items.claim(
+            JOB, DAY, owner, limit=limit, lease_seconds=60, now=now, max_attempts=max_attempts
+        )
+
+
+def _enqueue(uow_factory, n):
+    uow = uow_factory()
+    with uow:
+        uow.work_items.enqueue_many(JOB, DAY, [(i, i) for i in range(1, n + 1)])
+
+
+def _counts(uow_factory):
+    uow = uow_factory()
+    with uow:
+        return uow.work_items.count_by_status(JOB, DAY)
+
+
+def test_two_owners_claim_disjoint_items(uow_factory):
+    _enqueue(uow_factory, 4)
+
+    first = _claim(uow_factory, "w1", T0, limit=2)
+    second = _claim(uow_factory, "w2", T0, limit=3)
+
+    assert len(first) == 2 and len(second) == 2
+    assert not {item[0] for item in first} & {item[0] for item in second}
+    assert _claim(uow_factory, "w3", T0) == []
+
+
+def test_expired_lease_is_reclaimed(uow_factory):
+    _enqueue(uow_factory, 1)
+
+    [(item_id, _, _, attempts)] = _claim(uow_factory, "w1", T0)
+    assert attempts == 1
+    assert _claim(uow_factory, "w2", T0 + timedelta(seconds=30)) == []
+
+    [(reclaimed_id, _, _, attempts)] = _claim(uow_factory, "w2", T0 + timedelta(seconds=61))
+    assert reclaimed_id == item_id
+    assert attempts == 2
+
+
+def test_complete_by_stale_owner_returns_false(uow_factory):
+    _enqueue(uow_factory, 1)
+
+    [(item_id, _, _, _)] = _claim(uow_factory, "w1", T0)
+    _claim(uow_factory, "w2", T0 + timedelta(seconds=61))
+
+    uow = uow_factory()
+    with uow:
+        assert uow.work_items.complete(item_id, "w1") is False
+        assert uow.work_items.complete(item_id, "w2") is True
+    assert _counts(uow_factory) == {WORK_ITEM_STATUS_DONE: 1}
+
+
+def test_failed_item_is_retried_until_max_attempts(uow_factory):
+    _enqueue(uow_factory, 1)
+
+    for expected_attempts in (1, 2, 3):
+        [(item_id, _, _, attempts)] = _claim(uow_factory, "w1", T0, max_attempts=3)
+        assert attempts == expected_attempts
+        uow = uow_factory()
+        with uow:
+            uow.work_items.fail(item_id, "w1", "BOOM", retry=attempts < 3)
+
+    assert _claim(uow_factory, "w1", T0, max_attempts=3) == []
+    assert _counts(uow_factory) == {WORK_ITEM_STATUS_FAILED: 1}
+
+
+def test_item_crashing_its_worker_fails_at_claim_after_max_attempts(uow_factory):
+    _enqueue(uow_factory, 1)
+
+    # every lease expires without complete/fail (worker process died)
+    for n in range(3):
+        assert len(_claim(uow_factory, f"w{n}", T0 + timedelta(seconds=61 * n), max_attempts=3)) == 1
+
+    assert _claim(uow_factory, "w3", T0 + timedelta(seconds=61 * 3), max_attempts=3) == []
+    assert _counts(uow_factory) == {WORK_ITEM_STATUS_FAILED: 1}
+
+
+def test_done_item_is_reopened_for_new_work(uow_factory):
+    _enqueue(uow_factory, 2)
+    [(item_id, _, _, _)] = _claim(uow_factory, "w1", T0)
+
+    uow = uow_factory()
+    with uow:
+        uow.work_items.complete(item_id, "w1")
+        assert uow.work_items.reopen_done(JOB, DAY, [1, 2]) == 1   # item 2 is still pending
+
+    assert _counts(uow_factory) == {WORK_ITEM_STATUS_PENDING: 2}
@@ -0,0 +1,32 @@
+import pytest
+
+from app.services.delivery_batch_service import pack_orders
+
+
+def test_unlimited_puts_everything_in_first_batch():
+    assert pack_orders([(1, 3), (2, 1)], [], None, None) == [[1, 2]]
+    assert pack_orders([(1, 3), (2, 1)], [(5, 10)], None, None) == [[1, 2]]
+
+
+def test_max_orders_splits_deterministically():
+    orders = [(oid, 1) for oid in range(1, 8)]
+    assert pack_orders(orders, [], 3, None) == [[1, 2, 3], [4, 5, 6], [7]]
+
+
+def test_existing_open_batches_are_filled_first():
+    # open batch already holds 2 of 3 orders
+    assert pack_orders([(10, 1), (11, 1)], [(2, 0)], 3, None) == [[10], [11]]
+
+
+def test_max_items_first_fit_decreasing():
+    orders = [(1, 4), (2, 3), (3, 3), (4, 2), (5, 2)]
+    assert pack_orders(orders, [], None, 6) == [[1, 4], [2, 3], [5]]
+
+
+def test_oversized_order_gets_its_own_batch():
+    assert pack_orders([(1, 9), (2, 1)], [], None, 5) == [[1], [2]]
+
+
+def test_invalid_capacity_is_rejected():
+    with pytest.raises(ValueError, match="BATCH_CAPACITY_INVALID"):
+        pack_orders([(1, 1)], [], 0, None)
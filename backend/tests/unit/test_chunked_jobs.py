@@ -0,0 +1,148 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.jobs.chunking import AdaptiveChunker
+from app.jobs.tasks.generate_orders import _generate_page_adaptive
+from app.jobs.tasks.lock_batches import _lock_in_chunks
+from app.services.delivery_batch_service import LockResult
+from app.services.order_service import GenerationBatchResult
+
+D = date(2025, 1, 1)
+NOW = datetime(2025, 1, 1, 8, 0, 0)
+
+
+def _lock_error() -> OperationalError:
+    return OperationalError("UPDATE delivery_batches ...", {}, Exception(1213, "deadlock"))
+
+
+class FakeGenerator:
+    """generate_page stand-in: deadlocks on pages larger than max_ok, records every call."""
+
+    def __init__(self, max_ok: int, existing: set[int] = frozenset()) -> None:
+        self.max_ok = max_ok
+        self.existing = existing
+        self.calls: list[list[int]] = []
+
+    def __call__(self, uow_factory, subscription_ids, delivery_date, continue_on_error) -> GenerationBatchResult:
+        self.calls.append(list(subscription_ids))
+        if len(subscription_ids) > self.max_ok:
+            raise _lock_error()
+        result = GenerationBatchResult()
+        for sid in subscription_ids:
+            if sid in self.existing:
+                result.existing += 1
+            elif sid % 5 == 0:
+                result.failures.append((sid, "NO_ADDRESS"))
+            else:
+                result.created += 1
+        return result
+
+
+def test_generate_page_adaptive_redoes_page_in_pieces_after_lock_error():
+    generate = FakeGenerator(max_ok=4)
+    chunker = AdaptiveChunker("gen", initial=8, minimum=1)
+
+    result = _generate_page_adaptive(generate, None, list(range(1, 9)), D, True, chunker, lock_retries=3)
+
+    # 8 → deadlock, size halves to 4 → two pieces that fit
+    assert generate.calls == [list(range(1, 9)), [1, 2, 3, 4], [5, 6, 7, 8]]
+    assert (result.created, result.existing, result.failures) == (7, 0, [(5, "NO_ADDRESS")])
+    assert chunker.summary()["lock_errors"] == 1
+
+
+def test_generate_page_adaptive_splits_recursively_until_retries_run_out():
+    # a piece that still deadlocks is split again; subscriptions the failed
+    # attempt committed come back as existing on the redo
+    generate = FakeGenerator(max_ok=1, existing={1})
+    chunker = AdaptiveChunker("gen", initial=4, minimum=1)
+
+    result = _generate_page_adaptive(generate, None, [1, 2, 3, 4], D, True, chunker, lock_retries=2)
+
+    assert generate.calls[0] == [1, 2, 3, 4]
+    assert sorted(sid for call in generate.calls if len(call) == 1 for sid in call) == [1, 2, 3, 4]
+    assert (result.created, result.existing) == (3, 1)
+
+    with pytest.raises(OperationalError):
+        _generate_page_adaptive(FakeGenerator(max_ok=0), None, [1, 2], D, True, chunker, lock_retries=1)
+
+
+def test_generate_page_adaptive_reraises_other_errors():
+    def broken(*_):
+        raise ValueError("BOOM")
+
+    with pytest.raises(ValueError, match="BOOM"):
+        _generate_page_adaptive(broken, None, [1, 2], D, True, AdaptiveChunker("gen", initial=2), lock_retries=3)
+
+
+class FakeLockService:
+    """lock_and_reserve_chunk stand-in: hands out scripted chunks, deadlocks on request."""
+
+    def __init__(self, chunks: list[LockResult | Exception]) -> None:
+        self.chunks = chunks
+        self.limits: list[int] = []
+
+    def lock_and_reserve_chunk(self, delivery_date, now, limit, reserve_inventory=True) -> LockResult:
+        self.limits.append(limit)
+        if not self.chunks:
+            return LockResult()
+        chunk = self.chunks.pop(0)
+        if isinstance(chunk, Exception):
+            raise chunk
+        return chunk
+
+
+def test_lock_in_chunks_aggregates_reserved_and_shortfalls_across_chunks():
+    svc = FakeLockService(
+        [
+            LockResult(batch_ids=[1, 2], reserved={10: 5, 11: 2}, shortfalls={12: (4, 1)}),
+            _lock_error(),
+            LockResult(batch_ids=[3], reserved={10: 3}, shortfalls={12: (6, 0), 13: (1, 0)}),
+        ]
+    )
+    chunker = AdaptiveChunker("lock", initial=4, minimum=1)
+
+    total = _lock_in_chunks(svc, D, NOW, True, chunker, lock_retries=3)
+
+    assert total.batch_ids == [1, 2, 3]
+    assert total.reserved == {10: 8, 11: 2}
+    # requested adds up; available is the latest chunk's view
+    assert total.shortfalls == {12: (10, 0), 13: (1, 0)}
+    # the chunk after the deadlock asks for half as many batches
+    assert svc.limits[2] == svc.limits[1] // 2
+    assert len(svc.limits) == 4
+
+
+def test_lock_in_chunks_gives_up_after_lock_retries():
+    svc = FakeLockService([_lock_error(), _lock_error()])
+
+    with pytest.raises(OperationalError):
+        _lock_in_chunks(svc, D, NOW, False, AdaptiveChunker("lock", initial=4, minimum=1), lock_retries=1)
+
+
+def test_run_shard_leaves_the_callers_options_alone(monkeypatch):
+    from contextlib import contextmanager
+
+    import app.jobs.session as job_session
+    import app.jobs.tasks.generate_orders as generate_orders
+
+    seen = {}
+
+    @contextmanager
+    def factory(database_url):
+        yield None
+
+    def run_generate_orders(uow_factory, delivery_date, shard, **options):
+        seen.update(options)
+        return {}
+
+    monkeypatch.setattr(job_session, "JobSessionFactory", factory)
+    monkeypatch.setattr(generate_orders, "run_generate_orders", run_generate_orders)
+
+    options = {"page_size": 50, "chunker_options": {"initial": 50}}
+    generate_orders._run_shard("sqlite://", D, None, options)
+    generate_orders._run_shard("sqlite://", D, None, options)   # second shard / rerun sees the same options
+
+    assert options == {"page_size": 50, "chunker_options": {"initial": 50}}
+    assert isinstance(seen["chunker"], AdaptiveChunker)
@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.jobs.chunking import AdaptiveChunker, chunker_for, is_lock_error
+
+
+def _lock_error(code: int) -> OperationalError:
+    return OperationalError("UPDATE delivery_batches ...", {}, Exception(code, "lock"))
+
+
+def test_fast_chunks_grow_additively_up_to_maximum():
+    chunker = AdaptiveChunker("t", initial=100, maximum=130, step=20, target_seconds=1.0)
+    assert chunker.record(0.1) == 120
+    assert chunker.record(0.1) == 130
+    assert chunker.record(0.1) == 130
+
+
+def test_slow_chunks_and_lock_errors_halve_down_to_minimum():
+    chunker = AdaptiveChunker("t", initial=100, minimum=30, target_seconds=1.0)
+    assert chunker.record(2.0) == 50
+    assert chunker.record_lock_error() == 30
+    assert chunker.summary() == {"final": 30, "min": 30, "max": 100, "chunks": 2, "lock_errors": 1}
+
+
+def test_measure_shrinks_on_lock_error_and_reraises():
+    chunker = AdaptiveChunker("t", initial=100)
+    with pytest.raises(OperationalError):
+        with chunker.measure():
+            raise _lock_error(1213)
+    assert chunker.size == 50
+
+    # other errors give no feedback
+    with pytest.raises(ValueError):
+        with chunker.measure():
+            raise ValueError("BOOM")
+    assert chunker.size == 50
+
+
+def test_is_lock_error():
+    assert is_lock_error(_lock_error(1205))
+    assert is_lock_error(_lock_error(1213))
+    assert not is_lock_error(_lock_error(1062))
+    assert not is_lock_error(ValueError("BOOM"))
+
+
+def test_invalid_config():
+    with pytest.raises(ValueError, match="CHUNKER_CONFIG_INVALID"):
+        AdaptiveChunker("t", initial=10, minimum=20, maximum=10)
+    with pytest.raises(ValueError, match="CHUNKER_CONFIG_INVALID"):
+        AdaptiveChunker("t", initial=10, backoff=1.0)
+
+
+def test_chunker_for_clamps_initial_to_job_bounds():
+    assert chunker_for("lock_batches", initial=1).size == 5
+    assert chunker_for("generate_orders").size == 200
@@ -0,0 +1,11 @@
+from app.jobs.history import rows_processed
+
+
+def test_rows_processed_uses_job_throughput_keys():
+    assert rows_processed("generate_orders", {"created": 3, "existing": 2, "failed": 1}) == 5
+    assert rows_processed("create_batches", {"batches_created": 2, "orders_attached": 40}) == 40
+    assert rows_processed("lock_batches", None) == 0
+
+
+def test_rows_processed_unknown_job_sums_counts():
+    assert rows_processed("other", {"a": 1, "b": 2, "delivery_date": "2025-01-01", "ok": True}) == 3
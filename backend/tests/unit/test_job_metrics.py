@@ -0,0 +1,23 @@
+from sqlalchemy import create_engine, text
+
+from app.jobs.metrics import measure
+
+
+def test_measure_counts_statements_and_rows():
+    engine = create_engine("sqlite://", future=True)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+
+    with measure(engine) as metrics:
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO t (id) VALUES (1), (2), (3)"))
+            conn.execute(text("DELETE FROM t WHERE id > 1"))
+
+    assert metrics.statements == 2
+    assert metrics.rows == 5
+    assert metrics.wall_seconds > 0
+
+    # listener removed after the block
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM t"))
+    assert metrics.statements == 2
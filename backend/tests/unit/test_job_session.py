@@ -0,0 +1,25 @@
+from sqlalchemy import text
+
+from app.jobs.session import JobSessionFactory
+
+
+def test_uow_returns_connection_to_pool_on_exit(tmp_path):
+    # one connection, no overflow: a leaked session would block the second UoW
+    with JobSessionFactory(f"sqlite:///{tmp_path / 'jobs.db'}", pool_size=1, max_overflow=0, pool_timeout=1) as uow_factory:
+        for _ in range(3):
+            uow = uow_factory()
+            with uow:
+                assert uow.session.execute(text("SELECT 1")).scalar() == 1
+            assert uow_factory.engine.pool.checkedout() == 0
+
+
+def test_uow_closes_session_on_error(tmp_path):
+    with JobSessionFactory(f"sqlite:///{tmp_path / 'jobs.db'}", pool_size=1, max_overflow=0, pool_timeout=1) as uow_factory:
+        uow = uow_factory()
+        try:
+            with uow:
+                uow.session.execute(text("SELECT 1"))
+                raise ValueError("BOOM")
+        except ValueError:
+            pass
+        assert uow_factory.engine.pool.checkedout() == 0
@@ -0,0 +1,58 @@
+import json
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine
+
+import app.jobs.__main__ as runner
+import app.jobs.session as job_session
+
+
+class FakeFactory:
+    def __init__(self, pool_size: int) -> None:
+        self.engine = create_engine("sqlite://", future=True)
+
+    def dispose(self) -> None:
+        self.engine.dispose()
+
+
+def test_stage_failing_before_measure_still_prints_failure_record(monkeypatch, capsys):
+    @contextmanager
+    def broken_record_run(*_):
+        raise RuntimeError("JOB_RUNS_UNAVAILABLE")
+        yield
+
+    monkeypatch.setattr(job_session, "JobSessionFactory", FakeFactory)
+    monkeypatch.setattr(runner, "record_run", broken_record_run)
+
+    assert runner.main(["generate", "--date", "2025-01-01"]) == 1
+
+    record = json.loads(capsys.readouterr().out.strip())
+    assert record["stage"] == "generate"
+    assert record["ok"] is False
+    assert record["statements"] == 0
+    assert record["error"] == "RuntimeError: JOB_RUNS_UNAVAILABLE"
+
+
+def test_generate_options_reach_the_task(monkeypatch, capsys):
+    seen = {}
+
+    @contextmanager
+    def record_run(*_):
+        class Run:
+            pass
+
+        yield Run()
+
+    def run_generate_orders(uow_factory, delivery_date, **options):
+        seen.update(options)
+        return {}
+
+    import app.jobs.tasks.generate_orders as generate_orders
+
+    monkeypatch.setattr(job_session, "JobSessionFactory", FakeFactory)
+    monkeypatch.setattr(runner, "record_run", record_run)
+    monkeypatch.setattr(generate_orders, "run_generate_orders", run_generate_orders)
+
+    argv = ["generate", "--retry-failed", "--from-scratch", "--commit-batch-size", "5"]
+    assert runner.main(argv) == 0
+    assert (seen["retry_failed"], seen["from_scratch"], seen["commit_batch_size"]) == (True, True, 5)
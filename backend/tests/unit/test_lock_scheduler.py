@@ -0,0 +1,110 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.jobs.tasks.lock_scheduler import LockScheduler
+
+T0 = datetime(2025, 1, 1, 8, 0, 0)
+
+
+class FakeClock:
+    def __init__(self, now: datetime) -> None:
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+class FakeBatches:
+    def __init__(self, cutoffs: list[tuple[date, datetime]]) -> None:
+        self.cutoffs = cutoffs
+        self.locked: list[tuple[date, datetime]] = []
+        self.fail_next = 0
+
+    def list_upcoming_cutoffs(self, until: datetime, limit: int = 1000) -> list[tuple[date, datetime]]:
+        return [(d, cutoff) for d, cutoff in self.cutoffs if cutoff <= until]
+
+    def lock_due_batch_ids(self, delivery_date: date, now: datetime, **_) -> list[int]:
+        if self.fail_next:
+            self.fail_next -= 1
+            raise RuntimeError("deadlock")
+        self.locked.append((delivery_date, now))
+        return [delivery_date.day]
+
+
+class FakeUow:
+    def __init__(self, batches: FakeBatches) -> None:
+        self.batches = batches
+
+    def __enter__(self) -> "FakeUow":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+def _scheduler(batches: FakeBatches, clock: FakeClock, **kwargs) -> LockScheduler:
+    return LockScheduler(lambda: FakeUow(batches), refresh_seconds=30, clock=clock, **kwargs)
+
+
+def test_heap_orders_by_cutoff_and_locks_only_due_dates():
+    d1, d2 = date(2025, 1, 2), date(2025, 1, 3)
+    batches = FakeBatches([(d2, T0 + timedelta(minutes=10)), (d1, T0 + timedelta(minutes=5))])
+    clock = FakeClock(T0)
+    scheduler = _scheduler(batches, clock)
+
+    scheduler.refresh()
+    assert scheduler.seconds_until_next_event() == 30   # refresh before the first cutoff
+    assert scheduler.run_due() == {}
+
+    clock.now = T0 + timedelta(minutes=5)
+    assert scheduler.run_due() == {d1.isoformat(): [2]}
+    assert batches.locked == [(d1, clock.now)]
+
+    clock.now = T0 + timedelta(minutes=10)
+    assert scheduler.run_due() == {d2.isoformat(): [3]}
+
+
+def test_refresh_does_not_queue_a_cutoff_twice():
+    d = date(2025, 1, 2)
+    batches = FakeBatches([(d, T0 + timedelta(minutes=5))])
+    clock = FakeClock(T0)
+    scheduler = _scheduler(batches, clock)
+
+    scheduler.refresh()
+    scheduler.refresh()
+
+    clock.now = T0 + timedelta(minutes=5)
+    assert scheduler.run_due() == {d.isoformat(): [2]}
+    assert len(batches.locked) == 1
+    assert scheduler.run_due() == {}
+
+
+def test_failed_lock_requeues_the_date():
+    d1, d2 = date(2025, 1, 2), date(2025, 1, 3)
+    batches = FakeBatches([(d1, T0), (d2, T0)])
+    clock = FakeClock(T0)
+    scheduler = _scheduler(batches, clock)
+    scheduler.refresh()
+
+    batches.fail_next = 1
+    with pytest.raises(RuntimeError):
+        scheduler.run_due()
+
+    assert scheduler.run_due() == {d1.isoformat(): [2], d2.isoformat(): [3]}
+
+
+def test_run_forever_survives_errors():
+    d = date(2025, 1, 2)
+    batches = FakeBatches([(d, T0)])
+    scheduler = _scheduler(batches, FakeClock(T0), error_backoff_seconds=0)
+    batches.fail_next = 2
+
+    seen = []
+
+    def on_locked(locked):
+        seen.append(locked)
+        scheduler.stop()
+
+    scheduler.run_forever(on_locked=on_locked)
+    assert seen == [{d.isoformat(): [2]}]
@@ -0,0 +1,128 @@
+import threading
+from datetime import date
+
+import pytest
+
+from app.jobs.tasks import pipeline
+
+D = date(2025, 1, 1)
+PAGES = [[page * 10 + i for i in range(1, 4)] for page in range(20)]   # 20 pages × 3 subscriptions
+
+
+class FakeZones:
+    def get_batch_limits(self) -> dict:
+        return {}
+
+    def list_active_ids(self) -> list[int]:
+        return []
+
+
+class FakeOrders:
+    def list_unbatched_for_subscriptions(self, delivery_date, subscription_ids, status, with_item_counts=False):
+        # order id = subscription id, two zones
+        return [(sid, sid % 2, 0) for sid in subscription_ids]
+
+
+class FakeUow:
+    zones = FakeZones()
+    orders = FakeOrders()
+
+    def __enter__(self) -> "FakeUow":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+class FakeZoneService:
+    def __init__(self, uow) -> None:
+        pass
+
+    def assign_order_zones(self, *args, **kwargs) -> int:
+        return 0
+
+
+def _fake_generate(produced: list[int]):
+    def run_generate_orders(uow_factory, delivery_date, on_page, **_):
+        for page in PAGES:
+            on_page(page)
+            produced.append(len(page))
+        return {"created": sum(produced), "existing": 0, "failed": 0}
+
+    return run_generate_orders
+
+
+@pytest.fixture()
+def fakes(monkeypatch):
+    produced: list[int] = []
+    attached: list[tuple[int | None, list[int], str]] = []
+
+    def batch_zone(uow_factory, d, zone_id, order_ids, *_):
+        attached.append((zone_id, list(order_ids), threading.current_thread().name))
+        return 0, len(order_ids), []
+
+    monkeypatch.setattr(pipeline, "ZoneService", FakeZoneService)
+    monkeypatch.setattr(pipeline, "run_generate_orders", _fake_generate(produced))
+    monkeypatch.setattr(pipeline, "_batch_zone", batch_zone)
+    return produced, attached
+
+
+def _run(**kwargs) -> dict:
+    # รันใน thread แยก + timeout → ถ้า producer/consumer ค้าง test fail แทนที่จะแขวน
+    outcome: dict = {}
+
+    def target() -> None:
+        try:
+            outcome["result"] = pipeline.run_pipeline(lambda: FakeUow(), D, lock=False, **kwargs)
+        except BaseException as exc:
+            outcome["error"] = exc
+
+    runner = threading.Thread(target=target, daemon=True)
+    runner.start()
+    runner.join(timeout=10)
+    assert not runner.is_alive(), "pipeline hung"
+    return outcome
+
+
+def test_threaded_pipeline_batches_every_page_on_the_consumer_thread(fakes):
+    produced, attached = fakes
+
+    outcome = _run(queue_size=1, micro_batch_size=4)
+
+    assert "error" not in outcome
+    assert outcome["result"]["orders_attached"] == 60
+    assert sorted(oid for _, ids, _ in attached for oid in ids) == sorted(sid for page in PAGES for sid in page)
+    assert {zone_id for zone_id, _, _ in attached} == {0, 1}
+    assert {thread for _, _, thread in attached} == {"pipeline-batching"}
+
+
+def test_consumer_failure_propagates_and_producer_does_not_hang(fakes, monkeypatch):
+    produced, attached = fakes
+
+    def broken(*_):
+        raise RuntimeError("BATCH_FAILED")
+
+    monkeypatch.setattr(pipeline, "_batch_zone", broken)
+
+    outcome = _run(queue_size=1, micro_batch_size=1)
+
+    assert isinstance(outcome.get("error"), RuntimeError)
+    assert str(outcome["error"]) == "BATCH_FAILED"
+    assert not any(t.name == "pipeline-batching" for t in threading.enumerate())
+
+
+def test_producer_failure_still_stops_the_consumer(fakes, monkeypatch):
+    produced, attached = fakes
+
+    def run_generate_orders(uow_factory, delivery_date, on_page, **_):
+        on_page(PAGES[0])
+        raise RuntimeError("GENERATE_FAILED")
+
+    monkeypatch.setattr(pipeline, "run_generate_orders", run_generate_orders)
+
+    outcome = _run(queue_size=1, micro_batch_size=100)
+
+    assert str(outcome.get("error")) == "GENERATE_FAILED"
+    # the consumer got _DONE and flushed the page it had buffered
+    assert sorted(oid for _, ids, _ in attached for oid in ids) == PAGES[0]
+    assert not any(t.name == "pipeline-batching" for t in threading.enumerate())
@@ -0,0 +1,45 @@
+from datetime import date
+
+import pytest
+
+from app.services.schedule_service import compute_next_run_date, next_run_date_after, project_run_dates
+
+
+def test_day_and_week_intervals():
+    assert compute_next_run_date(date(2025, 1, 30), "day", 3) == date(2025, 2, 2)
+    assert compute_next_run_date(date(2025, 1, 1), "week", 2) == date(2025, 1, 15)
+
+
+def test_month_end_is_clamped_and_keeps_anchor():
+    d = compute_next_run_date(date(2025, 1, 31), "month", 1, anchor_day=31)
+    assert d == date(2025, 2, 28)
+    assert compute_next_run_date(d, "month", 1, anchor_day=31) == date(2025, 3, 31)
+    assert compute_next_run_date(date(2024, 1, 31), "month", 1, anchor_day=31) == date(2024, 2, 29)
+    assert compute_next_run_date(date(2025, 11, 30), "month", 3, anchor_day=30) == date(2026, 2, 28)
+
+
+def test_invalid_plan_is_rejected():
+    with pytest.raises(ValueError, match="PLAN_INTERVAL_UNIT_INVALID"):
+        compute_next_run_date(date(2025, 1, 1), "year", 1)
+    with pytest.raises(ValueError, match="PLAN_INTERVAL_COUNT_INVALID"):
+        compute_next_run_date(date(2025, 1, 1), "day", 0)
+
+
+def test_next_run_date_after_skips_missed_cycles():
+    assert next_run_date_after(date(2025, 1, 1), date(2025, 1, 1), "week", 1) == date(2025, 1, 8)
+    assert next_run_date_after(date(2025, 1, 1), date(2025, 1, 20), "week", 1) == date(2025, 1, 22)
+    assert next_run_date_after(date(2025, 1, 31), date(2025, 4, 1), "month", 1, anchor_day=31) == date(2025, 4, 30)
+    # not due yet → unchanged
+    assert next_run_date_after(date(2025, 2, 1), date(2025, 1, 1), "day", 1) == date(2025, 2, 1)
+
+
+def test_project_run_dates_catches_up_then_follows_interval():
+    dates = project_run_dates(date(2024, 12, 25), date(2025, 1, 1), date(2025, 1, 20), "week", 1)
+    assert dates == [date(2025, 1, 1), date(2025, 1, 8), date(2025, 1, 15)]
+
+
+def test_project_run_dates_stops_at_end_date():
+    dates = project_run_dates(
+        date(2025, 1, 31), date(2025, 1, 1), date(2025, 6, 30), "month", 1, anchor_day=31, end_date=date(2025, 3, 31)
+    )
+    assert dates == [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31)]
@@ -0,0 +1,41 @@
+import time
+
+from app.jobs.tasks.work_queue import _Heartbeat
+
+
+class FakeWorkItems:
+    def __init__(self, fail_first: int, held: int) -> None:
+        self.fail_first = fail_first
+        self.held = held
+        self.beats = 0
+
+    def heartbeat(self, item_ids, owner, lease_expires_at) -> int:
+        self.beats += 1
+        if self.beats <= self.fail_first:
+            raise RuntimeError("MySQL server has gone away")
+        return self.held
+
+
+class FakeUow:
+    def __init__(self, work_items: FakeWorkItems) -> None:
+        self.work_items = work_items
+
+    def __enter__(self) -> "FakeUow":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+def test_heartbeat_keeps_beating_after_errors_and_reports_lost_leases():
+    work_items = FakeWorkItems(fail_first=2, held=1)
+    beat = _Heartbeat(lambda: FakeUow(work_items), "w1", [1, 2], lease_seconds=0.03).start()
+
+    deadline = time.monotonic() + 5
+    while work_items.beats < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    beat.stop()
+
+    assert work_items.beats >= 4
+    assert beat.errors == 2
+    assert beat.lost == 1